@@ -1 +1 @@
-from agents.agent_bitboard.bitboard import bitboard
\ No newline at end of file
+from agents.agent_bitboard.bitboard import Bitboard
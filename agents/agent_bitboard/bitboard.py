@@ -1,4 +1,102 @@
-from game_utils import PLAYER1, PLAYER2, GameState
+import functools
+import numpy as np
+from game_utils import BoardPiece, NO_PLAYER, PLAYER1, PLAYER2, GameState
+
+
+def bottom_mask(col, height=6):
+    """Returns a mask with a single bit set in the lowest cell of the given column."""
+    return 1 << (col * (height + 1))
+
+
+def top_mask(col, height=6):
+    """Returns a mask with a single bit set in the highest playable cell of the given column."""
+    return 1 << (height - 1 + col * (height + 1))
+
+
+def column_mask(col, height=6):
+    """Returns a mask with all playable cells of the given column set."""
+    return ((1 << height) - 1) << (col * (height + 1))
+
+
+def alignment(position, height=6):
+    """Check if the stones in position contain four aligned stones.
+    Works on any position integer (one player's stones), using the same
+    shifts as Bitboard.is_win."""
+    for direction in (1, height + 1, height + 2, height):
+        m = position & (position >> direction)
+        if m & (m >> (2 * direction)):
+            return True
+    return False
+
+
+@functools.lru_cache(maxsize=None)
+def _mirror_masks(width, height):
+    """Masks and shifts of mirror: the columns that keep their place in each of the three swap steps."""
+    if width > 8:
+        raise ValueError('mirror supports boards of at most 8 columns.')
+    column_bits = (1 << (height + 1)) - 1
+    swaps = tuple(sum(column_bits << (col * (height + 1)) for col in range(8) if not col & step) for step in (1, 2, 4))
+    return swaps, height + 1, (8 - width) * (height + 1)
+
+
+def mirror(position, width=7, height=6):
+    """Mirror a position integer left-right: column col moves to column width - 1 - col.
+    The column groups are swapped in three steps as if the board had 8 columns: neighbouring columns,
+    then pairs of columns, then the two halves, and the empty columns are shifted out. This is cheap
+    enough for the search to call at every node. No sum position + mask carries into the next column,
+    so mirror(position + mask) is the key of the mirrored position."""
+    (swap_1, swap_2, swap_4), shift, unused = _mirror_masks(width, height)
+    position = ((position & swap_1) << shift) | ((position >> shift) & swap_1)
+    position = ((position & swap_2) << 2 * shift) | ((position >> 2 * shift) & swap_2)
+    position = ((position & swap_4) << 4 * shift) | ((position >> 4 * shift) & swap_4)
+    return position >> unused
+
+
+# The lowest cell of every column and every playable cell of the 7x6 board (without the extra bit on top of
+# each column), for the mask functions below
+BOTTOM_ROW = sum(bottom_mask(col) for col in range(7))
+BOARD_MASK = sum(column_mask(col) for col in range(7))
+
+
+def possible_moves(mask):
+    """Returns the cells where a stone can be played, one per column that is not full (7x6 board).
+    A stone on the extra bit of a column (see can_play) counts as full column, it does not carry
+    into the next column."""
+    return ((mask & BOARD_MASK) + BOTTOM_ROW) & BOARD_MASK
+
+
+def winning_cells(position, mask, height=6):
+    """Returns the empty cells that would complete four for the owner of position, whether they
+    can be played now or not (7x6 board). Each line direction is a handful of shifts of the
+    whole board, so all threats are found at once instead of trying every column."""
+    # Vertical: three stones below the cell
+    cells = (position << 1) & (position << 2) & (position << 3)
+    # Horizontal, and both diagonals: the missing stone is the first, second, third or fourth of the line
+    for shift in (height + 1, height, height + 2):
+        pair = (position << shift) & (position << 2 * shift)
+        cells |= pair & (position << 3 * shift)
+        cells |= pair & (position >> shift)
+        pair = (position >> shift) & (position >> 2 * shift)
+        cells |= pair & (position << shift)
+        cells |= pair & (position >> 3 * shift)
+    return cells & BOARD_MASK & ~mask
+
+
+def non_losing_moves(position, mask):
+    """Returns the playable cells after which the opponent cannot win with their next stone (7x6 board).
+    position holds the stones of the player to move. A single immediate threat of the opponent
+    leaves only the block, two leave nothing, and no move may be played directly below a
+    winning cell of the opponent. An empty result means the position is lost, unless the
+    player to move can win at once."""
+    possible = possible_moves(mask)
+    opponent_wins = winning_cells(position ^ mask, mask)
+    forced = possible & opponent_wins
+    if forced:
+        if forced & (forced - 1):
+            return 0
+        possible = forced
+    return possible & ~(opponent_wins >> 1)
+
 
 class Bitboard:
     def __init__(self, width=7, height=6):
@@ -12,6 +110,41 @@ class Bitboard:
         self.mask = 0  # total stone positions (current player + opponent player)
         self.moves = 0  # number of moves performed
 
+    @classmethod
+    def from_array(cls, board: np.ndarray):
+        """Create a bitboard from a board in the ndarray format of game_utils,
+        where board[0, :] is the lowest row. current_position holds PLAYER1's
+        stones, mask holds the stones of both players."""
+        height, width = board.shape
+        bitboard = cls(width, height)
+        for col in range(width):
+            for row in range(height):
+                piece = board[row, col]
+                if piece == NO_PLAYER:
+                    continue
+                position = 1 << (row + col * (height + 1))
+                bitboard.mask |= position
+                if piece == PLAYER1:
+                    bitboard.current_position |= position
+                bitboard.moves += 1
+        return bitboard
+
+    def to_array(self) -> np.ndarray:
+        """Convert the bitboard back to the ndarray format of game_utils."""
+        board = np.full((self.height, self.width), NO_PLAYER, dtype=BoardPiece)
+        for col in range(self.width):
+            for row in range(self.height):
+                position = 1 << (row + col * (self.height + 1))
+                if self.mask & position:
+                    board[row, col] = PLAYER1 if self.current_position & position else PLAYER2
+        return board
+
+    def player_position(self, player):
+        """Returns the stones of the given player as a position integer."""
+        if player == PLAYER1:
+            return self.current_position
+        return self.current_position ^ self.mask
+
     def can_play(self, col):
         """Check if a stone can be placed in the given column.
         It verifies if the top cell of the column is empty."""
@@ -30,6 +163,19 @@ class Bitboard:
             self.current_position |= move
         self.moves += 1
 
+    def possible(self):
+        """Returns the mask of the cells where a stone can be played, one per column that is not full."""
+        return possible_moves(self.mask)
+
+    def winning_position(self, player):
+        """Returns the mask of the empty cells that would complete four for the given player."""
+        return winning_cells(self.player_position(player), self.mask, self.height)
+
+    def non_losing_moves(self, player):
+        """Returns the mask of the moves of the given player (who is to move) after which the
+        opponent cannot win with their next stone, see non_losing_moves."""
+        return non_losing_moves(self.player_position(player), self.mask)
+
     def column_height(self, col):
         """Calculates the height of stones in a given column,
         which is essential for determining where the next stone will land."""
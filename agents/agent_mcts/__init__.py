@@ -0,0 +1 @@
+from .mcts import generate_move_mcts as generate_mcts
\ No newline at end of file
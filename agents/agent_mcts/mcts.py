@@ -0,0 +1,360 @@
+import atexit
+import math
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+import numpy as np
+from agents.agent_bitboard.bitboard import Bitboard, alignment, possible_moves, winning_cells, non_losing_moves
+from agents.agent_minimax.evaluation import CELL_WINDOWS
+from agents.agent_minimax.parallel import default_workers
+from agents.agent_minimax.search import COLUMN_MASKS
+from agents.agent_minimax.stats import SearchStats
+from agents.agent_minimax.threats import cell_column, forced_move
+from game_utils import BoardPiece, PlayerAction, SavedState
+
+BOARD_WIDTH = 7
+BOARD_HEIGHT = 6
+
+DEFAULT_ITERATIONS = 2000
+# sqrt(2) is the constant of UCB1 for rewards in [0, 1]
+DEFAULT_EXPLORATION = math.sqrt(2)
+
+SELECTION_UCT = 'uct'
+SELECTION_PUCT = 'puct'
+
+# Rewards from the point of view of one player
+WIN, DRAW, LOSS = 1.0, 0.5, 0.0
+
+# Prior of a move under PUCT: share of the windows of four through the cell the stone lands on
+_WINDOW_COUNTS = tuple(len(windows) for windows in CELL_WINDOWS)
+
+# The pool of the root parallel search is its own, resizing it cannot stop a minimax search in the other pools
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+# One parallel search at a time, a search with another number of workers would replace the pool
+_pool_lock = threading.Lock()
+
+
+class Node:
+    """
+    Node of the search tree, a position reached by the moves from the root.
+
+    Attributes:
+    - position: stones of the player to move.
+    - mask: stones of both players.
+    - col: column of the move that led to this node, -1 at the root of a new tree.
+    - parent: node before that move, None at the root.
+    - children: nodes after the moves searched here, None until the node is expanded.
+    - prior: probability of the move under PUCT, given by the parent.
+    - visits: iterations that passed through the node.
+    - value: sum of their rewards for the player who made the move into the node.
+    - terminal: reward of that player if the move ended the game, None otherwise.
+    """
+
+    __slots__ = ('position', 'mask', 'col', 'parent', 'children', 'prior', 'visits', 'value', 'terminal')
+
+    def __init__(self, position: int, mask: int, col: int = -1, parent: Optional['Node'] = None,
+                 prior: float = 1.0):
+        self.position = position
+        self.mask = mask
+        self.col = col
+        self.parent = parent
+        self.children: Optional[List['Node']] = None
+        self.prior = prior
+        self.visits = 0
+        self.value = 0.0
+        self.terminal: Optional[float] = None
+        mover = position ^ mask
+        if parent is not None and alignment(mover, BOARD_HEIGHT):
+            self.terminal = WIN
+        elif possible_moves(mask) == 0:
+            self.terminal = DRAW
+
+    def expand(self):
+        """
+        Adds a child for every move worth searching: only a winning move if there is one, otherwise the
+        moves that do not give the opponent an immediate win, or all moves if every move does.
+        """
+        possible = possible_moves(self.mask)
+        moves = winning_cells(self.position, self.mask) & possible
+        if moves:
+            moves &= -moves
+        else:
+            moves = non_losing_moves(self.position, self.mask) or possible
+        cells = [moves & COLUMN_MASKS[col] for col in range(BOARD_WIDTH) if moves & COLUMN_MASKS[col]]
+        total = sum(_WINDOW_COUNTS[cell.bit_length() - 1] for cell in cells)
+        opponent = self.position ^ self.mask
+        self.children = [Node(opponent, self.mask | cell, cell_column(cell), self,
+                              _WINDOW_COUNTS[cell.bit_length() - 1] / total)
+                         for cell in cells]
+
+    def select(self, exploration: float, selection: str) -> 'Node':
+        """The child with the highest UCT or PUCT score, children that were never visited come first under UCT."""
+        best, best_score = None, -math.inf
+        if selection == SELECTION_PUCT:
+            scale = exploration * math.sqrt(self.visits)
+            for child in self.children:
+                mean = child.value / child.visits if child.visits else DRAW
+                score = mean + scale * child.prior / (1 + child.visits)
+                if score > best_score:
+                    best, best_score = child, score
+            return best
+        log_visits = math.log(self.visits)
+        for child in self.children:
+            if not child.visits:
+                return child
+            score = child.value / child.visits + exploration * math.sqrt(log_visits / child.visits)
+            if score > best_score:
+                best, best_score = child, score
+        return best
+
+    def find(self, position: int, mask: int, plies: int = 2) -> Optional['Node']:
+        """The node of the position among the descendants at most plies moves below this node, None if it is not in the tree."""
+        if self.position == position and self.mask == mask:
+            return self
+        if plies and self.children:
+            for child in self.children:
+                found = child.find(position, mask, plies - 1)
+                if found is not None:
+                    return found
+        return None
+
+
+def rollout(position: int, mask: int, rng) -> float:
+    """
+    Plays the position to the end with random moves and returns the reward of the player to move.
+    A player wins at once when they can and never plays a move that lets the opponent win next,
+    which makes the playouts much less noisy than uniform random moves at almost the same cost.
+
+    Input parameters:
+    - position: stones of the player to move.
+    - mask: stones of both players.
+    - rng: random.Random (or the random module) drawing the moves.
+    """
+    reward = WIN
+    while True:
+        possible = possible_moves(mask)
+        if not possible:
+            return DRAW
+        if winning_cells(position, mask) & possible:
+            return reward
+        moves = non_losing_moves(position, mask)
+        if not moves:
+            return WIN - reward
+        cells = [moves & column for column in COLUMN_MASKS if moves & column]
+        position, mask = position ^ mask, mask | rng.choice(cells)
+        reward = WIN - reward
+
+
+class TreeSearch:
+    """
+    Monte Carlo tree search: every iteration selects a path down the tree, expands the leaf, plays a
+    random game from it and adds the result to the nodes of the path.
+
+    Attributes:
+    - root: node of the position to move from.
+    - exploration: exploration constant of the selection.
+    - selection: SELECTION_UCT or SELECTION_PUCT.
+    - rng: source of the random moves.
+    - iterations: iterations run since the search was created.
+    - max_depth: plies from the root to the deepest node an iteration reached.
+    """
+
+    def __init__(self, root: Node, exploration: float = DEFAULT_EXPLORATION, selection: str = SELECTION_UCT,
+                 rng=None):
+        if selection not in (SELECTION_UCT, SELECTION_PUCT):
+            raise ValueError(f'unknown selection {selection!r}')
+        self.root = root
+        self.exploration = exploration
+        self.selection = selection
+        self.rng = random if rng is None else rng
+        self.iterations = 0
+        self.max_depth = 0
+
+    def iterate(self):
+        """Runs one iteration: selection, expansion, rollout and backpropagation."""
+        node = self.root
+        depth = 0
+        while node.children and node.terminal is None:
+            node = node.select(self.exploration, self.selection)
+            depth += 1
+        if node.terminal is not None:
+            reward = node.terminal
+        else:
+            if node.visits:
+                node.expand()
+                node = node.select(self.exploration, self.selection)
+                depth += 1
+            reward = node.terminal
+            if reward is None:
+                reward = WIN - rollout(node.position, node.mask, self.rng)
+        if depth > self.max_depth:
+            self.max_depth = depth
+        while node is not None:
+            node.visits += 1
+            node.value += reward
+            reward = WIN - reward
+            node = node.parent
+        self.iterations += 1
+
+    def run(self, iterations: Optional[int] = None, time_budget: Optional[float] = None):
+        """
+        Iterates until the budget is used up, DEFAULT_ITERATIONS if neither budget is given.
+
+        Input parameters:
+        - iterations: maximum number of iterations.
+        - time_budget: maximum seconds, checked after every iteration.
+        """
+        if iterations is None and time_budget is None:
+            iterations = DEFAULT_ITERATIONS
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        done = 0
+        while iterations is None or done < iterations:
+            self.iterate()
+            done += 1
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        if not self.root.children and self.root.terminal is None:
+            self.root.expand()
+
+    def root_visits(self) -> List[Tuple[int, int, float]]:
+        """Column, visits and value of every child of the root."""
+        return [(child.col, child.visits, child.value) for child in self.root.children or ()]
+
+
+def get_mcts_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    Returns the process pool of the root parallel search. The pool is created on the first call and
+    reused by later calls, it is replaced when a different number of workers is requested.
+
+    Input parameters:
+    - workers: number of worker processes, default_workers() if None.
+    """
+    global _pool, _pool_workers
+    workers = default_workers() if workers is None else workers
+    if _pool is None or _pool_workers != workers:
+        shutdown_mcts_pool()
+        _pool = ProcessPoolExecutor(max_workers=workers)
+        _pool_workers = workers
+    return _pool
+
+
+def shutdown_mcts_pool():
+    """Stops the worker processes of the pool, the next parallel search starts a new pool."""
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown()
+    _pool = None
+    _pool_workers = 0
+
+
+atexit.register(shutdown_mcts_pool)
+
+
+def _search_tree(position: int, mask: int, iterations: Optional[int], time_budget: Optional[float],
+                 exploration: float, selection: str, seed: int) -> Tuple[List[Tuple[int, int, float]], int]:
+    """
+    Worker task of the root parallel search: builds a tree of its own for the position.
+
+    Returns:
+    - Tuple[List[Tuple[int, int, float]], int]: column, visits and value of the root children, and iterations run.
+    """
+    search = TreeSearch(Node(position, mask), exploration, selection, random.Random(seed))
+    search.run(iterations, time_budget)
+    return search.root_visits(), search.iterations
+
+
+class MCTSSavedState(SavedState):
+    """
+    State of the MCTS agent that is threaded between calls of generate_move_mcts, so the subtree of the
+    position that was reached is searched further instead of starting from an empty tree.
+
+    Attributes:
+    - root: root of the tree after the last move generated with this state, None before the first move.
+    - stats: SearchStats of the last move, nodes counts the iterations of all trees, depth the deepest
+      node an iteration of the own tree reached.
+    - reused_visits: visits the root already had from earlier moves when the last search started.
+    """
+
+    def __init__(self):
+        self.root: Optional[Node] = None
+        self.stats: Optional[SearchStats] = None
+        self.reused_visits = 0
+
+
+def generate_move_mcts(
+        board: np.ndarray, player: BoardPiece, saved_state: Optional[SavedState],
+        iterations: Optional[int] = None, time_budget: Optional[float] = None, workers: Optional[int] = None,
+        exploration: float = DEFAULT_EXPLORATION, selection: str = SELECTION_UCT, seed: Optional[int] = None
+) -> Tuple[PlayerAction, Optional[SavedState]]:
+    """
+    Chooses a move with Monte Carlo tree search, the column whose child was visited most often.
+    Immediate wins and single blocks are played without a search.
+
+    Input parameters:
+    - board: board in the ndarray format of game_utils.
+    - player: player to move.
+    - saved_state: MCTSSavedState of earlier moves, a new one is created if it is not one.
+    - iterations: iteration budget of every tree.
+    - time_budget: seconds per move, DEFAULT_ITERATIONS are run if neither budget is given.
+    - workers: number of trees searched at once, one of them in this process and the others in the
+      process pool of get_mcts_pool (root parallelisation: the visits of the root children are summed).
+      None or 1 searches a single tree.
+    - exploration: exploration constant of the selection.
+    - selection: SELECTION_UCT or SELECTION_PUCT.
+    - seed: seed of the random moves, the random module is used if None.
+
+    Returns:
+    - Tuple[PlayerAction, Optional[SavedState]]: column to play and the state for the next move.
+    """
+    saved_state = saved_state if isinstance(saved_state, MCTSSavedState) else MCTSSavedState()
+    bitboard = Bitboard.from_array(board)
+    position, mask = bitboard.player_position(player), bitboard.mask
+    if not possible_moves(mask):
+        raise ValueError('moves unavailable.')
+    start = time.perf_counter()
+    stats = SearchStats(depth=0)
+    saved_state.stats = stats
+
+    col = forced_move(position, mask)
+    if col is not None:
+        saved_state.root = None
+        saved_state.reused_visits = 0
+        stats.elapsed = time.perf_counter() - start
+        return PlayerAction(col), saved_state
+
+    root = saved_state.root.find(position, mask) if saved_state.root is not None else None
+    if root is None:
+        root = Node(position, mask)
+    root.parent = None
+    saved_state.root = root
+    saved_state.reused_visits = root.visits
+    rng = random if seed is None else random.Random(seed)
+    search = TreeSearch(root, exploration, selection, rng)
+
+    worker_results = []
+    if workers is not None and workers > 1:
+        with _pool_lock:
+            pool = get_mcts_pool(workers)
+            futures = [pool.submit(_search_tree, position, mask, iterations, time_budget, exploration, selection,
+                                   rng.getrandbits(32))
+                       for _ in range(workers - 1)]
+            search.run(iterations, time_budget)
+            worker_results = [future.result() for future in futures]
+    else:
+        search.run(iterations, time_budget)
+
+    totals = {col: (visits, value) for col, visits, value in search.root_visits()}
+    stats.nodes = search.iterations
+    for children, worker_iterations in worker_results:
+        stats.nodes += worker_iterations
+        for col, visits, value in children:
+            own_visits, own_value = totals.get(col, (0, 0.0))
+            totals[col] = (own_visits + visits, own_value + value)
+    # Most visits, the higher mean reward between columns with as many visits
+    col = max(totals, key=lambda c: (totals[c][0], totals[c][1] / totals[c][0] if totals[c][0] else 0.0))
+    stats.depth = search.max_depth
+    stats.elapsed = time.perf_counter() - start
+    return PlayerAction(col), saved_state
@@ -0,0 +1,130 @@
+import argparse
+import struct
+from typing import Dict, Optional
+import numpy as np
+from agents.agent_bitboard.bitboard import alignment
+from agents.agent_minimax.ordering import CENTER_ORDER
+from agents.agent_minimax.search import BitboardSearch, BOARD_WIDTH, BOTTOM_MASKS, COLUMN_MASKS, TOP_MASKS
+from agents.agent_minimax.transposition import TranspositionTable
+from agents.agent_minimax.symmetry import canonical_key, mirror_move
+
+# File layout: header, then the sorted uint64 keys, then one uint8 move per key
+BOOK_MAGIC = b'C4BK'
+BOOK_VERSION = 1
+HEADER_FORMAT = '<4sHHQ'  # magic, version, max ply, number of entries
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+DEFAULT_BOOK_PLY = 4
+DEFAULT_BOOK_DEPTH = 8
+
+
+class OpeningBook:
+    """
+    Opening book stored in a compact binary file and read through a memory map, so opening it
+    costs no time and only the pages touched by a lookup are read from disk.
+    Keys are canonical (see canonical_key), a lookup of a mirrored position mirrors the move.
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as file:
+            magic, version, max_ply, size = struct.unpack(HEADER_FORMAT, file.read(HEADER_SIZE))
+        if magic != BOOK_MAGIC or version != BOOK_VERSION:
+            raise ValueError(f'{path} is not an opening book of version {BOOK_VERSION}.')
+        self.path = path
+        self.max_ply = max_ply
+        if size:
+            self.keys = np.memmap(path, dtype='<u8', mode='r', offset=HEADER_SIZE, shape=(size,))
+            self.moves = np.memmap(path, dtype=np.uint8, mode='r', offset=HEADER_SIZE + 8 * size, shape=(size,))
+        else:
+            self.keys = np.zeros(0, dtype='<u8')
+            self.moves = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, position: int, mask: int) -> Optional[int]:
+        """
+        Looks up the best move of a position.
+
+        Input parameters:
+        - position: stones of the player to move.
+        - mask: stones of both players.
+
+        Returns:
+        - Optional[int]: column of the best move, None if the position is not in the book.
+        """
+        if mask.bit_count() > self.max_ply or not len(self.keys):
+            return None
+        key, mirrored = canonical_key(position, mask)
+        index = int(np.searchsorted(self.keys, np.uint64(key)))
+        if index == len(self.keys) or int(self.keys[index]) != key:
+            return None
+        move = int(self.moves[index])
+        return mirror_move(move) if mirrored else move
+
+
+def build_book(max_ply: int = DEFAULT_BOOK_PLY, depth: int = DEFAULT_BOOK_DEPTH) -> Dict[int, int]:
+    """
+    Searches every position with up to max_ply stones that is not decided yet.
+
+    Input parameters:
+    - max_ply: positions with at most this many stones are added to the book.
+    - depth: depth of the search of each position.
+
+    Returns:
+    - Dict[int, int]: canonical key -> best move in the orientation of the canonical key.
+    """
+    entries = {}
+    search = BitboardSearch(TranspositionTable())
+
+    def visit(position: int, mask: int, ply: int):
+        key, mirrored = canonical_key(position, mask)
+        if key in entries:
+            return
+        search.new_search()
+        scores = dict(search.root_scores(position, mask, depth))
+        best_score = max(scores.values())
+        # Ties go to the most central column, so the book does not depend on the search order
+        best_move = next(col for col in CENTER_ORDER if scores.get(col) == best_score)
+        entries[key] = mirror_move(best_move) if mirrored else best_move
+
+        if ply == max_ply:
+            return
+        for col in range(BOARD_WIDTH):
+            if mask & TOP_MASKS[col]:
+                continue
+            move = (mask + BOTTOM_MASKS[col]) & COLUMN_MASKS[col]
+            if alignment(position | move):
+                continue
+            visit(position ^ mask, mask | move, ply + 1)
+
+    visit(0, 0, 0)
+    return entries
+
+
+def write_book(path: str, entries: Dict[int, int], max_ply: int):
+    """
+    Writes book entries to a binary file that can be opened with OpeningBook.
+
+    Input parameters:
+    - path: file to write.
+    - entries: canonical key -> best move, as returned by build_book.
+    - max_ply: largest number of stones of a position in the book.
+    """
+    keys = np.array(sorted(entries), dtype='<u8')
+    moves = np.array([entries[int(key)] for key in keys], dtype=np.uint8)
+    with open(path, 'wb') as file:
+        file.write(struct.pack(HEADER_FORMAT, BOOK_MAGIC, BOOK_VERSION, max_ply, len(keys)))
+        file.write(keys.tobytes())
+        file.write(moves.tobytes())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the opening book of the minimax agent.')
+    parser.add_argument('output', help='path of the book file')
+    parser.add_argument('--ply', type=int, default=DEFAULT_BOOK_PLY, help='maximum number of stones')
+    parser.add_argument('--depth', type=int, default=DEFAULT_BOOK_DEPTH, help='search depth per position')
+    args = parser.parse_args()
+    book_entries = build_book(args.ply, args.depth)
+    write_book(args.output, book_entries, args.ply)
+    print(f'Wrote {len(book_entries)} positions to {args.output}')
@@ -0,0 +1,162 @@
+from typing import List, Tuple, Union
+import numpy as np
+from game_utils import BoardPiece, PLAYER1, PLAYER2
+
+BOARD_WIDTH = 7
+BOARD_HEIGHT = 6
+
+# Points of a window by number of own / opponent pieces, the same values as assign_scores
+OWN_POINTS = (0, 1, 50, 100, 0)
+OPP_POINTS = (0, -1, -50, -600, 0)
+# Change of the points when a window goes from n to n + 1 pieces of one player
+OWN_DELTAS = tuple(OWN_POINTS[n + 1] - OWN_POINTS[n] for n in range(4))
+OPP_DELTAS = tuple(OPP_POINTS[n + 1] - OPP_POINTS[n] for n in range(4))
+OWN_POINTS_ARRAY = np.array(OWN_POINTS, dtype=np.int64)
+OPP_POINTS_ARRAY = np.array(OPP_POINTS, dtype=np.int64)
+# Boards scored per step of score_boards, bounds the (chunk, 69, 4) temporaries
+SCORE_CHUNK_SIZE = 1 << 16
+
+
+def _cell_index(row: int, col: int) -> int:
+    """Bit index of a cell in the bitboard layout of agents.agent_bitboard."""
+    return row + col * (BOARD_HEIGHT + 1)
+
+
+def _window_cells() -> Tuple[Tuple[Tuple[int, int], ...], ...]:
+    """
+    Lists the 69 windows of four cells scored by score_board (vertical, horizontal
+    and both diagonals), each as a tuple of (row, col) cells.
+    """
+    windows = []
+    for row in range(BOARD_HEIGHT):
+        for col in range(BOARD_WIDTH):
+            for d_row, d_col in ((1, 0), (0, 1), (1, 1), (-1, 1)):
+                end_row, end_col = row + 3 * d_row, col + 3 * d_col
+                if 0 <= end_row < BOARD_HEIGHT and 0 <= end_col < BOARD_WIDTH:
+                    windows.append(tuple((row + i * d_row, col + i * d_col) for i in range(4)))
+    return tuple(windows)
+
+
+WINDOW_CELLS = _window_cells()
+# Windows as bit indices of the bitboard layout
+WINDOWS = tuple(tuple(_cell_index(row, col) for row, col in window) for window in WINDOW_CELLS)
+# Windows as indices into a flattened (6, 7) ndarray board, shape (69, 4)
+WINDOW_INDICES = np.array([[row * BOARD_WIDTH + col for row, col in window] for window in WINDOW_CELLS],
+                          dtype=np.intp)
+WINDOW_MASKS = tuple(sum(1 << cell for cell in window) for window in WINDOWS)
+# For every bit index the windows that contain the cell, at most 13 per cell
+CELL_WINDOWS = tuple(
+    tuple(index for index, window in enumerate(WINDOWS) if cell in window)
+    for cell in range(BOARD_WIDTH * (BOARD_HEIGHT + 1))
+)
+
+
+def evaluate(own: int, opp: int) -> int:
+    """
+    Heuristic score of a position for the player owning the stones in `own`.
+    It is the bitboard version of score_board: every window of four cells is
+    scored with the points of assign_scores.
+
+    Input parameters:
+    - own: position integer of the player we are scoring for.
+    - opp: position integer of the opponent.
+
+    Returns:
+    - int: the total score over all windows.
+    """
+    score = 0
+    for window in WINDOW_MASKS:
+        score += OWN_POINTS[(own & window).bit_count()] + OPP_POINTS[(opp & window).bit_count()]
+    return score
+
+
+class IncrementalEvaluator:
+    """
+    Keeps the window heuristic of score_board up to date while moves are made and undone.
+
+    The evaluator stores the number of pieces of both players in each of the 69 windows
+    and the running score of both players. Playing or undoing a stone only visits the
+    windows through that cell (at most 13), so the score of a leaf is read in O(1).
+    Players are indexed 0 and 1, scores[i] is the score from the point of view of player i.
+    """
+
+    def __init__(self):
+        self.counts: List[List[int]] = [[0] * len(WINDOWS), [0] * len(WINDOWS)]
+        self.scores: List[int] = [0, 0]
+
+    def reset(self, stones_0: int = 0, stones_1: int = 0):
+        """
+        Sets the evaluator to a position.
+
+        Input parameters:
+        - stones_0: position integer of player 0.
+        - stones_1: position integer of player 1.
+        """
+        self.counts = [[(stones_0 & window).bit_count() for window in WINDOW_MASKS],
+                       [(stones_1 & window).bit_count() for window in WINDOW_MASKS]]
+        self.scores = [evaluate(stones_0, stones_1), evaluate(stones_1, stones_0)]
+
+    def play(self, cell: int, player: int):
+        """
+        Adds a stone of player (0 or 1) at the bit index cell.
+        """
+        counts = self.counts[player]
+        own_delta = opp_delta = 0
+        for window in CELL_WINDOWS[cell]:
+            count = counts[window]
+            counts[window] = count + 1
+            own_delta += OWN_DELTAS[count]
+            opp_delta += OPP_DELTAS[count]
+        self.scores[player] += own_delta
+        self.scores[1 - player] += opp_delta
+
+    def undo(self, cell: int, player: int):
+        """
+        Removes the stone of player (0 or 1) at the bit index cell, the inverse of play.
+        """
+        counts = self.counts[player]
+        own_delta = opp_delta = 0
+        for window in CELL_WINDOWS[cell]:
+            count = counts[window] - 1
+            counts[window] = count
+            own_delta += OWN_DELTAS[count]
+            opp_delta += OPP_DELTAS[count]
+        self.scores[player] -= own_delta
+        self.scores[1 - player] -= opp_delta
+
+    def score(self, player: int) -> int:
+        """Returns the current score from the point of view of player (0 or 1)."""
+        return self.scores[player]
+
+
+def score_boards(boards: np.ndarray, player: BoardPiece) -> Union[int, np.ndarray]:
+    """
+    Vectorized score_board: scores one board or a whole stack of boards without a Python loop
+    over the windows. The points are the ones of assign_scores, including the x6 penalty on
+    the opponent's threes.
+
+    Input parameters:
+    - boards: np.array of shape (6, 7) or (N, 6, 7), in the format of game_utils.
+    - player: BoardPiece of the player the scores are calculated for.
+
+    Returns:
+    - int for a single board, np.ndarray of N int64 scores for a stack.
+    """
+    boards = np.asarray(boards)
+    if boards.shape[-2:] != (BOARD_HEIGHT, BOARD_WIDTH) or boards.ndim not in (2, 3):
+        raise ValueError(f'Expected a board of shape (6, 7) or a stack (N, 6, 7), got {boards.shape}.')
+    opp_player = PLAYER2 if player == PLAYER1 else PLAYER1
+
+    flat = boards.reshape(-1, BOARD_HEIGHT * BOARD_WIDTH)
+    scores = np.empty(len(flat), dtype=np.int64)
+    for start in range(0, len(flat), SCORE_CHUNK_SIZE):
+        # (chunk, 69, 4) pieces of every window of every board
+        windows = flat[start:start + SCORE_CHUNK_SIZE, WINDOW_INDICES]
+        player_count = np.count_nonzero(windows == player, axis=2)
+        opp_count = np.count_nonzero(windows == opp_player, axis=2)
+        scores[start:start + SCORE_CHUNK_SIZE] = \
+            (OWN_POINTS_ARRAY[player_count] + OPP_POINTS_ARRAY[opp_count]).sum(axis=1)
+
+    if boards.ndim == 2:
+        return int(scores[0])
+    return scores
@@ -0,0 +1,136 @@
+from collections import Counter
+from typing import List, Optional, Sequence, Tuple
+from agents.agent_minimax.ordering import MoveOrdering
+
+BOARD_HEIGHT = 6
+
+
+class SearchHooks:
+    """
+    Callbacks of the bitboard search, for profilers, tracers and tree dumps. Subclasses override the
+    events they need, the others do nothing.
+
+    Hooks cost nothing while they are not installed: BitboardSearch only switches to the traced
+    search when set_hooks is called, the plain search has no checks for them.
+    A node whose search is aborted by a timeout gets node_enter but no node_exit.
+    """
+
+    def search_start(self, position: int, mask: int, depth: int):
+        """A search of all root moves with depth starts at the root position (position, mask)."""
+
+    def node_enter(self, ply: int, depth: int, alpha: int, beta: int, position: int, mask: int):
+        """
+        A node is searched.
+
+        Input parameters:
+        - ply: distance from the root (root moves are at ply 1).
+        - depth: remaining depth.
+        - alpha, beta: search window.
+        - position: stones of the player to move.
+        - mask: stones of both players.
+        """
+
+    def node_exit(self, ply: int, depth: int, score: int):
+        """The search of the node entered last at this ply returned score."""
+
+    def leaf(self, ply: int, score: int):
+        """A node at the depth limit was scored by the heuristic."""
+
+    def cutoff(self, ply: int, col: int, depth: int):
+        """The move col caused a beta cutoff at a node with the remaining depth."""
+
+    def iteration_complete(self, depth: int, scores: List[Tuple[int, int]]):
+        """All root moves were searched with depth, scores are the (column, score) pairs of root_scores."""
+
+
+class HookedOrdering(MoveOrdering):
+    """Move ordering that reports the cutoffs of the search to hooks before passing them on."""
+
+    def __init__(self, ordering: MoveOrdering, hooks: SearchHooks):
+        self.ordering = ordering
+        self.hooks = hooks
+
+    def new_search(self):
+        self.ordering.new_search()
+
+    def order(self, ply: int, tt_move: Optional[int], mask: int) -> Sequence[int]:
+        return self.ordering.order(ply, tt_move, mask)
+
+    def cutoff(self, ply: int, col: int, mask: int, depth: int):
+        self.hooks.cutoff(ply, col, depth)
+        self.ordering.cutoff(ply, col, mask, depth)
+
+
+def _played_column(mask: int, parent_mask: int) -> int:
+    """Column of the stone that is in mask but not in parent_mask."""
+    return ((mask ^ parent_mask).bit_length() - 1) // (BOARD_HEIGHT + 1)
+
+
+class _PathTracker(SearchHooks):
+    """Keeps the moves from the root to the current node, up to max_ply."""
+
+    def __init__(self, max_ply: int):
+        self.max_ply = max_ply
+        self._path: List[int] = []
+        self._masks: List[int] = []
+
+    def search_start(self, position: int, mask: int, depth: int):
+        self._path = []
+        self._masks = [mask]
+
+    def _enter(self, ply: int, mask: int):
+        if ply <= self.max_ply:
+            del self._masks[ply:]
+            del self._path[ply - 1:]
+            self._path.append(_played_column(mask, self._masks[-1]))
+            self._masks.append(mask)
+
+
+class TreeRecorder(_PathTracker):
+    """
+    Records the explored tree, one line per node: the moves leading to it, the remaining depth,
+    the window and the score. Only nodes up to max_ply are recorded, so the dump stays readable.
+    """
+
+    def __init__(self, max_ply: int = 2):
+        super().__init__(max_ply)
+        self.lines: List[str] = []
+        self._open: List[int] = []
+
+    def search_start(self, position: int, mask: int, depth: int):
+        super().search_start(position, mask, depth)
+        self.lines.append(f'search depth {depth}')
+
+    def node_enter(self, ply: int, depth: int, alpha: int, beta: int, position: int, mask: int):
+        self._enter(ply, mask)
+        if ply <= self.max_ply:
+            self._open.append(len(self.lines))
+            moves = ' '.join(map(str, self._path))
+            self.lines.append(f'{"  " * ply}{moves} depth {depth} window ({alpha}, {beta})')
+
+    def node_exit(self, ply: int, depth: int, score: int):
+        if ply <= self.max_ply:
+            self.lines[self._open.pop()] += f' -> {score}'
+
+    def dump(self) -> str:
+        return '\n'.join(self.lines)
+
+
+class FoldedStackRecorder(_PathTracker):
+    """
+    Counts the nodes below every path of moves, in the folded stack format of flame graph tools
+    (one line 'root;move;move count' per path). Paths are cut at max_ply, deeper nodes are counted
+    on the path of their ancestor.
+    """
+
+    def __init__(self, max_ply: int = 4):
+        super().__init__(max_ply)
+        self.counts = Counter()
+
+    def node_enter(self, ply: int, depth: int, alpha: int, beta: int, position: int, mask: int):
+        self._enter(ply, mask)
+        self.counts[';'.join(['root'] + [str(col) for col in self._path])] += 1
+
+    def folded(self) -> str:
+        """The counts as folded stacks, e.g. for flamegraph.pl or speedscope."""
+        return '\n'.join(f'{path} {count}' for path, count in sorted(self.counts.items()))
@@ -0,0 +1,284 @@
+import atexit
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+import numpy as np
+from agents.agent_minimax.ordering import HeuristicMoveOrdering
+from agents.agent_minimax.parallel import default_workers
+from agents.agent_minimax.search import BitboardSearch
+from agents.agent_minimax.stats import SearchStats
+from agents.agent_minimax.transposition import Entry
+
+DEFAULT_SHARED_CAPACITY = 1 << 20
+
+# Shared memory layout: header words, then two uint64 words per slot (key ^ data, data)
+HEADER_WORDS = 1  # generation of the table
+SLOT_WORDS = 2
+
+# Fields packed into the data word of a slot
+SCORE_OFFSET = 1 << 31
+SCORE_MASK = (1 << 32) - 1
+DEPTH_SHIFT = 32
+BOUND_SHIFT = 40
+MOVE_SHIFT = 42  # column + 1, 0 for no move
+GENERATION_SHIFT = 46
+GENERATION_MASK = (1 << 16) - 1
+
+# Static column orders of the helpers, helper i uses HELPER_ORDERS[i % len(HELPER_ORDERS)]
+HELPER_ORDERS = (
+    (3, 2, 4, 1, 5, 0, 6),
+    (3, 4, 2, 5, 1, 6, 0),
+    (2, 3, 4, 1, 5, 0, 6),
+    (4, 3, 2, 5, 1, 6, 0),
+)
+
+
+class SharedTranspositionTable:
+    """
+    Transposition table in a fixed-size array of shared memory, so that processes searching at the
+    same time read each other's results. It has the interface of TranspositionTable.
+
+    The table is lock-free: a slot holds the data word (score, depth, bound, best move, generation)
+    and the key xor the data word. A slot whose two words were written by different processes at the
+    same time fails the key check and is read as empty, so a torn entry is never returned.
+    The replacement scheme is the one of TranspositionTable. The probe and hit counters belong to
+    the process, the generation is shared.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_SHARED_CAPACITY, name: Optional[str] = None):
+        """
+        Creates a new table, or attaches to the table created by another process if name is given.
+
+        Input parameters:
+        - capacity: number of slots, the same as the one of the table that is attached to.
+        - name: name of the shared memory block of an existing table.
+        """
+        if capacity <= 0:
+            raise ValueError('Capacity must be positive.')
+        size = 8 * (HEADER_WORDS + SLOT_WORDS * capacity)
+        self.capacity = capacity
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        if self.shm.size < size:
+            self.shm.close()
+            raise ValueError(f'Shared memory block {name} is too small for {capacity} slots.')
+        self.words = self.shm.buf.cast('Q')
+        if self.owner:
+            self.words[0] = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory block, used by other processes to attach to the table."""
+        return self.shm.name
+
+    @property
+    def generation(self) -> int:
+        return self.words[0]
+
+    def new_search(self):
+        """Marks the start of a new search for all processes, entries of earlier searches become replaceable."""
+        self.words[0] = (self.words[0] + 1) & GENERATION_MASK
+
+    def probe(self, key: int) -> Optional[Entry]:
+        """
+        Looks up a position.
+
+        Input parameters:
+        - key: unique key of the position.
+
+        Returns:
+        - Optional[Entry]: the stored entry, or None if the position is not in the table.
+        """
+        self.probes += 1
+        index = HEADER_WORDS + SLOT_WORDS * (key % self.capacity)
+        data = self.words[index + 1]
+        if data and self.words[index] ^ data == key:
+            self.hits += 1
+            move = (data >> MOVE_SHIFT) & 15
+            return (key, (data & SCORE_MASK) - SCORE_OFFSET, (data >> DEPTH_SHIFT) & 255,
+                    (data >> BOUND_SHIFT) & 3, move - 1 if move else None, data >> GENERATION_SHIFT)
+        return None
+
+    def store(self, key: int, score: int, depth: int, bound: int, best_move: Optional[int]):
+        """
+        Stores the result of a search, unless the slot holds a deeper entry of the current search.
+
+        Input parameters:
+        - key: unique key of the position.
+        - score: score of the position for the player to move.
+        - depth: remaining depth the score was searched with.
+        - bound: EXACT, LOWER or UPPER.
+        - best_move: column of the best move found, None if there is none.
+        """
+        words = self.words
+        index = HEADER_WORDS + SLOT_WORDS * (key % self.capacity)
+        generation = words[0]
+        old_data = words[index + 1]
+        if (old_data and words[index] ^ old_data != key and old_data >> GENERATION_SHIFT == generation
+                and depth < (old_data >> DEPTH_SHIFT) & 255):
+            return
+        data = ((score + SCORE_OFFSET) | depth << DEPTH_SHIFT | bound << BOUND_SHIFT
+                | (0 if best_move is None else best_move + 1) << MOVE_SHIFT | generation << GENERATION_SHIFT)
+        words[index] = key ^ data
+        words[index + 1] = data
+        self.stores += 1
+
+    def clear(self):
+        """Removes all entries and resets the counters."""
+        self.shm.buf[:] = bytes(self.shm.size)
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of probes that found their position, 0.0 before the first probe."""
+        return self.hits / self.probes if self.probes else 0.0
+
+    def __len__(self) -> int:
+        data = np.frombuffer(self.shm.buf, dtype=np.uint64, offset=8 * HEADER_WORDS)[1::SLOT_WORDS]
+        count = int(np.count_nonzero(data))
+        del data
+        return count
+
+    def close(self):
+        """Detaches this process from the table, the creating process also frees the shared memory."""
+        self.words.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_table: Optional[SharedTranspositionTable] = None
+_stop = None
+# One Lazy-SMP search at a time, they share the table and the stop flag of the pool
+_pool_lock = threading.Lock()
+
+# State of a worker process, set by _init_worker
+_worker_table: Optional[SharedTranspositionTable] = None
+_worker_stop = None
+
+
+def get_smp_pool(workers: Optional[int] = None,
+                 capacity: int = DEFAULT_SHARED_CAPACITY) -> Tuple[ProcessPoolExecutor, SharedTranspositionTable]:
+    """
+    Returns the process pool of the Lazy-SMP search and the shared table of its workers. Both are created
+    on the first call and reused by later calls, they are replaced when another size is requested.
+
+    Input parameters:
+    - workers: number of worker processes, default_workers() if None.
+    - capacity: number of slots of the shared transposition table.
+    """
+    global _pool, _pool_workers, _table, _stop
+    workers = default_workers() if workers is None else workers
+    if _pool is None or _pool_workers != workers or _table.capacity != capacity:
+        shutdown_smp_pool()
+        _table = SharedTranspositionTable(capacity)
+        _stop = multiprocessing.Value('b', 0)
+        _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                    initargs=(_table.name, capacity, _stop))
+        _pool_workers = workers
+    return _pool, _table
+
+
+def shutdown_smp_pool():
+    """Stops the worker processes and frees the shared table, the next search starts a new pool."""
+    global _pool, _pool_workers, _table
+    if _pool is not None:
+        _pool.shutdown()
+    if _table is not None:
+        _table.close()
+    _pool = None
+    _pool_workers = 0
+    _table = None
+
+
+atexit.register(shutdown_smp_pool)
+
+
+def _init_worker(table_name: str, capacity: int, stop):
+    global _worker_table, _worker_stop
+    _worker_table = SharedTranspositionTable(capacity, table_name)
+    _worker_stop = stop
+
+
+def _helper_search(position: int, mask: int, helper: int, time_budget: float,
+                   max_depth: Optional[int]) -> Tuple[int, List[Tuple[int, int]], int, SearchStats]:
+    """
+    Worker task: iterative deepening of the root with the shared table. Odd helpers start one ply
+    deeper and every helper has its own static column order, so the helpers do not walk the same
+    tree in lockstep and fill the table for each other.
+
+    Returns:
+    - Tuple[int, List[Tuple[int, int]], int, SearchStats]: helper index, root scores and depth of the last
+      completed iteration, and the statistics of the search.
+    """
+    ordering = HeuristicMoveOrdering(static_order=HELPER_ORDERS[helper % len(HELPER_ORDERS)])
+    search = BitboardSearch(_worker_table, ordering)
+    search.stop = lambda: _worker_stop.value
+    scores, completed_depth = search.iterative_deepening(position, mask, time_budget, max_depth, helper % 2)
+    return helper, scores, completed_depth, search.statistics()
+
+
+def lazy_smp_search(position: int, mask: int, depth: Optional[int] = None, time_budget: Optional[float] = None,
+                    max_depth: Optional[int] = None, workers: Optional[int] = None,
+                    capacity: int = DEFAULT_SHARED_CAPACITY,
+                    stats: Optional[SearchStats] = None) -> Tuple[List[Tuple[int, int]], int, int]:
+    """
+    Lazy-SMP search: every worker searches the whole root position with iterative deepening, at
+    staggered depths and with different move orders, and all of them share one transposition table.
+    The first worker that finishes stops the others, the deepest completed iteration is returned.
+
+    Input parameters:
+    - position: stones of the player to move.
+    - mask: stones of both players.
+    - depth: depth of a fixed-depth search, used if time_budget is None.
+    - time_budget: seconds for an anytime search.
+    - max_depth: optional depth limit of the anytime search.
+    - workers: number of worker processes.
+    - capacity: number of slots of the shared transposition table.
+    - stats: optional SearchStats the statistics of the workers are merged into.
+
+    Returns:
+    - Tuple[List[Tuple[int, int]], int, int]: root scores (see BitboardSearch.root_scores), their depth
+      and the nodes searched by all workers.
+    """
+    if time_budget is None:
+        if depth is None:
+            raise ValueError('Either a depth or a time budget is needed.')
+        time_budget, max_depth = float('inf'), depth
+
+    with _pool_lock:
+        pool, table = get_smp_pool(workers, capacity)
+        table.new_search()
+        _stop.value = 0
+        futures = [pool.submit(_helper_search, position, mask, helper, time_budget, max_depth)
+                   for helper in range(_pool_workers)]
+        results, nodes = [], 0
+        for future in as_completed(futures):
+            helper, scores, completed_depth, helper_stats = future.result()
+            _stop.value = 1
+            nodes += helper_stats.nodes
+            if stats is not None:
+                stats.merge(helper_stats)
+                stats.searches -= 1
+            results.append((completed_depth, -helper, scores))
+    completed_depth, _, scores = max(results, key=lambda result: result[:2])
+    return scores, completed_depth, nodes
+
+
+if __name__ == '__main__':
+    for workers_count in (1, 2, default_workers()):
+        start = time.perf_counter()
+        root_scores, reached_depth, searched = lazy_smp_search(0, 0, time_budget=2.0, workers=workers_count)
+        print(f'{workers_count} workers: depth {reached_depth}, {searched} nodes '
+              f'in {time.perf_counter() - start:.2f} s, {root_scores}')
+    shutdown_smp_pool()
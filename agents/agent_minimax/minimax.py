@@ -1,8 +1,104 @@
-from typing import Tuple
+import time
+from typing import Callable, Optional, Tuple
 import numpy as np
-from game_utils import BoardPiece, PlayerAction, SavedState, NO_PLAYER, PLAYER1, PLAYER2, connected_four
+from game_utils import BoardPiece, PlayerAction, SavedState, NO_PLAYER, PLAYER1, PLAYER2, connected_four, \
+    connected_four_at
+from agents.agent_bitboard.bitboard import Bitboard
+from agents.agent_minimax.search import BitboardSearch, TOP_MASKS
+from agents.agent_minimax.transposition import TranspositionTable, DEFAULT_CAPACITY
+from agents.agent_minimax.book import OpeningBook
+from agents.agent_minimax.solver import Solver, SOLVER_EMPTY_CELLS
+from agents.agent_minimax.parallel import parallel_root_scores, parallel_iterative_deepening
+from agents.agent_minimax.lazy_smp import lazy_smp_search
+from agents.agent_minimax.stats import SearchStats
+from agents.agent_minimax.hooks import SearchHooks
+from agents.agent_minimax.ponder import Ponderer, PonderResult
+from agents.agent_minimax.symmetry import is_symmetric_board
+from agents.agent_minimax.threats import forced_move
 
-def generate_move_minimax(board: np.ndarray, player: BoardPiece, saved_state: SavedState) -> Tuple[PlayerAction, SavedState, int]:
+ENGINE_BITBOARD = 'bitboard'
+ENGINE_NDARRAY = 'ndarray'
+DEFAULT_DEPTH = 6
+
+
+class MinimaxSavedState(SavedState):
+    """
+    State of the minimax agent that is threaded between calls of generate_move_minimax,
+    so search results of one move are reused by the next moves of the game.
+
+    Attributes:
+    - transposition_table: TranspositionTable shared by all searches of the game.
+    - solver_table: TranspositionTable of the exact solver, its scores are not heuristic scores.
+    - stats: SearchStats of the last move generated with this state.
+    - ponderer: Ponderer searching on the opponent's time (see start_pondering), None if it does not.
+    - ponder_hit: True if the last move reused the search of a correctly predicted reply.
+    """
+
+    def __init__(self, tt_capacity: int = DEFAULT_CAPACITY, solver_capacity: int = DEFAULT_CAPACITY >> 2):
+        self.transposition_table = TranspositionTable(tt_capacity)
+        self.solver_table = TranspositionTable(solver_capacity)
+        self.stats: Optional[SearchStats] = None
+        self.ponderer: Optional[Ponderer] = None
+        self.ponder_hit = False
+
+
+def minimax_saved_state(saved_state) -> MinimaxSavedState:
+    """Returns saved_state if it was created by this agent, otherwise a fresh MinimaxSavedState."""
+    if isinstance(saved_state, MinimaxSavedState):
+        return saved_state
+    return MinimaxSavedState()
+
+
+def start_pondering(board: np.ndarray, player: BoardPiece, saved_state: SavedState,
+                    max_depth: Optional[int] = None) -> MinimaxSavedState:
+    """
+    Starts searching on the opponent's time, after the engine played its move. The next call of
+    generate_move_bitboard with this state stops the search; if the opponent played the predicted
+    reply, its result is reused, otherwise only its transposition table entries are.
+
+    Input parameters:
+    - board: the board after the engine's move, the opponent is to move.
+    - player: the player of the engine.
+    - saved_state: state of the engine, replaced by a new MinimaxSavedState if it is not one.
+    - max_depth: optional depth limit of the pondering search.
+
+    Returns:
+    - MinimaxSavedState: the state of the engine, to be passed to its next move.
+    """
+    saved_state = minimax_saved_state(saved_state)
+    stop_pondering(saved_state)
+    bitboard = Bitboard.from_array(board)
+    opponent = PLAYER2 if player == PLAYER1 else PLAYER1
+    saved_state.ponderer = Ponderer(saved_state.transposition_table, bitboard.player_position(opponent),
+                                    bitboard.mask, max_depth).start()
+    return saved_state
+
+
+def stop_pondering(saved_state: SavedState) -> Optional[PonderResult]:
+    """
+    Stops the pondering search of saved_state, e.g. at the end of a game.
+
+    Returns:
+    - Optional[PonderResult]: the result of the search, None if there was none.
+    """
+    if not isinstance(saved_state, MinimaxSavedState) or saved_state.ponderer is None:
+        return None
+    result = saved_state.ponderer.stop()
+    saved_state.ponderer = None
+    return result
+
+def generate_move_minimax(board: np.ndarray, player: BoardPiece, saved_state: SavedState,
+                          engine: str = ENGINE_NDARRAY, depth: int = DEFAULT_DEPTH,
+                          time_budget: Optional[float] = None,
+                          max_depth: Optional[int] = None,
+                          book: Optional[OpeningBook] = None,
+                          solve: Optional[bool] = None,
+                          workers: Optional[int] = None,
+                          lazy_smp: bool = False,
+                          hooks: Optional[SearchHooks] = None,
+                          stop: Optional[Callable[[], bool]] = None,
+                          max_nodes: Optional[int] = None,
+                          seed: Optional[int] = None) -> Tuple[PlayerAction, SavedState, int]:
     """
     Generate the best move.
 
@@ -10,42 +106,310 @@ def generate_move_minimax(board: np.ndarray, player: BoardPiece, saved_state: Sa
     - board: np.array of the current board.
     - player (BoardPiece): Represents the player for whom the move is generated.
     - saved_state (SavedState): Represents the state of the game that might affect move generation.
+    - engine: 'ndarray' runs the original search on copies of the array, 'bitboard' converts the board
+      once and searches on bitboards (board[0, :] is the lowest row, as in game_utils).
+    - depth: number of plies searched below each root move.
+    - time_budget: seconds for an anytime search with iterative deepening (bitboard engine only).
+      depth is ignored then, the move of the deepest completed iteration is returned.
+    - max_depth: optional depth limit of the anytime search.
+    - book: optional OpeningBook, positions found in it are answered without a search (bitboard engine only).
+    - solve: True plays perfectly with the exact solver instead of the heuristic search, False never does,
+      None (default) switches the solver on when at most SOLVER_EMPTY_CELLS cells are empty (bitboard engine only).
+    - workers: with more than one worker the root columns are searched in parallel in a persistent
+      process pool (bitboard engine only).
+    - lazy_smp: with more than one worker, every worker searches the whole position and the workers share
+      a transposition table in shared memory, instead of splitting the root columns (bitboard engine only).
+    - hooks: optional SearchHooks called by the search, e.g. to trace or profile it (bitboard engine
+      searching in this process only).
+    - stop: optional callable, the search is cancelled once it returns True (bitboard engine searching in
+      this process only). An anytime search returns its last completed iteration, a fixed-depth search
+      raises SearchTimeout.
+    - max_nodes: node budget of an anytime search with iterative deepening, like time_budget but the same on
+      every machine; without time_budget the move only depends on the position (bitboard engine searching in
+      this process only). depth is ignored then.
+    - seed: seed of the random choice between equally scored moves, None uses the global np.random state.
 
     Steps:
     - Columns for each of the possible moves are considered.
-    - Each of these moves is evaluated by the minimax.
+    - A move that wins at once, or else the only move that blocks an immediate win of the opponent,
+      is returned without a search.
+    - Otherwise each of these moves is evaluated by the minimax.
     - Column index with the best move is returned.
 
     Returns:
     - Tuple[PlayerAction, SavedState, int]: Best move, game state, and number of evaluated moves are returned.
     """
-    def minimax(board: np.ndarray, depth: int, alpha: float, beta: float, maximizing_player: bool, saved_state: SavedState, player: BoardPiece) -> float:
+    if engine == ENGINE_BITBOARD:
+        return generate_move_bitboard(board, player, saved_state, depth, time_budget, max_depth, book, solve,
+                                      workers, lazy_smp, hooks, stop, max_nodes, seed)
+    if engine != ENGINE_NDARRAY:
+        raise ValueError(f'Unknown search engine: {engine}')
+    if (time_budget is not None or book is not None or solve or workers is not None or lazy_smp
+            or hooks is not None or stop is not None or max_nodes is not None):
+        raise ValueError('Time budgets, opening books, the solver, workers, Lazy-SMP, hooks, stop and node '
+                         'budgets are only supported by the bitboard engine.')
+    return generate_move_ndarray(board, player, saved_state, depth, seed)
+
+
+def generate_move_bitboard(board: np.ndarray, player: BoardPiece, saved_state: SavedState,
+                           depth: int = DEFAULT_DEPTH, time_budget: Optional[float] = None,
+                           max_depth: Optional[int] = None,
+                           book: Optional[OpeningBook] = None,
+                           solve: Optional[bool] = None,
+                           workers: Optional[int] = None,
+                           lazy_smp: bool = False,
+                           hooks: Optional[SearchHooks] = None,
+                           stop: Optional[Callable[[], bool]] = None,
+                           max_nodes: Optional[int] = None,
+                           seed: Optional[int] = None) -> Tuple[PlayerAction, SavedState, int]:
+    """
+    Generate the best move with the bitboard search.
+
+    Input parameters:
+    - board: np.array of the current board, converted once to the Bitboard representation.
+    - player (BoardPiece): Represents the player for whom the move is generated.
+    - saved_state (SavedState): A MinimaxSavedState returned by an earlier call keeps its transposition table,
+      any other value is replaced by a new MinimaxSavedState.
+    - depth: number of plies searched below each root move.
+    - time_budget: seconds for an anytime search with iterative deepening, None for a fixed-depth search.
+    - max_depth: optional depth limit of the anytime search.
+    - book: optional OpeningBook that is consulted before the search.
+    - solve: True uses the exact solver, False the heuristic search, None the solver once at most
+      SOLVER_EMPTY_CELLS cells are empty.
+    - workers: number of processes of the parallel root search, None or 1 searches in this process.
+      The workers keep their own transposition tables, the one of saved_state is not used then.
+    - lazy_smp: the workers search the whole position with a shared table (see lazy_smp_search)
+      instead of one root column each.
+    - hooks: optional SearchHooks installed in the search, not supported with more than one worker.
+    - stop: optional callable that cancels the search once it returns True, not supported with more
+      than one worker.
+    - max_nodes: node budget of an anytime search, alone or together with time_budget (whichever is used up
+      first), not supported with more than one worker.
+    - seed: seed of the random choice between equally scored moves.
+
+    Returns:
+    - Tuple[PlayerAction, SavedState, int]: Best move, game state, and number of evaluated moves are returned.
+      A move from the book counts zero evaluated moves, a forced move (see threats.forced_move) counts the
+      legal moves it was chosen from. The SearchStats of the move are in saved_state.stats.
+      If saved_state was pondering (see start_pondering) and the predicted reply was played, a pondered
+      search that is deep enough, or took the whole time budget, is answered at once.
+    """
+    if (hooks is not None or stop is not None or max_nodes is not None) and workers is not None and workers > 1:
+        raise ValueError('Hooks, stop and node budgets are only supported by the search in this process, '
+                         'not by workers.')
+    rng = np.random if seed is None else np.random.default_rng(seed)
+    saved_state = minimax_saved_state(saved_state)
+    start = time.perf_counter()
+    pondered = stop_pondering(saved_state)
+    saved_state.ponder_hit = False
+    stats = saved_state.stats = SearchStats()
+    bitboard = Bitboard.from_array(board)
+    position = bitboard.player_position(player)
+    if book is not None:
+        book_move = book.lookup(position, bitboard.mask)
+        # Bitboard.can_play only sees a column as full once a seventh stone was played, TOP_MASKS is exact
+        if book_move is not None and not bitboard.mask & TOP_MASKS[book_move]:
+            stats.elapsed = time.perf_counter() - start
+            return PlayerAction(book_move), saved_state, 0
+
+    legal_moves = sum(not bitboard.mask & TOP_MASKS[col] for col in range(bitboard.width))
+    # An immediate win or the only block is played without a search
+    forced = forced_move(position, bitboard.mask)
+    if forced is not None:
+        stats.depth, stats.elapsed = 0, time.perf_counter() - start
+        return PlayerAction(forced), saved_state, legal_moves
+
+    if solve is None:
+        solve = bitboard.width * bitboard.height - bitboard.moves <= SOLVER_EMPTY_CELLS
+    if solve:
+        table = saved_state.solver_table
+        probes, hits = table.probes, table.hits
+        solver = Solver(table)
+        _, best_moves = solver.best_moves(position, bitboard.mask)
+        stats.nodes, stats.tt_probes, stats.tt_hits = solver.nodes, table.probes - probes, table.hits - hits
+        stats.depth = bitboard.width * bitboard.height - bitboard.moves
+        stats.elapsed = time.perf_counter() - start
+        if not best_moves:
+            return None, saved_state, 0
+        return PlayerAction(rng.choice(best_moves)), saved_state, legal_moves
+
+    root_scores = None
+    if pondered is not None and (pondered.position, pondered.mask) == (position, bitboard.mask):
+        saved_state.ponder_hit = True
+        if max_nodes is not None:
+            searched_enough = pondered.stats.nodes >= max_nodes
+        elif time_budget is None:
+            searched_enough = pondered.depth >= depth
+        else:
+            searched_enough = (pondered.elapsed >= time_budget
+                               or (max_depth is not None and pondered.depth >= max_depth))
+        if searched_enough:
+            root_scores = pondered.scores
+            stats.merge(pondered.stats)
+            stats.depth, stats.searches = pondered.depth, 1
+        elif time_budget is not None:
+            # The time spent pondering counts for the move, the search continues on the filled table
+            time_budget -= pondered.elapsed
+
+    if root_scores is None:
+        if workers is not None and workers > 1 and lazy_smp:
+            root_scores, stats.depth, _ = lazy_smp_search(position, bitboard.mask, depth, time_budget, max_depth,
+                                                          workers, stats=stats)
+        elif workers is not None and workers > 1:
+            if time_budget is None:
+                root_scores, _ = parallel_root_scores(position, bitboard.mask, depth, workers, stats=stats)
+                stats.depth = depth
+            else:
+                root_scores, stats.depth = parallel_iterative_deepening(position, bitboard.mask, time_budget,
+                                                                        max_depth, workers, stats=stats)
+        else:
+            root_scores = _serial_root_scores(position, bitboard.mask, saved_state, depth, time_budget, max_depth,
+                                              stats, hooks, stop, max_nodes)
+    stats.elapsed = time.perf_counter() - start
+    if not root_scores:
+        return None, saved_state, 0
+
+    best_score = max(score for _, score in root_scores)
+    equal_moves = [col for col, score in root_scores if score == best_score]
+    best_move = PlayerAction(rng.choice(equal_moves))
+    return best_move, saved_state, len(root_scores)
+
+
+def _serial_root_scores(position: int, mask: int, saved_state: MinimaxSavedState, depth: int,
+                        time_budget: Optional[float], max_depth: Optional[int], stats: SearchStats,
+                        hooks: Optional[SearchHooks] = None, stop: Optional[Callable[[], bool]] = None,
+                        max_nodes: Optional[int] = None):
+    """
+    Root scores of the bitboard search in this process, with the transposition table of saved_state.
+    The counters of the search are merged into stats.
+    """
+    search = BitboardSearch(saved_state.transposition_table, hooks=hooks)
+    search.new_search()
+    search.stop = stop
+    if time_budget is None and max_nodes is not None:
+        time_budget = float('inf')
+    if time_budget is None:
+        # stop is read together with the clock, a deadline that never passes makes the search read it
+        search.deadline = None if stop is None else float('inf')
+        try:
+            root_scores, completed_depth = search.root_scores(position, mask, depth), depth
+        finally:
+            search.deadline = None
+    else:
+        root_scores, completed_depth = search.iterative_deepening(position, mask, time_budget, max_depth,
+                                                                  max_nodes=max_nodes)
+    stats.merge(search.statistics())
+    stats.depth = completed_depth
+    stats.searches = 1
+    return root_scores
+
+
+class InPlaceBoard:
+    """
+    The one board buffer of the ndarray search. Moves are made and taken back in place, so no node copies
+    the board, and the landing row of a column is found in O(1) instead of scanning the column.
+
+    The search drops a stone into the highest empty row of a column, like the original search that played
+    np.where(board[:, col] == 0)[0][-1]. free_rows holds the empty rows of every column in that order and
+    heights the number of stones the search dropped into it, so free_rows[col][heights[col]] is the landing row.
+    """
+
+    def __init__(self, board: np.ndarray):
+        """Copies board once, the caller's board is never modified."""
+        rows, columns = board.shape
+        self.board = board.copy()
+        self.free_rows = [[row for row in range(rows - 1, -1, -1) if board[row, col] == NO_PLAYER]
+                          for col in range(columns)]
+        self.heights = [0] * columns
+
+    def can_play(self, col: int) -> bool:
+        return self.heights[col] < len(self.free_rows[col])
+
+    def play(self, col: int, piece: BoardPiece):
+        """Drops piece into col, which must be playable."""
+        self.board[self.free_rows[col][self.heights[col]], col] = piece
+        self.heights[col] += 1
+
+    def last_row(self, col: int) -> int:
+        """Row of the last stone the search dropped into col."""
+        return self.free_rows[col][self.heights[col] - 1]
+
+    def undo(self, col: int):
+        """Takes back the last stone the search dropped into col."""
+        self.heights[col] -= 1
+        self.board[self.free_rows[col][self.heights[col]], col] = NO_PLAYER
+
+
+def generate_move_ndarray(board: np.ndarray, player: BoardPiece, saved_state: SavedState,
+                          depth: int = DEFAULT_DEPTH,
+                          seed: Optional[int] = None) -> Tuple[PlayerAction, SavedState, int]:
+    """
+    Generate the best move with the original search on the ndarray board. Moves are made and taken
+    back on one InPlaceBoard instead of copies of the board. If the board is its own mirror image,
+    a column right of the middle gets the score of its mirror image without a search. A move that
+    wins at once, or the only block of an immediate win of the opponent, is played without a search.
+
+    Input parameters:
+    - board: np.array of the current board.
+    - player (BoardPiece): Represents the player for whom the move is generated.
+    - saved_state (SavedState): A MinimaxSavedState returned by an earlier call is kept, any other value is
+      replaced by a new MinimaxSavedState.
+    - depth: number of plies searched below each root move.
+    - seed: seed of the random choice between equally scored moves, None uses the global np.random state.
+
+    Returns:
+    - Tuple[PlayerAction, SavedState, int]: Best move, game state, and number of evaluated moves are returned.
+      The SearchStats of the move are in saved_state.stats, as with the bitboard engine.
+    """
+    saved_state = minimax_saved_state(saved_state)
+    start = time.perf_counter()
+    # The root and the nodes at each ply below it, the root moves are at ply 1 and the leaves at ply depth + 1
+    stats = saved_state.stats = SearchStats(nodes_per_depth=[1] + [0] * (depth + 1), depth=depth)
+    bitboard = Bitboard.from_array(board)
+    forced = forced_move(bitboard.player_position(player), bitboard.mask)
+    if forced is not None:
+        stats.nodes, stats.nodes_per_depth, stats.depth = 0, [], 0
+        stats.elapsed = time.perf_counter() - start
+        return PlayerAction(forced), saved_state, int(np.count_nonzero((board == NO_PLAYER).any(axis=0)))
+
+    buffer = InPlaceBoard(board)
+    columns = range(board.shape[1])
+    # The search only adds stones of player, so a new four of player goes through the stone just played
+    # and is found by the check of its four lines. A four that is on the board already is found once here.
+    root_four = connected_four(board, player)
+    nodes_per_depth = stats.nodes_per_depth
+    search_depth = depth
+
+    def minimax(depth: int, alpha: float, beta: float, maximizing_player: bool, saved_state: SavedState,
+                player: BoardPiece, last_col: int) -> float:
         """
-        Applies the minimax algorithm to determine the best move for a player.
+        Applies the minimax algorithm to determine the best move for a player, on the position of buffer.
 
         Input parameters:
-        - board: np.ndarray of the current board.
         - depth: int of the depth of the minimax search tree.
         - alpha: float for alpha pruning.
         - beta: float for beta pruning.
         - maximizing_player: bool to indicate if the player is maximizing.
         - saved_state: SavedState of the game. 
         - player: BoardPiece information about which player is making the move.
+        - last_col: column of the stone played last.
 
         Returns:
         - float: The best score achieved by the player.
         """
-        if connected_four(board, player) or depth == 0:
-            return score_board(board, player, saved_state)
+        nodes_per_depth[search_depth + 1 - depth] += 1
+        if root_four or connected_four_at(buffer.board, player, last_col, buffer.last_row(last_col)) or depth == 0:
+            stats.leaf_evaluations += 1
+            return score_board(buffer.board, player, saved_state)
 
         val = float('-inf') if maximizing_player else float('inf')
-        for col in range(board.shape[1]):
-            if 0 in board[:, col]:
-                temp_board = board.copy()
-                row = np.where(temp_board[:, col] == 0)[0][-1]
-                temp_board[row, col] = player
-
-                score = minimax(temp_board, depth - 1, alpha, beta, not maximizing_player, saved_state, player)
+        searched = 0
+        for col in columns:
+            if buffer.can_play(col):
+                searched += 1
+                buffer.play(col, player)
+                score = minimax(depth - 1, alpha, beta, not maximizing_player, saved_state, player, col)
+                buffer.undo(col)
 
                 if maximizing_player:
                     val = max(val, score)
@@ -55,6 +419,9 @@ def generate_move_minimax(board: np.ndarray, player: BoardPiece, saved_state: Sa
                     beta = min(beta, val)
 
                 if beta <= alpha:
+                    stats.cutoffs += 1
+                    if searched == 1:
+                        stats.first_move_cutoffs += 1
                     break
 
         return val
@@ -65,17 +432,23 @@ def generate_move_minimax(board: np.ndarray, player: BoardPiece, saved_state: Sa
     beta = float('inf')
 
     evaluated_moves = 0
+    # Root moves are searched with the full window, so the score of a mirror image is the exact score
+    mirrored_scores = {} if is_symmetric_board(board) else None
+    last_col = columns[-1]
 
-    for col in range(board.shape[1]):
-        if 0 in board[:, col]:
+    for col in columns:
+        if buffer.can_play(col):
             evaluated_moves += 1
-            temp_board = board.copy()
-            row = np.where(temp_board[:, col] == 0)[0][-1]
-            temp_board[row, col] = player
+            if mirrored_scores is not None and last_col - col in mirrored_scores:
+                score = mirrored_scores[last_col - col]
+            else:
+                buffer.play(col, player)
 
-            depth = 6
-            maximizing_player = True
-            score = minimax(temp_board, depth, alpha, beta, maximizing_player, saved_state, player)
+                maximizing_player = True
+                score = minimax(depth, alpha, beta, maximizing_player, saved_state, player, col)
+                buffer.undo(col)
+                if mirrored_scores is not None:
+                    mirrored_scores[col] = score
 
             if score > best_score:
                 best_score = score
@@ -85,8 +458,11 @@ def generate_move_minimax(board: np.ndarray, player: BoardPiece, saved_state: Sa
                 equal_moves.append(col)  # Update equal_moves list
 
     if equal_moves:
-        best_move = np.random.choice(equal_moves)
+        rng = np.random if seed is None else np.random.default_rng(seed)
+        best_move = rng.choice(equal_moves)
 
+    stats.nodes = sum(nodes_per_depth)
+    stats.elapsed = time.perf_counter() - start
     return best_move, saved_state, evaluated_moves
 
 def score_board(board: np.ndarray, player: BoardPiece, saved_state: SavedState) -> int:
@@ -0,0 +1,161 @@
+from typing import Callable, Dict, List, Optional, Sequence
+from agents.agent_bitboard.bitboard import bottom_mask, top_mask
+
+BOARD_WIDTH = 7
+BOARD_HEIGHT = 6
+MAX_PLY = BOARD_WIDTH * BOARD_HEIGHT
+
+TOP_MASKS = tuple(top_mask(col, BOARD_HEIGHT) for col in range(BOARD_WIDTH))
+BOTTOM_MASKS = tuple(bottom_mask(col, BOARD_HEIGHT) for col in range(BOARD_WIDTH))
+
+# Columns from the center outwards: central columns take part in more lines of four
+CENTER_ORDER = (3, 2, 4, 1, 5, 0, 6)
+
+# Positions used to compare move orderings, as sequences of played columns (none of them is decided)
+ORDERING_POSITIONS = (
+    '',
+    '3',
+    '33',
+    '3342',
+    '334241',
+    '2242',
+    '3332',
+    '32344245',
+    '3223445',
+    '012345601',
+    '43213',
+)
+
+
+class MoveOrdering:
+    """
+    Decides in which order the bitboard search visits the columns of a node.
+    This base class keeps the plain column order 0..6; subclasses can use the
+    move of the transposition table and the cutoffs reported by the search.
+    """
+
+    def new_search(self):
+        """Called once before a search starts."""
+
+    def order(self, ply: int, tt_move: Optional[int], mask: int) -> Sequence[int]:
+        """
+        Returns the columns of a node in the order they should be searched.
+
+        Input parameters:
+        - ply: distance of the node from the root.
+        - tt_move: best move stored in the transposition table for this node, or None.
+        - mask: stones of both players, full columns may be left out.
+
+        Returns:
+        - Sequence[int]: columns to search, the search skips full columns itself.
+        """
+        return range(BOARD_WIDTH)
+
+    def cutoff(self, ply: int, col: int, mask: int, depth: int):
+        """
+        Reports a beta cutoff.
+
+        Input parameters:
+        - ply: distance of the node from the root.
+        - col: column that caused the cutoff.
+        - mask: stones of both players before the move.
+        - depth: remaining depth of the node.
+        """
+
+
+class HeuristicMoveOrdering(MoveOrdering):
+    """
+    Move ordering made of four parts, each can be switched off:
+    - the move of the transposition table (the principal variation of a shallower iteration) first,
+    - up to two killer moves per ply (moves that caused a cutoff in a sibling node),
+    - a history table over cells, filled with depth * depth on every cutoff,
+    - the center-out static order, which also breaks ties of the history table.
+    A different static_order can be given, e.g. so parallel searches visit the tree in different orders.
+    """
+
+    def __init__(self, tt_move: bool = True, killers: bool = True, history: bool = True,
+                 center_first: bool = True, static_order: Optional[Sequence[int]] = None):
+        self.use_tt_move = tt_move
+        self.use_killers = killers
+        self.use_history = history
+        if static_order is not None:
+            self.static_order = tuple(static_order)
+        else:
+            self.static_order = CENTER_ORDER if center_first else tuple(range(BOARD_WIDTH))
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.history = [0] * (BOARD_WIDTH * (BOARD_HEIGHT + 1))
+
+    def new_search(self):
+        """Killer moves are cleared, the history table is halved so it favours the newest results."""
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.history = [value >> 1 for value in self.history]
+
+    def order(self, ply: int, tt_move: Optional[int], mask: int) -> Sequence[int]:
+        moves = [col for col in self.static_order if not mask & TOP_MASKS[col]]
+        if self.use_history:
+            history = self.history
+            # sort is stable, so columns with equal history keep the static order
+            moves.sort(key=lambda col: -history[((mask + BOTTOM_MASKS[col]) & ~mask).bit_length() - 1])
+
+        front = []
+        if self.use_tt_move and tt_move is not None and tt_move in moves:
+            front.append(tt_move)
+        if self.use_killers:
+            for killer in self.killers[ply]:
+                if killer is not None and killer not in front and killer in moves:
+                    front.append(killer)
+        if not front:
+            return moves
+        return front + [col for col in moves if col not in front]
+
+    def cutoff(self, ply: int, col: int, mask: int, depth: int):
+        if self.use_killers:
+            killers = self.killers[ply]
+            if killers[0] != col:
+                killers[1] = killers[0]
+                killers[0] = col
+        if self.use_history:
+            cell = ((mask + BOTTOM_MASKS[col]) & ~mask).bit_length() - 1
+            self.history[cell] += depth * depth
+
+
+def compare_move_orderings(orderings: Dict[str, Callable[[], MoveOrdering]], depth: int,
+                           positions: Sequence[str] = ORDERING_POSITIONS) -> Dict[str, List[int]]:
+    """
+    Counts the nodes a fixed-depth search visits with different move orderings.
+
+    Input parameters:
+    - orderings: name -> function returning a new MoveOrdering.
+    - depth: number of plies searched below each root move.
+    - positions: positions as sequences of played columns.
+
+    Returns:
+    - Dict[str, List[int]]: name -> nodes visited for every position.
+    """
+    from agents.agent_bitboard.bitboard import Bitboard
+    from agents.agent_minimax.search import BitboardSearch
+    from agents.agent_minimax.transposition import TranspositionTable
+
+    counts = {name: [] for name in orderings}
+    for moves in positions:
+        bitboard = Bitboard()
+        for col in moves:
+            bitboard.play(int(col))
+        # Bitboard.current_position holds PLAYER1's stones, the search wants the player to move
+        position = bitboard.current_position if bitboard.moves % 2 == 0 \
+            else bitboard.current_position ^ bitboard.mask
+        for name, make_ordering in orderings.items():
+            search = BitboardSearch(TranspositionTable(1 << 16), make_ordering())
+            search.root_scores(position, bitboard.mask, depth)
+            counts[name].append(search.nodes)
+    return counts
+
+
+if __name__ == '__main__':
+    results = compare_move_orderings({
+        'column order': MoveOrdering,
+        'center first': lambda: HeuristicMoveOrdering(tt_move=False, killers=False, history=False),
+        'heuristic': HeuristicMoveOrdering,
+    }, depth=6)
+    for name, nodes in results.items():
+        print(f'{name:>14}: {sum(nodes):>9} nodes  {nodes}')
@@ -0,0 +1,206 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+from agents.agent_minimax.ordering import CENTER_ORDER
+from agents.agent_minimax.search import BitboardSearch, SearchTimeout, TOP_MASKS, WIN_SCORE, WIN_BOUND, \
+    FULL_BOARD_MOVES
+from agents.agent_minimax.transposition import TranspositionTable
+from agents.agent_minimax.stats import SearchStats
+from agents.agent_minimax.symmetry import is_symmetric, mirror_scores, MIRROR_AXIS
+
+# Every worker keeps its own transposition table between tasks
+WORKER_TT_CAPACITY = 1 << 18
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_shared_alpha = None
+# One parallel search at a time, they share the alpha bound of the pool
+_pool_lock = threading.Lock()
+
+# State of a worker process, set by _init_worker
+_worker_search: Optional[BitboardSearch] = None
+_worker_alpha = None
+
+
+def default_workers() -> int:
+    """Number of workers used when none is given: one per CPU, at most one per column."""
+    return max(1, min(os.cpu_count() or 1, len(CENTER_ORDER)))
+
+
+def get_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    Returns the process pool of the parallel search. The pool is created on the first call and
+    reused by all later calls, it is only replaced when a different number of workers is requested.
+
+    Input parameters:
+    - workers: number of worker processes, default_workers() if None.
+    """
+    global _pool, _pool_workers, _shared_alpha
+    workers = default_workers() if workers is None else workers
+    if _pool is None or _pool_workers != workers:
+        shutdown_pool()
+        _shared_alpha = multiprocessing.Value('q', -WIN_SCORE - 1)
+        _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(_shared_alpha,))
+        _pool_workers = workers
+    return _pool
+
+
+def shutdown_pool():
+    """Stops the worker processes of the pool, the next parallel search starts a new pool."""
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown()
+    _pool = None
+    _pool_workers = 0
+
+
+def _init_worker(shared_alpha):
+    global _worker_search, _worker_alpha
+    _worker_search = BitboardSearch(TranspositionTable(WORKER_TT_CAPACITY))
+    _worker_alpha = shared_alpha
+
+
+def _search_root_move(position: int, mask: int, col: int, depth: int,
+                      time_left: Optional[float]) -> Tuple[int, Optional[int], SearchStats]:
+    """
+    Worker task: scores one root column with the best root score published so far as alpha bound,
+    and publishes its own score.
+
+    Returns:
+    - Tuple[int, Optional[int], SearchStats]: column, score (None if the time ran out) and search statistics.
+    """
+    search = _worker_search
+    search.new_search()
+    search.reset_statistics()
+    search.nodes = 0
+    search.evaluator.reset(position, position ^ mask)
+    search.deadline = None if time_left is None else time.perf_counter() + time_left
+    try:
+        score = search.score_root_move(position, mask, col, depth, _worker_alpha.value)
+    except SearchTimeout:
+        return col, None, search.statistics()
+    finally:
+        search.deadline = None
+    with _worker_alpha.get_lock():
+        if score > _worker_alpha.value:
+            _worker_alpha.value = score
+    return col, score, search.statistics()
+
+
+def parallel_root_scores(position: int, mask: int, depth: int, workers: Optional[int] = None,
+                         order=CENTER_ORDER, time_left: Optional[float] = None,
+                         stats: Optional[SearchStats] = None) -> Tuple[List[Tuple[int, int]], int]:
+    """
+    Scores every legal root column in the process pool, one task per column. Workers share the
+    best root score found so far as alpha bound, so the result equals the serial root_scores:
+    scores are exact for the best columns, and the mirror-image columns of a symmetric position
+    are not searched.
+
+    Input parameters:
+    - position: stones of the player to move.
+    - mask: stones of both players.
+    - depth: number of plies searched below each root move.
+    - workers: number of worker processes.
+    - order: order in which the columns are handed to the workers.
+    - time_left: optional seconds after which the workers give up.
+    - stats: optional SearchStats the statistics of the workers are merged into.
+
+    Returns:
+    - Tuple[List[Tuple[int, int]], int]: (column, score) pairs and the total number of nodes.
+    Raises SearchTimeout if a column could not be searched in time.
+    """
+    with _pool_lock:
+        pool = get_pool(workers)
+        _shared_alpha.value = -WIN_SCORE - 1
+        symmetric = is_symmetric(position, mask)
+        futures = [pool.submit(_search_root_move, position, mask, col, depth, time_left)
+                   for col in order if not mask & TOP_MASKS[col] and not (symmetric and col > MIRROR_AXIS)]
+        scores, nodes, timed_out = [], 0, False
+        for future in as_completed(futures):
+            col, score, col_stats = future.result()
+            nodes += col_stats.nodes
+            if stats is not None:
+                stats.merge(col_stats)
+                stats.searches -= 1
+            if score is None:
+                timed_out = True
+            else:
+                scores.append((col, score))
+    if timed_out:
+        raise SearchTimeout
+    scores.sort(key=lambda item: list(order).index(item[0]))
+    if symmetric:
+        scores = mirror_scores(scores)
+    return scores, nodes
+
+
+def parallel_iterative_deepening(position: int, mask: int, time_budget: float, max_depth: Optional[int] = None,
+                                 workers: Optional[int] = None,
+                                 stats: Optional[SearchStats] = None) -> Tuple[List[Tuple[int, int]], int]:
+    """
+    Anytime version of parallel_root_scores, see BitboardSearch.iterative_deepening.
+    The statistics of all iterations are merged into stats if it is given.
+
+    Returns:
+    - Tuple[List[Tuple[int, int]], int]: root scores of the last completed iteration and its depth.
+    """
+    deadline = time.perf_counter() + time_budget
+    depth_limit = FULL_BOARD_MOVES - mask.bit_count() - 1
+    if max_depth is not None:
+        depth_limit = min(depth_limit, max_depth)
+
+    scores, completed_depth, order = [], -1, CENTER_ORDER
+    for depth in range(max(depth_limit, 0) + 1):
+        time_left = None if completed_depth < 0 else deadline - time.perf_counter()
+        try:
+            iteration, _ = parallel_root_scores(position, mask, depth, workers, order, time_left, stats)
+        except SearchTimeout:
+            break
+        scores, completed_depth = iteration, depth
+        order = [col for col, _ in sorted(iteration, key=lambda item: -item[1])]
+        best_score = max((score for _, score in iteration), default=0)
+        if abs(best_score) > WIN_BOUND or time.perf_counter() >= deadline:
+            break
+    return scores, completed_depth
+
+
+def parallel_speedup(position: int, mask: int, depth: int, workers: Optional[int] = None) -> Dict[str, float]:
+    """
+    Times the serial and the parallel root search of a position with fresh transposition tables
+    and checks that both find the same best score.
+
+    Returns:
+    - Dict[str, float]: serial and parallel seconds, speedup, nodes of both and the best scores.
+    """
+    serial = BitboardSearch(TranspositionTable(WORKER_TT_CAPACITY))
+    start = time.perf_counter()
+    serial_scores = serial.root_scores(position, mask, depth, CENTER_ORDER)
+    serial_time = time.perf_counter() - start
+
+    # A new pool has empty worker tables like the serial search, it is warmed up
+    # so process start-up is not part of the measurement
+    workers = default_workers() if workers is None else workers
+    shutdown_pool()
+    list(get_pool(workers).map(abs, range(workers)))
+    start = time.perf_counter()
+    parallel_scores, parallel_nodes = parallel_root_scores(position, mask, depth, workers)
+    parallel_time = time.perf_counter() - start
+
+    return {
+        'serial_time': serial_time,
+        'parallel_time': parallel_time,
+        'speedup': serial_time / parallel_time if parallel_time else float('inf'),
+        'serial_nodes': serial.nodes,
+        'parallel_nodes': parallel_nodes,
+        'serial_best': max(score for _, score in serial_scores),
+        'parallel_best': max(score for _, score in parallel_scores),
+    }
+
+
+if __name__ == '__main__':
+    for workers_count in (2, 4, default_workers()):
+        print(workers_count, parallel_speedup(0, 0, 7, workers_count))
+    shutdown_pool()
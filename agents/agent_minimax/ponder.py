@@ -0,0 +1,112 @@
+import threading
+import time
+from typing import List, NamedTuple, Optional, Tuple
+from agents.agent_bitboard.bitboard import alignment
+from agents.agent_minimax.search import BitboardSearch, BOTTOM_MASKS, COLUMN_MASKS, TOP_MASKS, BOARD_HEIGHT, \
+    FULL_BOARD_MOVES, ROOT_PARITY_KEY
+from agents.agent_minimax.stats import SearchStats
+from agents.agent_minimax.transposition import TranspositionTable
+from agents.agent_minimax.symmetry import canonical_key, mirror_move
+
+# Depth of the search that predicts the reply when the transposition table does not know it
+PREDICTION_DEPTH = 2
+
+
+class PonderResult(NamedTuple):
+    """
+    Search of the position after the predicted reply, with the engine to move.
+
+    - position: stones of the engine.
+    - mask: stones of both players.
+    - predicted_move: column the opponent was expected to play.
+    - scores: root scores of the last completed iteration (see BitboardSearch.root_scores).
+    - depth: depth of that iteration.
+    - elapsed: seconds spent pondering.
+    - stats: SearchStats of the pondering search.
+    """
+    position: int
+    mask: int
+    predicted_move: int
+    scores: List[Tuple[int, int]]
+    depth: int
+    elapsed: float
+    stats: SearchStats
+
+
+class Ponderer:
+    """
+    Searches on the opponent's time. A background thread predicts the opponent's reply, plays it and
+    runs an anytime search of the resulting position until it is stopped. All results go into the
+    transposition table of the engine, so the next search profits even if another reply is played.
+
+    The thread releases the GIL regularly, and a thread blocked on input() does not hold it, so a
+    human can type while the engine ponders.
+    """
+
+    def __init__(self, transposition_table: TranspositionTable, position: int, mask: int,
+                 max_depth: Optional[int] = None):
+        """
+        Input parameters:
+        - transposition_table: table of the engine, it must not be used by another search until stop.
+        - position: stones of the opponent, who is to move.
+        - mask: stones of both players.
+        - max_depth: optional depth limit of the pondering search.
+        """
+        self.transposition_table = transposition_table
+        self.position = position
+        self.mask = mask
+        self.max_depth = max_depth
+        self.predicted_move: Optional[int] = None
+        self.result: Optional[PonderResult] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._ponder, name='ponder', daemon=True)
+
+    def start(self) -> 'Ponderer':
+        self._thread.start()
+        return self
+
+    def stop(self) -> Optional[PonderResult]:
+        """
+        Stops the search and waits for the thread.
+
+        Returns:
+        - Optional[PonderResult]: the search of the predicted position, None if there was nothing to ponder.
+        """
+        self._stop.set()
+        self._thread.join()
+        return self.result
+
+    def predict(self, search: BitboardSearch) -> Optional[int]:
+        """The best reply stored in the transposition table, or the best one of a shallow search."""
+        key, mirrored = canonical_key(self.position, self.mask)
+        # The entry was stored by the engine's last search, its root had one stone less
+        if (self.mask.bit_count() - 1) & 1:
+            key |= ROOT_PARITY_KEY
+        entry = self.transposition_table.probe(key)
+        if entry is not None and entry[4] is not None:
+            col = mirror_move(entry[4]) if mirrored else entry[4]
+            if not self.mask & TOP_MASKS[col]:
+                return col
+        scores = search.root_scores(self.position, self.mask, PREDICTION_DEPTH)
+        return max(scores, key=lambda item: item[1])[0] if scores else None
+
+    def _ponder(self):
+        start = time.perf_counter()
+        engine = self.position ^ self.mask
+        if alignment(engine, BOARD_HEIGHT) or self.mask.bit_count() >= FULL_BOARD_MOVES - 1:
+            return
+        search = BitboardSearch(self.transposition_table)
+        search.new_search()
+        col = self.predict(search)
+        move = (self.mask + BOTTOM_MASKS[col]) & COLUMN_MASKS[col]
+        if alignment(self.position | move, BOARD_HEIGHT):
+            return
+        self.predicted_move = col
+        search.reset_statistics()
+        search.stop = self._stop.is_set
+        mask = self.mask | move
+        scores, depth = search.iterative_deepening(engine, mask, float('inf'), self.max_depth)
+        stats = search.statistics()
+        stats.depth = depth
+        stats.elapsed = time.perf_counter() - start
+        self.result = PonderResult(engine, mask, col, scores, depth, stats.elapsed, stats)
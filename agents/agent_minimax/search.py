@@ -0,0 +1,361 @@
+import time
+from typing import List, Optional, Sequence, Tuple
+from agents.agent_bitboard.bitboard import bottom_mask, top_mask, column_mask, alignment, possible_moves, \
+    winning_cells, non_losing_moves, mirror
+from agents.agent_minimax.transposition import TranspositionTable, EXACT, LOWER, UPPER
+from agents.agent_minimax.ordering import MoveOrdering, HeuristicMoveOrdering
+from agents.agent_minimax.evaluation import IncrementalEvaluator
+from agents.agent_minimax.stats import SearchStats
+from agents.agent_minimax.hooks import SearchHooks, HookedOrdering
+from agents.agent_minimax.symmetry import is_symmetric, mirror_scores, MIRROR_AXIS
+from agents.agent_minimax.threats import cell_column
+
+BOARD_WIDTH = 7
+BOARD_HEIGHT = 6
+
+# Score of a won position, a win found after more plies is worth less than a quick one
+WIN_SCORE = 1_000_000
+# Scores beyond this bound are wins or losses, the heuristic never gets close to it
+WIN_BOUND = WIN_SCORE - 1_000
+
+BOTTOM_MASKS = tuple(bottom_mask(col, BOARD_HEIGHT) for col in range(BOARD_WIDTH))
+TOP_MASKS = tuple(top_mask(col, BOARD_HEIGHT) for col in range(BOARD_WIDTH))
+COLUMN_MASKS = tuple(column_mask(col, BOARD_HEIGHT) for col in range(BOARD_WIDTH))
+FULL_BOARD_MOVES = BOARD_WIDTH * BOARD_HEIGHT
+COLUMN_ORDER = tuple(range(BOARD_WIDTH))
+# The clock is read once per this many nodes (a power of two minus one, used as a bit mask)
+DEADLINE_CHECK_INTERVAL = 1023
+# Heuristic scores are seen from the player to move at the root, so a table entry belongs to one of the
+# two players; this bit of the key is set for entries of searches whose root has an odd number of stones
+ROOT_PARITY_KEY = 1 << 56
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the deadline or the node budget of an anytime search has passed."""
+
+
+class BitboardSearch:
+    """
+    Alpha-beta search (negamax form) that runs on the two-integer bitboard
+    representation: `position` holds the stones of the player to move and
+    `mask` holds the stones of both players. Making a move is a handful of
+    integer operations, so there is no board copy at any node.
+
+    A position and its mirror image have the same score with mirrored moves, so
+    they share one transposition table entry (see symmetry.canonical_key), and
+    the root of a symmetric position only searches the columns up to the middle.
+    """
+
+    def __init__(self, transposition_table: Optional[TranspositionTable] = None,
+                 ordering: Optional[MoveOrdering] = None, hooks: Optional[SearchHooks] = None):
+        self.nodes = 0
+        self.transposition_table = transposition_table
+        self.ordering = HeuristicMoveOrdering() if ordering is None else ordering
+        self.evaluator = IncrementalEvaluator()
+        self.deadline = None
+        # Optional callable read together with the clock, the search stops once it returns True
+        self.stop = None
+        # Optional number of nodes after which the search stops, read together with the clock
+        self.node_limit = None
+        self.hooks = None
+        self.set_hooks(hooks)
+        self.reset_statistics()
+
+    def set_hooks(self, hooks: Optional[SearchHooks]):
+        """
+        Installs or removes (None) the hooks of the search. With hooks, negamax is replaced on this
+        instance by a version that reports every node, and the move ordering by one that reports the
+        cutoffs. Without hooks the search runs the plain negamax, so disabled hooks cost nothing.
+        """
+        if self.hooks is not None:
+            del self.negamax
+            self.ordering = self.ordering.ordering
+        self.hooks = hooks
+        if hooks is not None:
+            self.negamax = self._traced_negamax
+            self.ordering = HookedOrdering(self.ordering, hooks)
+
+    def reset_statistics(self):
+        """Sets the counters of statistics() to zero. Unlike nodes, they add up over several root searches."""
+        self.depth_nodes = [0] * (FULL_BOARD_MOVES + 1)
+        self.leaf_evaluations = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        table = self.transposition_table
+        self._table_counters = (0, 0) if table is None else (table.probes, table.hits)
+
+    def statistics(self) -> SearchStats:
+        """
+        Returns the counters since the last reset_statistics as a SearchStats. The time and the depth
+        are not known to the search, the caller fills them in.
+        """
+        table = self.transposition_table
+        probes, hits = (0, 0) if table is None else (table.probes, table.hits)
+        last_ply = max((ply for ply, count in enumerate(self.depth_nodes) if count), default=0)
+        return SearchStats(sum(self.depth_nodes), self.depth_nodes[:last_ply + 1], self.leaf_evaluations,
+                           self.cutoffs, self.first_move_cutoffs, probes - self._table_counters[0],
+                           hits - self._table_counters[1])
+
+    def new_search(self):
+        """Prepares the transposition table and the move ordering for a search of a new root position."""
+        if self.transposition_table is not None:
+            self.transposition_table.new_search()
+        self.ordering.new_search()
+
+    def iterative_deepening(self, position: int, mask: int, time_budget: float,
+                            max_depth: Optional[int] = None,
+                            start_depth: int = 0,
+                            max_nodes: Optional[int] = None) -> Tuple[List[Tuple[int, int]], int]:
+        """
+        Anytime search: searches the root one ply deeper per iteration until the time budget is used up.
+        The root columns of each iteration are ordered by the scores of the previous one, and the
+        transposition table carries the best moves of shallower iterations into the deeper ones.
+
+        Input parameters:
+        - position: stones of the player to move.
+        - mask: stones of both players.
+        - time_budget: wall-clock seconds for the whole search.
+        - max_depth: optional limit of the plies searched below each root move.
+        - start_depth: depth of the first iteration.
+        - max_nodes: optional node budget of the whole search. Unlike the clock, it stops the search at the
+          same node on every machine (it is read every DEADLINE_CHECK_INTERVAL + 1 nodes), so with an
+          infinite time budget the result is reproducible.
+
+        Returns:
+        - Tuple[List[Tuple[int, int]], int]: root scores of the last completed iteration (see root_scores)
+          and its depth. The first iteration always completes, so there is a move even if the budget is tiny.
+        """
+        deadline = time.perf_counter() + time_budget
+        depth_limit = FULL_BOARD_MOVES - mask.bit_count() - 1
+        if max_depth is not None:
+            depth_limit = min(depth_limit, max_depth)
+
+        scores, completed_depth, order, nodes = [], -1, None, 0
+        depth_limit = max(depth_limit, 0)
+        for depth in range(min(start_depth, depth_limit), depth_limit + 1):
+            self.deadline = deadline if completed_depth >= 0 else None
+            if max_nodes is not None and completed_depth >= 0:
+                self.node_limit = max_nodes - nodes
+            try:
+                iteration = self.root_scores(position, mask, depth, order)
+            except SearchTimeout:
+                break
+            finally:
+                self.deadline = None
+                self.node_limit = None
+                nodes += self.nodes
+            scores, completed_depth = iteration, depth
+            order = [col for col, _ in sorted(iteration, key=lambda item: -item[1])]
+
+            best_score = max((score for _, score in iteration), default=0)
+            if (abs(best_score) > WIN_BOUND or time.perf_counter() >= deadline
+                    or (max_nodes is not None and nodes >= max_nodes)):
+                break
+
+        self.nodes = nodes
+        return scores, completed_depth
+
+    def root_scores(self, position: int, mask: int, depth: int,
+                    order: Optional[Sequence[int]] = None) -> List[Tuple[int, int]]:
+        """
+        Scores every legal column of the root position.
+
+        Input parameters:
+        - position: stones of the player to move.
+        - mask: stones of both players.
+        - depth: number of plies searched below each root move.
+        - order: order in which the root columns are searched, by default the one of the move ordering.
+
+        Returns:
+        - List[Tuple[int, int]]: (column, score) pairs for every legal column, in search order.
+          Scores are exact for the best columns, so ties can be detected by the caller. In a symmetric
+          position the columns right of the middle get the score of their mirror image without a search.
+        """
+        self.nodes = 0
+        if order is None:
+            order = self.ordering.order(0, None, mask)
+        if self.hooks is not None:
+            self.hooks.search_start(position, mask, depth)
+        # Player 0 of the evaluator is the player to move at the root, so player ply & 1 moves at any node
+        self.evaluator.reset(position, position ^ mask)
+        best_score = -WIN_SCORE - 1
+        scores = []
+        symmetric = is_symmetric(position, mask)
+        for col in order:
+            if mask & TOP_MASKS[col] or (symmetric and col > MIRROR_AXIS):
+                continue
+            score = self.score_root_move(position, mask, col, depth, best_score)
+            scores.append((col, score))
+            best_score = max(best_score, score)
+        if symmetric:
+            scores = mirror_scores(scores)
+        if self.hooks is not None:
+            self.hooks.iteration_complete(depth, scores)
+        return scores
+
+    def score_root_move(self, position: int, mask: int, col: int, depth: int, best_score: int) -> int:
+        """
+        Scores one legal column of the root position. The evaluator must be set to the root position.
+
+        Input parameters:
+        - position: stones of the player to move.
+        - mask: stones of both players.
+        - col: column to play.
+        - depth: number of plies searched below the move.
+        - best_score: best score of the root so far, a lower score is only returned as an upper bound.
+
+        Returns:
+        - int: score of the column, exact if it is at least best_score.
+        """
+        move = (mask + BOTTOM_MASKS[col]) & COLUMN_MASKS[col]
+        if alignment(position | move, BOARD_HEIGHT):
+            return WIN_SCORE - 1
+        cell = move.bit_length() - 1
+        self.evaluator.play(cell, 0)
+        # Scores are integers, so a window starting at best_score - 1 keeps ties exact
+        score = -self.negamax(position ^ mask, mask | move, depth, 1, -WIN_SCORE - 1, -(best_score - 1))
+        self.evaluator.undo(cell, 0)
+        return score
+
+    def negamax(self, position: int, mask: int, depth: int, ply: int, alpha: int, beta: int) -> int:
+        """
+        Applies the negamax form of the minimax algorithm to a bitboard position.
+
+        Input parameters:
+        - position: stones of the player to move.
+        - mask: stones of both players.
+        - depth: remaining depth of the search tree.
+        - ply: distance from the root, used to prefer quicker wins.
+        - alpha: lower bound of the search window.
+        - beta: upper bound of the search window.
+
+        Returns:
+        - int: score of the position for the player to move.
+        """
+        self.nodes += 1
+        self.depth_nodes[ply] += 1
+        if self.deadline is not None and not self.nodes & DEADLINE_CHECK_INTERVAL \
+                and ((self.node_limit is not None and self.nodes >= self.node_limit)
+                     or time.perf_counter() > self.deadline or (self.stop is not None and self.stop())):
+            raise SearchTimeout
+        stones = mask.bit_count()
+        if stones == FULL_BOARD_MOVES:
+            return 0
+        if depth == 0:
+            self.leaf_evaluations += 1
+            # The heuristic is not symmetric (an opponent's three costs more than an own three gains),
+            # so like score_board it scores the leaf for the player to move at the root (player 0)
+            score = self.evaluator.scores[0]
+            return -score if ply & 1 else score
+
+        # A move that completes four ends the search at once
+        if winning_cells(position, mask) & possible_moves(mask):
+            return WIN_SCORE - ply - 1
+        # Moves that let the opponent complete four with the next stone are never generated; without
+        # any other move (e.g. against two threats) the opponent wins with the next stone
+        moves = non_losing_moves(position, mask)
+        if not moves:
+            return -(WIN_SCORE - ply - 2)
+
+        table = self.transposition_table
+        tt_move = None
+        if table is not None:
+            # Mirror images share the entry under the smaller key, its move is stored for that orientation
+            key = position + mask
+            mirrored_key = mirror(key)
+            mirrored = mirrored_key < key
+            if mirrored:
+                key = mirrored_key
+            if (stones - ply) & 1:
+                key |= ROOT_PARITY_KEY
+            entry = table.probe(key)
+            if entry is not None:
+                # The best move of an earlier (shallower) search seeds the move ordering
+                tt_move = entry[4]
+                if mirrored and tt_move is not None:
+                    tt_move = BOARD_WIDTH - 1 - tt_move
+            if entry is not None and entry[2] >= depth:
+                score = _score_from_table(entry[1], ply)
+                bound = entry[3]
+                if bound == EXACT:
+                    return score
+                if bound == LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+        alpha_orig = alpha
+
+        value = -WIN_SCORE - 1
+        best_move = None
+        opponent = position ^ mask
+        evaluator = self.evaluator
+        side = ply & 1
+        searched = 0
+        if not moves & (moves - 1):
+            # A single move is left, e.g. the block of the opponent's only threat
+            order = (cell_column(moves),)
+        else:
+            order = self.ordering.order(ply, tt_move, mask)
+        for col in order:
+            move = moves & COLUMN_MASKS[col]
+            if not move:
+                continue
+            searched += 1
+            cell = move.bit_length() - 1
+            evaluator.play(cell, side)
+            score = -self.negamax(opponent, mask | move, depth - 1, ply + 1, -beta, -alpha)
+            evaluator.undo(cell, side)
+            if score > value:
+                value = score
+                best_move = col
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self.cutoffs += 1
+                        if searched == 1:
+                            self.first_move_cutoffs += 1
+                        self.ordering.cutoff(ply, col, mask, depth)
+                        break
+
+        if table is not None:
+            if value <= alpha_orig:
+                bound = UPPER
+            elif value >= beta:
+                bound = LOWER
+            else:
+                bound = EXACT
+            if mirrored and best_move is not None:
+                best_move = BOARD_WIDTH - 1 - best_move
+            table.store(key, _score_to_table(value, ply), depth, bound, best_move)
+        return value
+
+    def _traced_negamax(self, position: int, mask: int, depth: int, ply: int, alpha: int, beta: int) -> int:
+        """negamax with the node and leaf events of the hooks, installed by set_hooks."""
+        hooks = self.hooks
+        hooks.node_enter(ply, depth, alpha, beta, position, mask)
+        leaves = self.leaf_evaluations
+        score = BitboardSearch.negamax(self, position, mask, depth, ply, alpha, beta)
+        if depth == 0 and self.leaf_evaluations != leaves:
+            hooks.leaf(ply, score)
+        hooks.node_exit(ply, depth, score)
+        return score
+
+
+def _score_to_table(score: int, ply: int) -> int:
+    """Win and loss scores are stored relative to the node, so they stay valid at any ply."""
+    if score > WIN_BOUND:
+        return score + ply
+    if score < -WIN_BOUND:
+        return score - ply
+    return score
+
+
+def _score_from_table(score: int, ply: int) -> int:
+    """Inverse of _score_to_table."""
+    if score > WIN_BOUND:
+        return score - ply
+    if score < -WIN_BOUND:
+        return score + ply
+    return score
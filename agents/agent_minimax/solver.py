@@ -0,0 +1,189 @@
+from enum import Enum
+from typing import List, NamedTuple, Optional, Tuple
+from agents.agent_bitboard.bitboard import alignment, possible_moves, winning_cells, non_losing_moves
+from agents.agent_minimax.ordering import CENTER_ORDER
+from agents.agent_minimax.search import BOTTOM_MASKS, COLUMN_MASKS, TOP_MASKS, FULL_BOARD_MOVES
+from agents.agent_minimax.transposition import TranspositionTable, LOWER, UPPER
+from agents.agent_minimax.symmetry import canonical_key, mirror_move
+from agents.agent_minimax.threats import cell_column
+
+# The solver is used automatically by generate_move_minimax when at most this many cells are empty
+SOLVER_EMPTY_CELLS = 14
+
+
+class Outcome(Enum):
+    WIN = 1
+    DRAW = 0
+    LOSS = -1
+
+
+class SolverResult(NamedTuple):
+    """
+    Game-theoretic value of a position for the player to move.
+
+    - outcome: WIN, DRAW or LOSS with perfect play of both players.
+    - moves_to_end: plies until the game ends, including the winning move
+      (for a draw, the plies until the board is full).
+    - score: solver score, positive for a win and larger the earlier the win,
+      (43 - stones on the board before the winning move) // 2, negative for a loss.
+    """
+    outcome: Outcome
+    moves_to_end: int
+    score: int
+
+
+def result_from_score(score: int, moves: int) -> SolverResult:
+    """
+    Converts a solver score to a SolverResult.
+
+    Input parameters:
+    - score: solver score of the position.
+    - moves: number of stones on the board.
+    """
+    if score == 0:
+        return SolverResult(Outcome.DRAW, FULL_BOARD_MOVES - moves, 0)
+    if score > 0:
+        own_moves = (FULL_BOARD_MOVES + 3 - moves - 2 * score) // 2
+        return SolverResult(Outcome.WIN, 2 * own_moves - 1, score)
+    # The opponent wins, their score is counted from the position after our move
+    opponent_moves = (FULL_BOARD_MOVES + 3 - (moves + 1) + 2 * score) // 2
+    return SolverResult(Outcome.LOSS, 2 * opponent_moves, score)
+
+
+class Solver:
+    """
+    Exact solver for Connect Four positions on the bitboard representation.
+
+    It runs a fail-hard negamax with the score bounds that follow from the number of
+    moves left (a player can at best win with their next stone), a transposition table
+    that stores lower and upper bounds, and a null-window bisection over the score range.
+    """
+
+    def __init__(self, transposition_table: Optional[TranspositionTable] = None):
+        self.transposition_table = TranspositionTable() if transposition_table is None else transposition_table
+        self.nodes = 0
+
+    def solve(self, position: int, mask: int) -> int:
+        """
+        Computes the exact score of a position.
+
+        Input parameters:
+        - position: stones of the player to move.
+        - mask: stones of both players.
+
+        Returns:
+        - int: solver score for the player to move (see SolverResult).
+        """
+        moves = mask.bit_count()
+        if moves == FULL_BOARD_MOVES:
+            return 0
+        min_score = -((FULL_BOARD_MOVES - moves) // 2)
+        max_score = (FULL_BOARD_MOVES + 1 - moves) // 2
+        # Null-window searches bisect the score range, favouring small windows around 0
+        while min_score < max_score:
+            median = min_score + (max_score - min_score) // 2
+            if median <= 0 and int(min_score / 2) < median:
+                median = int(min_score / 2)
+            elif median >= 0 and int(max_score / 2) > median:
+                median = int(max_score / 2)
+            score = self.negamax(position, mask, median, median + 1)
+            if score <= median:
+                max_score = score
+            else:
+                min_score = score
+        return min_score
+
+    def analyze(self, position: int, mask: int) -> SolverResult:
+        """
+        Solves a position and returns outcome, plies to the end of the game and score.
+        """
+        return result_from_score(self.solve(position, mask), mask.bit_count())
+
+    def best_moves(self, position: int, mask: int) -> Tuple[int, List[int]]:
+        """
+        Solves the root position and finds every column that keeps its value.
+        After the root is solved, one null-window search per column decides whether the
+        column reaches that value, which is much cheaper than solving every column.
+
+        Input parameters:
+        - position: stones of the player to move.
+        - mask: stones of both players.
+
+        Returns:
+        - Tuple[int, List[int]]: solver score of the position and the columns with perfect play,
+          an empty list if the board is full.
+        """
+        moves = mask.bit_count()
+        win_score = (FULL_BOARD_MOVES + 1 - moves) // 2
+        winning = [col for col in CENTER_ORDER if not mask & TOP_MASKS[col]
+                   and alignment(position | ((mask + BOTTOM_MASKS[col]) & COLUMN_MASKS[col]))]
+        if winning:
+            return win_score, winning
+
+        value = self.solve(position, mask)
+        best = []
+        for col in CENTER_ORDER:
+            if mask & TOP_MASKS[col]:
+                continue
+            move = (mask + BOTTOM_MASKS[col]) & COLUMN_MASKS[col]
+            # The column keeps the value if the opponent's score after it is at most -value
+            if self.negamax(position ^ mask, mask | move, -value, -value + 1) <= -value:
+                best.append(col)
+        return value, best
+
+    def negamax(self, position: int, mask: int, alpha: int, beta: int) -> int:
+        """
+        Fail-hard negamax on the exact score.
+
+        Input parameters:
+        - position: stones of the player to move.
+        - mask: stones of both players.
+        - alpha: lower bound of the search window.
+        - beta: upper bound of the search window.
+
+        Returns:
+        - int: the exact score if it lies inside (alpha, beta), otherwise a bound beyond the window.
+        """
+        self.nodes += 1
+        moves = mask.bit_count()
+        if moves == FULL_BOARD_MOVES:
+            return 0
+
+        if winning_cells(position, mask) & possible_moves(mask):
+            return (FULL_BOARD_MOVES + 1 - moves) // 2
+        # Only moves after which the opponent cannot win at once, without them the opponent wins next
+        non_losing = non_losing_moves(position, mask)
+        if not non_losing:
+            return -((FULL_BOARD_MOVES - moves) // 2)
+
+        # Without an immediate win, the best possible result is a win with the stone after next
+        max_score = (FULL_BOARD_MOVES - 1 - moves) // 2
+        # Mirror images share an entry, only the scores are read, so the stored move is not mirrored back
+        key, mirrored = canonical_key(position, mask)
+        entry = self.transposition_table.probe(key)
+        if entry is not None:
+            if entry[3] == UPPER:
+                max_score = min(max_score, entry[1])
+            else:
+                if entry[1] >= beta:
+                    return entry[1]
+                alpha = max(alpha, entry[1])
+        if beta > max_score:
+            beta = max_score
+            if alpha >= beta:
+                return beta
+
+        opponent = position ^ mask
+        order = (cell_column(non_losing),) if not non_losing & (non_losing - 1) else CENTER_ORDER
+        for col in order:
+            move = non_losing & COLUMN_MASKS[col]
+            if not move:
+                continue
+            score = -self.negamax(opponent, mask | move, -beta, -alpha)
+            if score >= beta:
+                self.transposition_table.store(key, score, 0, LOWER, mirror_move(col) if mirrored else col)
+                return score
+            if score > alpha:
+                alpha = score
+        self.transposition_table.store(key, alpha, 0, UPPER, None)
+        return alpha
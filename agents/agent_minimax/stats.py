@@ -0,0 +1,103 @@
+from typing import Dict, List, Optional
+
+
+class SearchStats:
+    """
+    Statistics of one search, or the sum of several searches after merge (e.g. all moves of a game).
+
+    Attributes:
+    - nodes: nodes visited.
+    - nodes_per_depth: nodes visited at each distance from the root (index 0 is the root), empty if the
+      search does not count them (the exact solver).
+    - leaf_evaluations: nodes scored by the heuristic at the depth limit.
+    - cutoffs: beta cutoffs.
+    - first_move_cutoffs: beta cutoffs caused by the first move searched at a node.
+    - tt_probes, tt_hits: lookups in the transposition table and how many found their position.
+    - elapsed: wall-clock seconds.
+    - depth: depth of the deepest completed search, -1 if unknown.
+    - searches: number of searches that were merged.
+    """
+
+    def __init__(self, nodes: int = 0, nodes_per_depth: Optional[List[int]] = None, leaf_evaluations: int = 0,
+                 cutoffs: int = 0, first_move_cutoffs: int = 0, tt_probes: int = 0, tt_hits: int = 0,
+                 elapsed: float = 0.0, depth: int = -1, searches: int = 1):
+        self.nodes = nodes
+        self.nodes_per_depth = [] if nodes_per_depth is None else nodes_per_depth
+        self.leaf_evaluations = leaf_evaluations
+        self.cutoffs = cutoffs
+        self.first_move_cutoffs = first_move_cutoffs
+        self.tt_probes = tt_probes
+        self.tt_hits = tt_hits
+        self.elapsed = elapsed
+        self.depth = depth
+        self.searches = searches
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        """Share of the cutoffs caused by the first move, a measure of the move ordering."""
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    @property
+    def tt_hit_rate(self) -> float:
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def effective_branching_factor(self) -> float:
+        """
+        Average growth of the number of nodes from one ply to the next, over the plies the search reached.
+        0.0 if nodes were counted on fewer than two plies.
+        """
+        plies = [count for count in self.nodes_per_depth[1:] if count]
+        if len(plies) < 2:
+            return 0.0
+        return (plies[-1] / plies[0]) ** (1 / (len(plies) - 1))
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def merge(self, other: 'SearchStats') -> 'SearchStats':
+        """
+        Adds the counts and the time of another record to this one, and keeps the larger depth.
+
+        Returns:
+        - SearchStats: this record.
+        """
+        self.nodes += other.nodes
+        if len(other.nodes_per_depth) > len(self.nodes_per_depth):
+            self.nodes_per_depth.extend([0] * (len(other.nodes_per_depth) - len(self.nodes_per_depth)))
+        for ply, count in enumerate(other.nodes_per_depth):
+            self.nodes_per_depth[ply] += count
+        self.leaf_evaluations += other.leaf_evaluations
+        self.cutoffs += other.cutoffs
+        self.first_move_cutoffs += other.first_move_cutoffs
+        self.tt_probes += other.tt_probes
+        self.tt_hits += other.tt_hits
+        self.elapsed += other.elapsed
+        self.depth = max(self.depth, other.depth)
+        self.searches += other.searches
+        return self
+
+    def as_dict(self) -> Dict[str, float]:
+        """Returns the counts and the derived rates, e.g. to write them as JSON."""
+        return {
+            'nodes': self.nodes,
+            'nodes_per_depth': list(self.nodes_per_depth),
+            'leaf_evaluations': self.leaf_evaluations,
+            'cutoffs': self.cutoffs,
+            'first_move_cutoffs': self.first_move_cutoffs,
+            'first_move_cutoff_rate': self.first_move_cutoff_rate,
+            'effective_branching_factor': self.effective_branching_factor,
+            'tt_probes': self.tt_probes,
+            'tt_hits': self.tt_hits,
+            'tt_hit_rate': self.tt_hit_rate,
+            'elapsed': self.elapsed,
+            'nodes_per_second': self.nodes_per_second,
+            'depth': self.depth,
+            'searches': self.searches,
+        }
+
+    def __repr__(self) -> str:
+        return (f'SearchStats(nodes={self.nodes}, depth={self.depth}, elapsed={self.elapsed:.3f}s, '
+                f'nodes/s={self.nodes_per_second:.0f}, ebf={self.effective_branching_factor:.2f}, '
+                f'first move cutoffs={self.first_move_cutoff_rate:.1%}, tt hits={self.tt_hit_rate:.1%})')
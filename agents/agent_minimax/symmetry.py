@@ -0,0 +1,73 @@
+from typing import List, Sequence, Tuple
+import numpy as np
+from agents.agent_bitboard.bitboard import mirror
+
+BOARD_WIDTH = 7
+# Columns right of the axis are mirror images of columns left of it
+MIRROR_AXIS = BOARD_WIDTH // 2
+
+
+def mirror_move(col: int) -> int:
+    """The column of col in the mirror image."""
+    return BOARD_WIDTH - 1 - col
+
+
+def canonical_key(position: int, mask: int) -> Tuple[int, bool]:
+    """
+    Returns the key of a position or of its mirror image, whichever is smaller, and whether the
+    mirror image was used. Both mirror images share one entry of a table this way; a move stored
+    under a mirrored key has to be mirrored as well (see mirror_move).
+
+    Input parameters:
+    - position: stones of the player to move.
+    - mask: stones of both players.
+
+    Returns:
+    - Tuple[int, bool]: canonical key and True if it is the key of the mirrored position.
+    """
+    key = position + mask
+    mirrored_key = mirror(key)
+    if mirrored_key < key:
+        return mirrored_key, True
+    return key, False
+
+
+def is_symmetric(position: int, mask: int) -> bool:
+    """True if the position is its own mirror image, e.g. the empty board."""
+    key = position + mask
+    return mirror(key) == key
+
+
+def canonical_board(board: np.ndarray) -> Tuple[np.ndarray, bool]:
+    """
+    The ndarray version of canonical_key: returns the board or its mirror image, whichever has the
+    smaller bytes, and whether the mirror image was used.
+
+    Input parameters:
+    - board: board in the ndarray format of game_utils.
+
+    Returns:
+    - Tuple[np.ndarray, bool]: canonical board (a view of board) and True if it is the mirror image.
+    """
+    mirrored = board[:, ::-1]
+    if mirrored.tobytes() < board.tobytes():
+        return mirrored, True
+    return board, False
+
+
+def is_symmetric_board(board: np.ndarray) -> bool:
+    """True if the board is its own mirror image."""
+    return bool(np.array_equal(board, board[:, ::-1]))
+
+
+def mirror_scores(scores: Sequence[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    Completes the root scores of a symmetric position that were only searched for the columns up to
+    MIRROR_AXIS: every column left of the axis is followed by its mirror image with the same score.
+    """
+    completed = []
+    for col, score in scores:
+        completed.append((col, score))
+        if col < MIRROR_AXIS:
+            completed.append((mirror_move(col), score))
+    return completed
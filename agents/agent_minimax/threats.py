@@ -0,0 +1,36 @@
+from typing import Optional
+from agents.agent_bitboard.bitboard import alignment, possible_moves, winning_cells, BOTTOM_ROW
+
+BOARD_HEIGHT = 6
+
+
+def cell_column(cell: int) -> int:
+    """The column of a mask with a single cell."""
+    return (cell.bit_length() - 1) // (BOARD_HEIGHT + 1)
+
+
+def forced_move(position: int, mask: int) -> Optional[int]:
+    """
+    The move that needs no search: a column that wins at once, or else the only column that stops
+    the opponent from winning with their next stone.
+
+    Input parameters:
+    - position: stones of the player to move.
+    - mask: stones of both players.
+
+    Returns:
+    - Optional[int]: the column to play, None if the position has to be searched. This includes
+      positions where the opponent has two immediate wins, positions that are already decided and
+      boards with stones that float above empty cells.
+    """
+    opponent = position ^ mask
+    if (mask + BOTTOM_ROW) & mask or alignment(position, BOARD_HEIGHT) or alignment(opponent, BOARD_HEIGHT):
+        return None
+    possible = possible_moves(mask)
+    wins = winning_cells(position, mask) & possible
+    if wins:
+        return cell_column(wins & -wins)
+    threats = winning_cells(opponent, mask) & possible
+    if threats and not threats & (threats - 1):
+        return cell_column(threats)
+    return None
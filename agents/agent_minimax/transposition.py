@@ -0,0 +1,94 @@
+from typing import Optional, Tuple
+
+# Bound types of a stored score
+EXACT = 0
+LOWER = 1  # the search failed high, the score is a lower bound
+UPPER = 2  # the search failed low, the score is an upper bound
+
+DEFAULT_CAPACITY = 1 << 20
+
+# Entry layout: (key, score, depth, bound, best_move, generation)
+Entry = Tuple[int, int, int, int, Optional[int], int]
+
+
+class TranspositionTable:
+    """
+    Fixed-size transposition table for the bitboard search.
+
+    Positions are stored under their unique key (position + mask, see position_key)
+    in the slot key % capacity. The searches store a position and its mirror image
+    under one key, see symmetry.canonical_key, and mark it with the player to move at the root
+    (see search.ROOT_PARITY_KEY). When two positions compete for a slot the entry
+    from an older search or with the smaller depth is replaced (depth-preferred
+    replacement with aging), so deep results of the current search are kept.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        if capacity <= 0:
+            raise ValueError('Capacity must be positive.')
+        self.capacity = capacity
+        self.entries = [None] * capacity
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def new_search(self):
+        """Marks the start of a new search, entries of earlier searches become replaceable."""
+        self.generation += 1
+
+    def probe(self, key: int) -> Optional[Entry]:
+        """
+        Looks up a position.
+
+        Input parameters:
+        - key: unique key of the position.
+
+        Returns:
+        - Optional[Entry]: the stored entry, or None if the position is not in the table.
+        """
+        self.probes += 1
+        entry = self.entries[key % self.capacity]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key: int, score: int, depth: int, bound: int, best_move: Optional[int]):
+        """
+        Stores the result of a search, unless the slot holds a deeper entry of the current search.
+
+        Input parameters:
+        - key: unique key of the position.
+        - score: score of the position for the player to move.
+        - depth: remaining depth the score was searched with.
+        - bound: EXACT, LOWER or UPPER.
+        - best_move: column of the best move found, None if there is none.
+        """
+        index = key % self.capacity
+        entry = self.entries[index]
+        if (entry is None or entry[0] == key or entry[5] != self.generation
+                or depth >= entry[2]):
+            self.entries[index] = (key, score, depth, bound, best_move, self.generation)
+            self.stores += 1
+
+    def clear(self):
+        """Removes all entries and resets the counters."""
+        self.entries = [None] * self.capacity
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of probes that found their position, 0.0 before the first probe."""
+        return self.hits / self.probes if self.probes else 0.0
+
+    def __len__(self) -> int:
+        return sum(entry is not None for entry in self.entries)
+
+
+def position_key(position: int, mask: int) -> int:
+    """Unique key of a bitboard position (stones of the player to move and mask)."""
+    return position + mask
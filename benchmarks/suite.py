@@ -0,0 +1,301 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from game_utils import BoardPiece, NO_PLAYER, PLAYER1, PLAYER2, initialize_game_state, apply_player_action, connected_four
+from agents.agent_bitboard.bitboard import Bitboard
+from agents.agent_minimax.evaluation import score_boards
+from agents.agent_minimax.minimax import generate_move_minimax, score_board, MinimaxSavedState, ENGINE_BITBOARD, \
+    DEFAULT_DEPTH
+from agents.agent_minimax.search import BitboardSearch
+from agents.agent_minimax.transposition import TranspositionTable
+
+# Bumped when the metrics change, reports of different versions are not compared
+BENCHMARK_VERSION = 1
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus_v2.json')
+
+DEFAULT_TTD_DEPTH = 7
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 0.25
+TT_CAPACITY = 1 << 18
+
+# Direction of the metrics for compare_reports, metrics not listed are reported but not compared
+LOWER_IS_BETTER = ('seconds', 'nodes', 'peak_bytes')
+HIGHER_IS_BETTER = ('nodes_per_second',)
+# Compared metrics that may be zero; any other compared metric that is zero measured nothing
+ZERO_IS_VALID = ('peak_bytes',)
+TIME_TO_DEPTH_PREFIX = 'depth_'
+
+
+class CorpusPosition(NamedTuple):
+    """
+    Position of the benchmark corpus.
+
+    - id: unique name, used as part of the metric names.
+    - phase: 'opening', 'middlegame' or 'endgame'.
+    - moves: played columns, PLAYER1 moves first.
+    """
+    id: str
+    phase: str
+    moves: str
+
+    def board(self) -> np.ndarray:
+        """The position in the ndarray format of game_utils."""
+        board = initialize_game_state()
+        for ply, col in enumerate(self.moves):
+            apply_player_action(board, int(col), PLAYER1 if ply % 2 == 0 else PLAYER2)
+        return board
+
+    def player(self) -> BoardPiece:
+        """The player to move."""
+        return PLAYER1 if len(self.moves) % 2 == 0 else PLAYER2
+
+
+def load_corpus(path: str = CORPUS_PATH) -> Tuple[int, List[CorpusPosition]]:
+    """
+    Reads a corpus file.
+
+    Returns:
+    - Tuple[int, List[CorpusPosition]]: version of the corpus and its positions.
+    """
+    with open(path) as file:
+        corpus = json.load(file)
+    return corpus['version'], [CorpusPosition(**position) for position in corpus['positions']]
+
+
+def time_call(function: Callable[[], object], repeat: int = DEFAULT_REPEAT, number: Optional[int] = None) -> float:
+    """
+    Seconds per call of function, the fastest of repeat measurements.
+
+    Input parameters:
+    - function: the call to time.
+    - repeat: number of measurements.
+    - number: calls per measurement, chosen by timeit (at least 0.2 seconds per measurement) if None.
+    """
+    timer = timeit.Timer(function)
+    if number is None:
+        number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def count_allocations(function: Callable[[], object]) -> Dict[str, int]:
+    """
+    Memory allocated by one call of function, traced with tracemalloc.
+
+    Returns:
+    - Dict[str, int]: 'peak_bytes', the largest amount of memory allocated during the call at one time,
+      and 'net_blocks', the number of memory blocks still allocated after the call.
+    """
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'peak_bytes': peak, 'net_blocks': sys.getallocatedblocks() - blocks}
+
+
+def benchmark_functions(positions: Sequence[CorpusPosition], repeat: int = DEFAULT_REPEAT,
+                        number: Optional[int] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Times the board functions of game_utils, the heuristic and the Bitboard methods on every position.
+
+    Returns:
+    - Dict[str, Dict[str, float]]: metric name ('<function>/<position id>') -> seconds and allocations.
+    """
+    metrics = {}
+    for position in positions:
+        board, player = position.board(), position.player()
+        bitboard = Bitboard.from_array(board)
+        col = next(col for col in range(bitboard.width) if board[-1, col] == NO_PLAYER)
+        functions = {
+            'score_board': lambda: score_board(board, player, None),
+            'score_boards': lambda: score_boards(board, player),
+            'connected_four': lambda: connected_four(board, player),
+            'apply_player_action': lambda: apply_player_action(board.copy(), col, player),
+            'bitboard_from_array': lambda: Bitboard.from_array(board),
+            'bitboard_to_array': lambda: bitboard.to_array(),
+            'bitboard_replay': lambda: _replay(position.moves),
+            'bitboard_can_play': lambda: [bitboard.can_play(column) for column in range(bitboard.width)],
+            'bitboard_is_win': lambda: bitboard.is_win(),
+        }
+        for name, function in functions.items():
+            metrics[f'{name}/{position.id}'] = {'seconds': time_call(function, repeat, number),
+                                                **count_allocations(function)}
+    return metrics
+
+
+def _replay(moves: str) -> Bitboard:
+    bitboard = Bitboard()
+    for col in moves:
+        bitboard.play(int(col))
+    return bitboard
+
+
+def benchmark_search(positions: Sequence[CorpusPosition], depth: int = DEFAULT_DEPTH,
+                     repeat: int = DEFAULT_REPEAT) -> Dict[str, Dict[str, float]]:
+    """
+    Runs generate_move_minimax with the bitboard engine on every position, with an empty transposition
+    table each time. Endgame positions are answered by the exact solver, like in a game.
+
+    Returns:
+    - Dict[str, Dict[str, float]]: 'search/<position id>' -> the fastest time, the nodes and the other
+      SearchStats of the search.
+    """
+    metrics = {}
+    for position in positions:
+        board, player = position.board(), position.player()
+        best = None
+        for _ in range(repeat):
+            saved_state = MinimaxSavedState(TT_CAPACITY, TT_CAPACITY)
+            generate_move_minimax(board, player, saved_state, ENGINE_BITBOARD, depth)
+            if best is None or saved_state.stats.elapsed < best.elapsed:
+                best = saved_state.stats
+        result = best.as_dict()
+        result['seconds'] = result.pop('elapsed')
+        # The tables are allocated before the measurement, only the search itself is traced
+        saved_state = MinimaxSavedState(TT_CAPACITY, TT_CAPACITY)
+        result.update(count_allocations(
+            lambda: generate_move_minimax(board, player, saved_state, ENGINE_BITBOARD, depth)))
+        metrics[f'search/{position.id}'] = result
+    return metrics
+
+
+def benchmark_time_to_depth(positions: Sequence[CorpusPosition],
+                            max_depth: int = DEFAULT_TTD_DEPTH) -> Dict[str, Dict[str, float]]:
+    """
+    Iterative deepening without a time limit: the seconds after which each depth of the root search
+    is completed, with one transposition table for all depths.
+
+    Returns:
+    - Dict[str, Dict[str, float]]: 'time_to_depth/<position id>' -> {'depth_<d>': seconds}.
+    """
+    metrics = {}
+    for position in positions:
+        bitboard = Bitboard.from_array(position.board())
+        root_position = bitboard.player_position(position.player())
+        search = BitboardSearch(TranspositionTable(TT_CAPACITY))
+        search.new_search()
+        depth_limit = min(max_depth, bitboard.width * bitboard.height - bitboard.moves - 1)
+        times = {}
+        start = time.perf_counter()
+        for depth in range(1, depth_limit + 1):
+            search.root_scores(root_position, bitboard.mask, depth)
+            times[f'{TIME_TO_DEPTH_PREFIX}{depth}'] = time.perf_counter() - start
+        metrics[f'time_to_depth/{position.id}'] = times
+    return metrics
+
+
+def run_suite(corpus_path: str = CORPUS_PATH, position_ids: Optional[Sequence[str]] = None,
+              depth: int = DEFAULT_DEPTH, max_depth: int = DEFAULT_TTD_DEPTH, repeat: int = DEFAULT_REPEAT,
+              number: Optional[int] = None) -> Dict:
+    """
+    Runs all benchmarks on the corpus.
+
+    Input parameters:
+    - corpus_path: corpus file.
+    - position_ids: optional ids of the positions to run, all positions if None.
+    - depth: depth of the generate_move_minimax benchmark.
+    - max_depth: largest depth of the time-to-depth benchmark.
+    - repeat: measurements per benchmark, the fastest one is reported.
+    - number: calls per measurement of the function benchmarks, chosen automatically if None.
+
+    Returns:
+    - Dict: report with the versions, the machine and the metrics, it can be written as JSON.
+    """
+    corpus_version, positions = load_corpus(corpus_path)
+    if position_ids is not None:
+        positions = [position for position in positions if position.id in position_ids]
+    metrics = {}
+    metrics.update(benchmark_functions(positions, repeat, number))
+    metrics.update(benchmark_search(positions, depth, repeat))
+    metrics.update(benchmark_time_to_depth(positions, max_depth))
+    return {
+        'benchmark_version': BENCHMARK_VERSION,
+        'corpus_version': corpus_version,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'depth': depth,
+        'metrics': metrics,
+    }
+
+
+def compare_reports(report: Dict, baseline: Dict, tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """
+    Compares a report with a baseline report of the same benchmark and corpus version.
+
+    Input parameters:
+    - report: the new report.
+    - baseline: the stored report.
+    - tolerance: relative change that is still accepted, 0.25 flags metrics more than 25% worse.
+
+    Returns:
+    - List[str]: one line per metric that got worse by more than the tolerance, or that is zero in
+      either report (e.g. a search that was skipped), since then no regression could be seen.
+    """
+    for version in ('benchmark_version', 'corpus_version'):
+        if report[version] != baseline[version]:
+            raise ValueError(f'Cannot compare reports of {version} {report[version]} and {baseline[version]}.')
+
+    regressions = []
+    for name, values in report['metrics'].items():
+        old_values = baseline['metrics'].get(name, {})
+        for key, value in values.items():
+            old = old_values.get(key)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)):
+                continue
+            if key in LOWER_IS_BETTER or key.startswith(TIME_TO_DEPTH_PREFIX):
+                worse = value > old * (1 + tolerance)
+            elif key in HIGHER_IS_BETTER:
+                worse = value < old * (1 - tolerance)
+            else:
+                continue
+            if key not in ZERO_IS_VALID and (old <= 0 or value <= 0):
+                regressions.append(f'{name} {key}: {old:.6g} -> {value:.6g} (nothing measured)')
+            elif old <= 0:
+                if value > 0:
+                    regressions.append(f'{name} {key}: {old:.6g} -> {value:.6g}')
+            elif worse:
+                regressions.append(f'{name} {key}: {old:.6g} -> {value:.6g} ({value / old - 1:+.0%})')
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks of the game functions and the minimax search.')
+    parser.add_argument('--corpus', default=CORPUS_PATH, help='corpus file')
+    parser.add_argument('--positions', nargs='*', default=None, help='ids of the positions to run')
+    parser.add_argument('--depth', type=int, default=DEFAULT_DEPTH, help='depth of the search benchmark')
+    parser.add_argument('--max-depth', type=int, default=DEFAULT_TTD_DEPTH, help='largest time-to-depth depth')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='measurements per benchmark')
+    parser.add_argument('--output', help='write the report as JSON to this file')
+    parser.add_argument('--baseline', help='compare with this stored report, exit with 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='accepted relative change')
+    args = parser.parse_args()
+
+    suite_report = run_suite(args.corpus, args.positions, args.depth, args.max_depth, args.repeat)
+    for metric_name, metric_values in suite_report['metrics'].items():
+        if metric_name.startswith('search/'):
+            print(f'{metric_name:>28}: {metric_values["seconds"]:.4f} s, {metric_values["nodes"]} nodes, '
+                  f'{metric_values["nodes_per_second"]:.0f} nodes/s')
+        elif metric_name.startswith('time_to_depth/'):
+            print(f'{metric_name:>28}: ' + ', '.join(f'{key[len(TIME_TO_DEPTH_PREFIX):]}: {seconds:.3f} s'
+                                                    for key, seconds in metric_values.items()))
+        else:
+            print(f'{metric_name:>28}: {metric_values["seconds"] * 1e6:.1f} us, '
+                  f'{metric_values["peak_bytes"]} bytes peak')
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(suite_report, output_file, indent=1)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            found = compare_reports(suite_report, json.load(baseline_file), args.tolerance)
+        for line in found:
+            print(f'REGRESSION {line}')
+        sys.exit(1 if found else 0)
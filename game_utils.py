@@ -1,6 +1,7 @@
 from enum import Enum
 import numpy as np
-from typing import Callable, Optional, Tuple
+from typing import Callable, List, Optional, Sequence, Tuple
+from zobrist import zobrist_hash, zobrist_update
 
 BOARD_COLS = 7
 BOARD_ROWS = 6
@@ -123,7 +124,7 @@ def string_to_board(new_board: str) -> np.ndarray:
     
     #loops through the get_rows which is string to convert it back to the numpy array
     #evaluates eachcolumn for X and 0 to assign it either to player1 or player2 respectively
-    board = np.zeros((BOARD_ROWS, BOARD_COLS))  # Remark: make sure the dtype is BoardPiece
+    board = np.zeros((BOARD_ROWS, BOARD_COLS), dtype=BoardPiece)
     for i, j in enumerate(get_rows):  # Remark: choose more descriptive variable names
         for col in range(BOARD_COLS):
             cell_str = j[col * 2] #to store the character from the string, *2 as there are gaps
@@ -217,7 +218,50 @@ def connected_four(board: np.ndarray, player: BoardPiece) -> bool:
     return False
 
 
-def check_end_state(board: np.ndarray, player: BoardPiece) -> GameState:
+CONNECT_N = 4  # number of adjacent pieces needed for a win
+LINE_DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))  # horizontal, vertical and both diagonals
+
+
+def connected_four_at(board: np.ndarray, player: BoardPiece, action: PlayerAction,
+                      row: Optional[int] = None) -> bool:
+    """
+    Returns True if the piece of `player` on top of column `action` (the piece that was
+    just played) is part of four adjacent pieces. Only the four lines through that cell
+    are checked, so this is the fast path after a move. connected_four stays the general
+    check for any board.
+
+    Input parameters:
+    -board: np.array representing the board
+    -player: BoardPiece as integer, representing the player
+    -action: PlayerAction, the column that was just played
+    -row: row of the piece that was just played, if it is not the top of the column
+     (the minimax search fills its board from the other end)
+
+    """
+    rows, cols = board.shape
+    if row is None:
+        column = board[:, action]
+        row = rows - 1
+        while row >= 0 and column[row] == NO_PLAYER:
+            row -= 1
+    if row < 0 or board[row, action] != player:
+        return False
+
+    for d_row, d_col in LINE_DIRECTIONS:
+        count = 1
+        for sign in (1, -1):
+            r, c = row + sign * d_row, action + sign * d_col
+            while 0 <= r < rows and 0 <= c < cols and board[r, c] == player:
+                count += 1
+                r += sign * d_row
+                c += sign * d_col
+        if count >= CONNECT_N:
+            return True
+    return False
+
+
+def check_end_state(board: np.ndarray, player: BoardPiece, last_action: Optional[PlayerAction] = None,
+                    move_count: Optional[int] = None) -> GameState:
     """
     Returns the current game state for the current `player`, i.e. has their last
     action won (GameState.IS_WIN) or drawn (GameState.IS_DRAW) the game,
@@ -226,6 +270,10 @@ def check_end_state(board: np.ndarray, player: BoardPiece) -> GameState:
     Input parameters:
     - board: the current game board as a np.array
     - player: which player piece is used
+    - last_action: optional column of the move just played, then only the lines through
+      that cell are checked (connected_four_at) instead of the whole board
+    - move_count: optional number of pieces on the board, then a draw is detected
+      from the counter instead of scanning the board
 
     Steps:
     - two if statements, checkign if the current player won (GameState.IS_WIN), or whether no 
@@ -233,10 +281,18 @@ def check_end_state(board: np.ndarray, player: BoardPiece) -> GameState:
     apply, the game is still going on
 
     """
-    if connected_four(board, player):
+    if last_action is None:
+        is_win = connected_four(board, player)
+    else:
+        is_win = connected_four_at(board, player, last_action)
+    if is_win:
         return GameState.IS_WIN
 
-    if np.all(board != NO_PLAYER):
+    if move_count is None:
+        is_full = np.all(board != NO_PLAYER)
+    else:
+        is_full = move_count >= board.size
+    if is_full:
         return GameState.IS_DRAW
 
     else:
@@ -273,3 +329,109 @@ def check_move_status(board: np.ndarray, column: any) -> MoveStatus: #had to cha
         return MoveStatus.FULL_COLUMN
 
     return MoveStatus.IS_VALID
+
+
+class Board:
+    """
+    Stateful board: the int8 array of game_utils plus the height of every column, the number of moves,
+    the move history and a Zobrist hash (see zobrist.py) that is updated with every move. play, undo and
+    is_legal are O(1), none of them scans a column.
+
+    Boards must hold their pieces from row 0 (the lowest row) up, as apply_player_action plays them.
+    The free functions of game_utils and the agents take the ndarray from the array property.
+    """
+    __slots__ = ('_cells', 'heights', 'move_count', 'key', 'history')
+
+    def __init__(self, cells: Optional[np.ndarray] = None):
+        """
+        Input parameters:
+        - cells: optional board in the ndarray format, it is copied. None starts from the empty board.
+        """
+        self._cells = initialize_game_state() if cells is None else np.array(cells, dtype=BoardPiece)
+        if self._cells.shape != BOARD_SHAPE:
+            raise ValueError(f'Expected a board of shape {BOARD_SHAPE}, got {self._cells.shape}.')
+        self.heights = [int(height) for height in np.count_nonzero(self._cells != NO_PLAYER, axis=0)]
+        self.move_count = sum(self.heights)
+        self.key = zobrist_hash(self._cells)
+        self.history: List[int] = []
+
+    @classmethod
+    def from_moves(cls, moves: Sequence[int]) -> 'Board':
+        """Plays the columns of moves from the empty board, PLAYER1 first."""
+        board = cls()
+        for col in moves:
+            board.play(col)
+        return board
+
+    @property
+    def array(self) -> np.ndarray:
+        """Read-only view of the board for the ndarray API, it changes with the board. Copy it to modify it."""
+        view = self._cells.view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def player_to_move(self) -> BoardPiece:
+        return PLAYER1 if self.move_count % 2 == 0 else PLAYER2
+
+    def is_legal(self, col: int) -> bool:
+        """True if col is a column of the board that is not full."""
+        return 0 <= col < BOARD_COLS and self.heights[col] < BOARD_ROWS
+
+    def play(self, col: int, player: Optional[BoardPiece] = None):
+        """
+        Drops a piece into col.
+
+        Input parameters:
+        - col: column of the move.
+        - player: the piece, player_to_move if None.
+
+        Raises:
+        - ValueError: if col is full or not a column of the board.
+        """
+        if not self.is_legal(col):
+            raise ValueError(f'Column {col} is not a legal move.')
+        piece = self.player_to_move if player is None else player
+        row = self.heights[col]
+        self._cells[row, col] = piece
+        self.heights[col] = row + 1
+        self.move_count += 1
+        self.key = zobrist_update(self.key, row, col, piece)
+        self.history.append(col)
+
+    def undo(self) -> int:
+        """
+        Takes back the last move played with play.
+
+        Returns:
+        - int: the column of that move.
+        """
+        col = self.history.pop()
+        row = self.heights[col] - 1
+        self.key = zobrist_update(self.key, row, col, self._cells[row, col])
+        self._cells[row, col] = NO_PLAYER
+        self.heights[col] = row
+        self.move_count -= 1
+        return col
+
+    def end_state(self, player: BoardPiece) -> GameState:
+        """check_end_state for the last move, which must have been played by player."""
+        return check_end_state(self._cells, player, self.history[-1] if self.history else None, self.move_count)
+
+    def copy(self) -> 'Board':
+        board = Board.__new__(Board)
+        board._cells = self._cells.copy()
+        board.heights = list(self.heights)
+        board.move_count = self.move_count
+        board.key = self.key
+        board.history = list(self.history)
+        return board
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Board) and self.key == other.key and np.array_equal(self._cells, other._cells)
+
+    # Boards change with every move, the hash of a position is key
+    __hash__ = None
+
+    def __str__(self) -> str:
+        return pretty_print_board(self._cells)
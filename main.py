@@ -3,7 +3,11 @@ from game_utils import GenMove
 from agents.agent_human_user import user_move
 from agents.agent_random import generate_move
 from agents.agent_minimax import generate_minimax
-import pandas as pd
+from agents.agent_minimax.minimax import ENGINE_BITBOARD, DEFAULT_DEPTH, start_pondering, stop_pondering
+from results_log import ResultsSink, ResultsAggregator
+from tournament import REASON_WIN, REASON_DRAW, REASON_ILLEGAL_MOVE
+
+DEFAULT_RESULTS_PATH = 'match_results.jsonl'
 
 def timed_minimax(board, player, saved_state, args):
     import time
@@ -30,77 +34,110 @@ def human_vs_agent(
     args_2: tuple = (),
     init_1: Callable = lambda board, player: None,
     init_2: Callable = lambda board, player: None,
+    ponder: bool = False,
+    results_path: str = DEFAULT_RESULTS_PATH,
 ):
+    """
+    Plays two games, each player starts once.
+
+    With ponder, a minimax player on the bitboard engine keeps searching in a background thread after
+    its move, while the other player (e.g. user_move waiting for input) thinks.
+    Every move and every game is appended to the JSON-lines log results_path as it is played (see
+    results_log.ResultsSink), and a summary per player is printed at the end.
+    """
     import time
     from game_utils import PLAYER1, PLAYER2, PLAYER1_PRINT, PLAYER2_PRINT, GameState, MoveStatus
-    from game_utils import initialize_game_state, pretty_print_board, apply_player_action, check_end_state, check_move_status
+    from game_utils import Board, initialize_game_state, check_move_status
 
     players = (PLAYER1, PLAYER2)
-    evaluated_moves_data = {player_1: []}
-
-    for play_first in (1, -1):
-        for init, player in zip((init_1, init_2)[::play_first], players):
-            init(initialize_game_state(), player)
-
-        saved_state = {PLAYER1: None, PLAYER2: None}
-        board = initialize_game_state()
-        gen_moves = (generate_move_1, generate_move_2)[::play_first]
-        player_names = (player_1, player_2)[::play_first]
-        gen_args = (args_1, args_2)[::play_first]
-
-        playing = True
-        while playing:
-            for player, player_name, gen_move, args in zip(
-                players, player_names, gen_moves, gen_args,
-            ):
-                t0 = time.time()
-                print(pretty_print_board(board))
-                print(
-                    f'{player_name} you are playing with {PLAYER1_PRINT if player == PLAYER1 else PLAYER2_PRINT}'
-                )
-
-                if gen_move == generate_minimax:
-                    action, saved_state, evaluated_moves = gen_move(
-                        board.copy(),  # copy board to be safe, even though agents shouldn't modify it
-                        player, saved_state, *args
-                    )
-                    evaluated_moves_data[player_name].append(evaluated_moves)
-                    print(f'Moves evaluated in 2 seconds: {evaluated_moves}')
-
-                else:
-                    # Make sure to use the correct variable name here
-                    action, saved_state = gen_move(
-                        board.copy(),  # copy board to be safe, even though agents shouldn't modify it
-                        player, saved_state, *args
+    aggregator = ResultsAggregator()
+    # The log is flushed and closed also when a game ends with an exception, e.g. Ctrl-C at a human move
+    with ResultsSink(results_path, aggregator=aggregator) as sink:
+        for game, play_first in enumerate((1, -1)):
+            for init, player in zip((init_1, init_2)[::play_first], players):
+                init(initialize_game_state(), player)
+
+            saved_state = {PLAYER1: None, PLAYER2: None}
+            board = Board()
+            gen_moves = (generate_move_1, generate_move_2)[::play_first]
+            player_names = (player_1, player_2)[::play_first]
+            gen_args = (args_1, args_2)[::play_first]
+            pondering = [ponder and gen_move == generate_minimax and args[:1] == (ENGINE_BITBOARD,)
+                         for gen_move, args in zip(gen_moves, gen_args)]
+
+            playing = True
+            while playing:
+                for player, player_name, gen_move, args, ponders in zip(
+                    players, player_names, gen_moves, gen_args, pondering,
+                ):
+                    t0 = time.time()
+                    print(board)
+                    print(
+                        f'{player_name} you are playing with {PLAYER1_PRINT if player == PLAYER1 else PLAYER2_PRINT}'
                     )
 
-                print(f'Move time: {time.time() - t0:.3f}s')
-
-                move_status = check_move_status(board, action)
-                if move_status != MoveStatus.IS_VALID:
-                    print(f'Move {action} is invalid: {move_status.value}')
-                    print(f'{player_name} lost by making an illegal move.')
-                    playing = False
-                    break
-
-                apply_player_action(board, action, player)
-                end_state = check_end_state(board, player)
+                    evaluated_moves, stats = None, None
+                    if gen_move == generate_minimax:
+                        action, saved_state[player], evaluated_moves = gen_move(
+                            board.array.copy(),  # copy board to be safe, even though agents shouldn't modify it
+                            player, saved_state[player], *args
+                        )
+                        print(f'Root moves evaluated: {evaluated_moves}')
+                        if getattr(saved_state[player], 'ponder_hit', False):
+                            print('Predicted move was played, the pondered search was reused')
+                        stats = getattr(saved_state[player], 'stats', None)
+                        if stats is not None:
+                            print(f'Search: {stats}')
 
-                if end_state != GameState.STILL_PLAYING:
-                    print(pretty_print_board(board))
-                    if end_state == GameState.IS_DRAW:
-                        print('Game ended in draw')
                     else:
-                        print(
-                            f'{player_name} won playing {PLAYER1_PRINT if player == PLAYER1 else PLAYER2_PRINT}'
+                        # Make sure to use the correct variable name here
+                        action, saved_state[player] = gen_move(
+                            board.array.copy(),  # copy board to be safe, even though agents shouldn't modify it
+                            player, saved_state[player], *args
                         )
-                    playing = False
-                    break
 
-    # Save evaluated moves data to Excel
-    df = pd.DataFrame(evaluated_moves_data)
-    df.to_excel('evaluated_moves_data.xlsx', index=False)
+                    move_time = time.time() - t0
+                    print(f'Move time: {move_time:.3f}s')
+
+                    move_status = check_move_status(board.array, action)
+                    if move_status != MoveStatus.IS_VALID:
+                        print(f'Move {action} is invalid: {move_status.value}')
+                        print(f'{player_name} lost by making an illegal move.')
+                        sink.record_game(game, *player_names, player_names[player == PLAYER1], REASON_ILLEGAL_MOVE,
+                                         board.move_count)
+                        playing = False
+                        break
+
+                    sink.record_move(game, board.move_count, player_name, player, action, move_time,
+                                     None if stats is None else stats.nodes, evaluated_moves)
+                    board.play(action, player)
+                    end_state = board.end_state(player)
+
+                    if end_state == GameState.STILL_PLAYING and ponders:
+                        # Searches the expected reply while the opponent thinks
+                        saved_state[player] = start_pondering(board.array, player, saved_state[player])
+
+                    if end_state != GameState.STILL_PLAYING:
+                        print(board)
+                        if end_state == GameState.IS_DRAW:
+                            print('Game ended in draw')
+                            sink.record_game(game, *player_names, None, REASON_DRAW, board.move_count)
+                        else:
+                            print(
+                                f'{player_name} won playing {PLAYER1_PRINT if player == PLAYER1 else PLAYER2_PRINT}'
+                            )
+                            sink.record_game(game, *player_names, player_name, REASON_WIN, board.move_count)
+                        playing = False
+                        break
+
+            for player in players:
+                stop_pondering(saved_state[player])
+
+    for name, row in aggregator.summary().items():
+        print(f'{name}: {row["wins"]} wins, {row["draws"]} draws, {row["losses"]} losses, {row["moves"]} moves, '
+              f'mean move time {row["latency_mean"]:.3f}s')
 
 if __name__ == "__main__":
 
-    human_vs_agent(generate_minimax)
\ No newline at end of file
+    # Bitboard engine with an anytime search of 2 seconds per move, pondering while the user thinks
+    human_vs_agent(generate_minimax, args_1=(ENGINE_BITBOARD, DEFAULT_DEPTH, 2.0), ponder=True)
\ No newline at end of file
@@ -0,0 +1,478 @@
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import multiprocessing
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Optional, Sequence, Tuple
+import numpy as np
+from game_utils import BoardPiece, PlayerAction, MoveStatus, NO_PLAYER, PLAYER1, PLAYER2, BOARD_SHAPE
+from game_utils import initialize_game_state, apply_player_action, check_move_status
+from agents.agent_minimax.minimax import generate_move_minimax, ENGINE_BITBOARD
+from agents.agent_minimax.parallel import default_workers
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 7654
+DEFAULT_BUDGET = 1.0
+# Longer budgets are cut to this, so no request keeps a worker busy for long
+DEFAULT_MAX_BUDGET = 30.0
+DEFAULT_MAX_QUEUE = 64
+LATENCY_WINDOW = 1000  # latencies kept for the percentiles
+
+EXECUTOR_PROCESS = 'process'
+EXECUTOR_THREAD = 'thread'
+
+# Errors returned in the 'error' field of a response
+ERROR_BAD_REQUEST = 'bad request'
+ERROR_BUSY = 'busy'
+ERROR_EXPIRED = 'deadline expired'
+ERROR_SEARCH = 'search failed'
+
+# State of a worker (process or thread), set by _init_worker
+_worker_flags = None
+_worker_local = threading.local()
+
+
+def _init_worker(flags):
+    global _worker_flags
+    _worker_flags = flags
+
+
+def _search_request(board: np.ndarray, player: BoardPiece, slot: int, deadline: float,
+                    max_depth: Optional[int]) -> Optional[Tuple[Optional[int], int, int, int]]:
+    """
+    Worker task: anytime search of one request with the time left until its deadline. The search stops
+    early once the server sets the cancel flag of slot. Every worker keeps one MinimaxSavedState, so
+    its transposition table is reused by all games the worker serves.
+
+    Returns:
+    - Optional[Tuple[Optional[int], int, int, int]]: move, evaluated moves, nodes and completed depth,
+      None if the deadline passed while the request was queued.
+    """
+    time_budget = deadline - time.time()
+    if time_budget <= 0:
+        return None
+    action, saved_state, evaluated_moves = generate_move_minimax(
+        board, player, getattr(_worker_local, 'saved_state', None), ENGINE_BITBOARD,
+        time_budget=time_budget, max_depth=max_depth, stop=lambda: _worker_flags[slot])
+    _worker_local.saved_state = saved_state
+    return (None if action is None else int(action)), evaluated_moves, saved_state.stats.nodes, saved_state.stats.depth
+
+
+def _integer(value: Any, name: str) -> int:
+    """Returns value if it is a JSON integer, JSON has no other type that should be read as one."""
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f'{name} must be an integer, not {value!r}')
+    return value
+
+
+def parse_position(request: Dict[str, Any]) -> Tuple[np.ndarray, BoardPiece]:
+    """
+    Reads the position of a request: either 'moves', the list of columns played from the empty board, or
+    'board', the rows of the board from the lowest one up as in game_utils. 'player' is the side to
+    move, it is optional with 'moves'. All columns, cells and players must be integers, the stones of a
+    board must rest on each other and their numbers must fit the side to move.
+
+    Returns:
+    - Tuple[np.ndarray, BoardPiece]: the board and the player to move.
+
+    Raises:
+    - ValueError: if the position is not valid.
+    """
+    if 'moves' in request:
+        moves = request['moves']
+        if not isinstance(moves, list):
+            raise ValueError(f"'moves' must be a list of columns, not {moves!r}")
+        board = initialize_game_state()
+        for ply, action in enumerate(moves):
+            if check_move_status(board, _integer(action, f'move {ply}')) != MoveStatus.IS_VALID:
+                raise ValueError(f'move {ply} ({action!r}) is not valid')
+            apply_player_action(board, PlayerAction(action), PLAYER1 if ply % 2 == 0 else PLAYER2)
+        player = _integer(request['player'], 'player') if 'player' in request else \
+            (PLAYER1 if len(moves) % 2 == 0 else PLAYER2)
+    elif 'board' in request:
+        rows = request['board']
+        if not isinstance(rows, list) or not all(isinstance(row, list) for row in rows):
+            raise ValueError("'board' must be a list of rows")
+        for row in rows:
+            for cell in row:
+                _integer(cell, 'cell')
+        board = np.array(rows, dtype=BoardPiece)
+        if board.shape != BOARD_SHAPE or not np.isin(board, (NO_PLAYER, PLAYER1, PLAYER2)).all():
+            raise ValueError(f'board must be {BOARD_SHAPE} with the values {NO_PLAYER}, {PLAYER1} and {PLAYER2}')
+        player = _integer(request['player'], 'player')
+        # Every stone rests on the floor or on another stone
+        if ((board[1:] != NO_PLAYER) & (board[:-1] == NO_PLAYER)).any():
+            raise ValueError('board has stones above an empty cell')
+    else:
+        raise ValueError("request needs 'moves' or 'board'")
+    if player not in (PLAYER1, PLAYER2):
+        raise ValueError(f'player must be {PLAYER1} or {PLAYER2}')
+    # PLAYER1 moves first, so it has as many stones as PLAYER2 when it is to move and one more otherwise
+    lead = int((board == PLAYER1).sum()) - int((board == PLAYER2).sum())
+    if lead != (0 if player == PLAYER1 else 1):
+        raise ValueError(f'player {player} cannot be to move with {lead} more stones of player {PLAYER1}')
+    return board, BoardPiece(player)
+
+
+def parse_limits(request: Dict[str, Any], default_budget: float,
+                 max_budget: float) -> Tuple[float, Optional[int]]:
+    """
+    Reads the search limits of a request: 'budget', the seconds until the answer is due, and the
+    optional 'max_depth'.
+
+    Input parameters:
+    - request: the request.
+    - default_budget: budget of a request without one.
+    - max_budget: longer budgets are cut to this.
+
+    Returns:
+    - Tuple[float, Optional[int]]: the budget and the depth limit.
+
+    Raises:
+    - ValueError: if the budget is not a positive finite number or the depth limit not a positive integer.
+    """
+    budget = request.get('budget', default_budget)
+    if isinstance(budget, bool) or not isinstance(budget, (int, float)) or not math.isfinite(budget) \
+            or budget <= 0:
+        raise ValueError(f'budget must be a positive number of seconds, not {budget!r}')
+    max_depth = request.get('max_depth')
+    if max_depth is not None and _integer(max_depth, 'max_depth') <= 0:
+        raise ValueError(f'max_depth must be positive, not {max_depth!r}')
+    return min(float(budget), max_budget), max_depth
+
+
+class ServerMetrics:
+    """
+    Counters of a MoveServer and the latencies of its last answered requests.
+
+    Attributes:
+    - received: requests read from clients.
+    - completed: requests answered with a move.
+    - rejected: requests refused because the queue was full.
+    - expired: requests whose deadline passed while they were queued.
+    - cancelled: requests whose client disconnected before the answer.
+    - failed: malformed requests and searches that raised.
+    - latencies: seconds from receiving to answering, for the last LATENCY_WINDOW completed requests.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.started = time.perf_counter()
+        self.received = 0
+        self.completed = 0
+        self.rejected = 0
+        self.expired = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.latencies = deque(maxlen=window)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Returns the counters, the throughput in completed requests per second and the latency percentiles."""
+        uptime = time.perf_counter() - self.started
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return {
+            'uptime': uptime,
+            'received': self.received,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'expired': self.expired,
+            'cancelled': self.cancelled,
+            'failed': self.failed,
+            'throughput': self.completed / uptime if uptime > 0 else 0.0,
+            'latency_mean': float(latencies.mean()),
+            'latency_p50': float(np.percentile(latencies, 50)),
+            'latency_p95': float(np.percentile(latencies, 95)),
+            'latency_max': float(latencies.max()),
+        }
+
+
+class MoveServer:
+    """
+    Serves moves of the bitboard search to many games at once. Requests are JSON objects, one per line:
+
+    - {"id": ..., "moves": [3, 3, 2], "budget": 0.5, "max_depth": 8}: position (see parse_position),
+      seconds until the answer is due, counted from receiving the request, and an optional depth limit
+      (see parse_limits).
+      The answer is {"id": ..., "move": 4, "evaluated_moves": 7, "nodes": ..., "depth": ..., "latency": ...}.
+    - {"id": ..., "type": "metrics"}: the answer is {"id": ..., "metrics": {...}} (see ServerMetrics).
+
+    Failed requests are answered with {"id": ..., "error": ...}. Answers of one connection are written
+    in the order their searches finish, the id tells them apart.
+
+    The searches run in a bounded executor. At most max_workers + max_queue requests are pending, later
+    ones are answered with ERROR_BUSY instead of waiting. Every pending request owns a cancel flag in
+    shared memory, which stops its search when the client disconnects.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue: int = DEFAULT_MAX_QUEUE,
+                 executor: str = EXECUTOR_PROCESS, default_budget: float = DEFAULT_BUDGET,
+                 max_budget: float = DEFAULT_MAX_BUDGET):
+        """
+        Input parameters:
+        - max_workers: searches running at the same time, default_workers() if None.
+        - max_queue: requests waiting for a worker.
+        - executor: EXECUTOR_PROCESS searches in worker processes, EXECUTOR_THREAD in threads of this
+          process (no parallelism, but no start-up cost, e.g. for tests).
+        - default_budget: seconds of requests without a budget.
+        - max_budget: longer budgets of requests are cut to this many seconds.
+        """
+        if executor not in (EXECUTOR_PROCESS, EXECUTOR_THREAD):
+            raise ValueError(f'Unknown executor: {executor}')
+        if not 0 < default_budget <= max_budget < math.inf:
+            raise ValueError(f'Budgets must satisfy 0 < default_budget <= max_budget < inf, '
+                             f'got {default_budget} and {max_budget}')
+        self.max_workers = default_workers() if max_workers is None else max_workers
+        self.max_queue = max_queue
+        self.executor_type = executor
+        self.default_budget = default_budget
+        self.max_budget = max_budget
+        self.metrics = ServerMetrics()
+        self.flags = multiprocessing.Array('b', self.max_workers + max_queue, lock=False)
+        self._free_slots = list(range(len(self.flags)))
+        self._executor: Optional[Executor] = None
+
+    @property
+    def pending(self) -> int:
+        """Requests queued or searched right now."""
+        return len(self.flags) - len(self._free_slots)
+
+    def start(self):
+        """Starts the executor, called by the serve methods and by the first request."""
+        if self._executor is None:
+            executor_class = ProcessPoolExecutor if self.executor_type == EXECUTOR_PROCESS else ThreadPoolExecutor
+            self._executor = executor_class(max_workers=self.max_workers, initializer=_init_worker,
+                                            initargs=(self.flags,))
+
+    def close(self):
+        """Cancels the pending searches and stops the executor."""
+        if self._executor is not None:
+            for slot in range(len(self.flags)):
+                self.flags[slot] = 1
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def _release_slot(self, loop: asyncio.AbstractEventLoop, slot: int):
+        try:
+            loop.call_soon_threadsafe(self._free_slots.append, slot)
+        except RuntimeError:  # the loop was closed, nobody waits for slots any more
+            self._free_slots.append(slot)
+
+    async def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Answers one request (see MoveServer). Cancelling the awaiting task cancels the search.
+
+        Returns:
+        - Dict[str, Any]: the response.
+        """
+        received = time.perf_counter()
+        self.metrics.received += 1
+        request_id = request.get('id') if isinstance(request, dict) else None
+        if isinstance(request, dict) and request.get('type') == 'metrics':
+            metrics = self.metrics.snapshot()
+            metrics['pending'] = self.pending
+            return {'id': request_id, 'metrics': metrics}
+        try:
+            if not isinstance(request, dict):
+                raise ValueError('request must be a JSON object')
+            board, player = parse_position(request)
+            budget, max_depth = parse_limits(request, self.default_budget, self.max_budget)
+        except (KeyError, TypeError, ValueError) as error:
+            self.metrics.failed += 1
+            return {'id': request_id, 'error': f'{ERROR_BAD_REQUEST}: {error}'}
+        if not self._free_slots:
+            self.metrics.rejected += 1
+            return {'id': request_id, 'error': ERROR_BUSY}
+
+        self.start()
+        loop = asyncio.get_running_loop()
+        slot = self._free_slots.pop()
+        self.flags[slot] = 0
+        # The slot is free again once the worker is done with it, not when the client stops waiting
+        future = self._executor.submit(_search_request, board, player, slot, time.time() + budget, max_depth)
+        future.add_done_callback(lambda _: self._release_slot(loop, slot))
+        try:
+            result = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            self.flags[slot] = 1
+            self.metrics.cancelled += 1
+            raise
+        except Exception as error:
+            self.metrics.failed += 1
+            return {'id': request_id, 'error': f'{ERROR_SEARCH}: {error!r}'}
+        if result is None:
+            self.metrics.expired += 1
+            return {'id': request_id, 'error': ERROR_EXPIRED}
+
+        latency = time.perf_counter() - received
+        self.metrics.completed += 1
+        self.metrics.latencies.append(latency)
+        move, evaluated_moves, nodes, depth = result
+        return {'id': request_id, 'move': move, 'evaluated_moves': evaluated_moves, 'nodes': nodes,
+                'depth': depth, 'latency': latency}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                                cancel_on_eof: bool = True):
+        """
+        Reads requests of one client until the end of its stream and writes the answers. Requests are
+        searched concurrently, a client does not need to wait for an answer before the next request.
+
+        Input parameters:
+        - reader, writer: the streams of the client.
+        - cancel_on_eof: the end of the stream means that the client disconnected, its pending searches
+          are cancelled. Otherwise (stdin) the pending requests are still answered.
+        """
+        tasks = set()
+
+        async def answer(request):
+            response = await self.handle_request(request)
+            writer.write(json.dumps(response).encode() + b'\n')
+            await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError as error:
+                    self.metrics.received += 1
+                    self.metrics.failed += 1
+                    request = None
+                    writer.write(json.dumps({'id': None, 'error': f'{ERROR_BAD_REQUEST}: {error}'}).encode() + b'\n')
+                if request is not None:
+                    task = asyncio.create_task(answer(request))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        finally:
+            if cancel_on_eof:
+                for task in tasks:
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+
+    async def serve_tcp(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> asyncio.Server:
+        """Listens on a TCP socket, port 0 picks a free port (see server.sockets)."""
+        self.start()
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    async def serve_unix(self, path: str) -> asyncio.Server:
+        """Listens on a Unix domain socket."""
+        self.start()
+        return await asyncio.start_unix_server(self.handle_connection, path)
+
+    async def serve_stdio(self):
+        """Reads requests from stdin and writes the answers to stdout until stdin is closed."""
+        self.start()
+        await self.handle_connection(_StdinReader(), _StdoutWriter(), cancel_on_eof=False)
+
+
+class _StdinReader:
+    """Line reader of stdin with the interface of StreamReader used by handle_connection, stdin may be a file."""
+
+    async def readline(self) -> bytes:
+        return await asyncio.to_thread(sys.stdin.buffer.readline)
+
+
+class _StdoutWriter:
+    """Writer of stdout with the interface of StreamWriter used by handle_connection."""
+
+    def write(self, data: bytes):
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class MoveClient:
+    """
+    Client of a MoveServer on a TCP socket, for tests and scripts. Requests may be sent concurrently,
+    answers are matched to them by id.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self._ids = itertools.count()
+        self._waiting: Dict[int, asyncio.Future] = {}
+        self._receiver = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect(cls, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> 'MoveClient':
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _receive(self):
+        while line := await self.reader.readline():
+            response = json.loads(line)
+            future = self._waiting.pop(response.get('id'), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        for future in self._waiting.values():
+            future.set_exception(ConnectionError('server closed the connection'))
+
+    async def request(self, **request) -> Dict[str, Any]:
+        """Sends a request (see MoveServer) with a new id and returns its answer."""
+        request['id'] = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request['id']] = future
+        self.writer.write(json.dumps(request).encode() + b'\n')
+        await self.writer.drain()
+        return await future
+
+    async def move(self, moves: Sequence[int], budget: float = DEFAULT_BUDGET, **options) -> Dict[str, Any]:
+        return await self.request(moves=list(moves), budget=budget, **options)
+
+    async def metrics(self) -> Dict[str, float]:
+        return (await self.request(type='metrics'))['metrics']
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        self._receiver.cancel()
+
+
+async def _serve(args):
+    server = MoveServer(args.workers, args.queue, args.executor, args.budget, args.max_budget)
+    try:
+        if args.stdio:
+            await server.serve_stdio()
+            return
+        listener = await (server.serve_unix(args.unix) if args.unix else server.serve_tcp(args.host, args.port))
+        async with listener:
+            print(f'serving on {", ".join(str(sock.getsockname()) for sock in listener.sockets)}',
+                  file=sys.stderr, flush=True)
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serves moves of the bitboard search to concurrent games.')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='address of the TCP socket')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port of the TCP socket')
+    parser.add_argument('--unix', default=None, help='path of a Unix domain socket instead of TCP')
+    parser.add_argument('--stdio', action='store_true', help='read requests from stdin, answer on stdout')
+    parser.add_argument('--workers', type=int, default=None, help='concurrent searches, default one per CPU')
+    parser.add_argument('--queue', type=int, default=DEFAULT_MAX_QUEUE, help='requests waiting for a worker')
+    parser.add_argument('--executor', choices=(EXECUTOR_PROCESS, EXECUTOR_THREAD), default=EXECUTOR_PROCESS)
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET, help='seconds of requests without budget')
+    parser.add_argument('--max-budget', type=float, default=DEFAULT_MAX_BUDGET,
+                        help='longer budgets of requests are cut to this many seconds')
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
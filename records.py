@@ -0,0 +1,187 @@
+import os
+from typing import Iterator, Sequence, Union
+import numpy as np
+
+BOARD_ROWS = 6
+BOARD_COLS = 7
+MAGIC = b'C4REC\x00\x00\x01'  # the last byte is the version of the format
+POSITIONS_CHUNK = 1 << 16  # positions converted at once, bounds the temporary memory
+
+# File layout, all integers little-endian and every section starts at a multiple of 8 bytes:
+# - header: MAGIC, number of games, number of moves (uint64 each)
+# - offsets: uint64[games + 1], game g has the moves offsets[g]:offsets[g + 1]
+# - moves: uint8[ceil(moves / 2)], two columns per byte, the first one in the low nibble
+# - positions: uint64[moves, 2], (PLAYER1 stones, stones of both players) after every move
+HEADER_DTYPE = np.dtype([('magic', 'S8'), ('games', '<u8'), ('moves', '<u8')])
+
+# Bit of board[row, col] in the bitboards, the layout of agents.agent_bitboard (col * 7 + row)
+_SHIFTS = (np.arange(BOARD_COLS)[None, :] * (BOARD_ROWS + 1) + np.arange(BOARD_ROWS)[:, None]).astype(np.uint64)
+_BITS = np.left_shift(np.uint64(1), _SHIFTS)
+_BOTTOM = tuple(1 << (col * (BOARD_ROWS + 1)) for col in range(BOARD_COLS))
+_TOP = tuple(1 << (col * (BOARD_ROWS + 1) + BOARD_ROWS - 1) for col in range(BOARD_COLS))
+
+
+def pack_moves(moves: Sequence[int]) -> np.ndarray:
+    """Packs columns (0 to 15) into nibbles, two per byte, the first one in the low nibble."""
+    moves = np.asarray(moves, dtype=np.uint8)
+    if len(moves) % 2:
+        moves = np.append(moves, np.uint8(0))
+    return moves[0::2] | (moves[1::2] << 4)
+
+
+def unpack_moves(packed: np.ndarray, count: int, start: int = 0) -> np.ndarray:
+    """
+    Inverse of pack_moves.
+
+    Input parameters:
+    - packed: packed moves.
+    - count: number of moves to unpack.
+    - start: index of the first move to unpack.
+
+    Returns:
+    - np.ndarray: uint8 columns.
+    """
+    first, last = start // 2, (start + count + 1) // 2
+    nibbles = np.empty(2 * (last - first), dtype=np.uint8)
+    nibbles[0::2] = packed[first:last] & 15
+    nibbles[1::2] = packed[first:last] >> 4
+    return nibbles[start % 2:start % 2 + count]
+
+
+def game_positions(moves: Sequence[int]) -> np.ndarray:
+    """
+    Bitboards of the positions after every move of a game, PLAYER1 moves first.
+
+    Returns:
+    - np.ndarray: uint64 array of shape (len(moves), 2), (PLAYER1 stones, stones of both players).
+
+    Raises:
+    - ValueError: if a move is not a column of the board or its column is full.
+    """
+    positions = np.empty((len(moves), 2), dtype=np.uint64)
+    player_1, mask = 0, 0
+    for ply, col in enumerate(moves):
+        if not 0 <= col < BOARD_COLS or mask & _TOP[col]:
+            raise ValueError(f'Move {ply} ({col}) is not legal.')
+        move = (mask + _BOTTOM[col]) & ~mask
+        mask |= move
+        if ply % 2 == 0:
+            player_1 |= move
+        positions[ply] = player_1, mask
+    return positions
+
+
+def boards_to_bitboards(boards: np.ndarray) -> np.ndarray:
+    """
+    Converts a stack of boards in the ndarray format of game_utils, vectorized.
+
+    Input parameters:
+    - boards: array of shape (N, 6, 7).
+
+    Returns:
+    - np.ndarray: uint64 array of shape (N, 2), (PLAYER1 stones, stones of both players).
+    """
+    boards = np.asarray(boards)
+    positions = np.empty((len(boards), 2), dtype=np.uint64)
+    for start in range(0, len(boards), POSITIONS_CHUNK):
+        chunk = boards[start:start + POSITIONS_CHUNK]
+        positions[start:start + POSITIONS_CHUNK, 0] = np.where(chunk == 1, _BITS, np.uint64(0)).sum(
+            axis=(1, 2), dtype=np.uint64)
+        positions[start:start + POSITIONS_CHUNK, 1] = np.where(chunk != 0, _BITS, np.uint64(0)).sum(
+            axis=(1, 2), dtype=np.uint64)
+    return positions
+
+
+def bitboards_to_boards(positions: np.ndarray) -> np.ndarray:
+    """
+    Inverse of boards_to_bitboards, vectorized.
+
+    Input parameters:
+    - positions: uint64 array of shape (N, 2), e.g. a slice of GameRecords.positions.
+
+    Returns:
+    - np.ndarray: int8 array of shape (N, 6, 7), 0 for empty cells, 1 and 2 for the pieces of the players.
+    """
+    positions = np.asarray(positions, dtype=np.uint64)
+    boards = np.empty((len(positions), BOARD_ROWS, BOARD_COLS), dtype=np.int8)
+    for start in range(0, len(positions), POSITIONS_CHUNK):
+        chunk = positions[start:start + POSITIONS_CHUNK]
+        player_1 = (chunk[:, 0, None, None] >> _SHIFTS) & np.uint64(1)
+        occupied = (chunk[:, 1, None, None] >> _SHIFTS) & np.uint64(1)
+        boards[start:start + POSITIONS_CHUNK] = occupied * (np.uint64(2) - player_1)
+    return boards
+
+
+def write_records(path: Union[str, os.PathLike], games: Sequence[Sequence[int]]):
+    """
+    Writes games to a record file (see the layout above), with the position after every move.
+
+    Input parameters:
+    - path: file to write.
+    - games: the columns played in every game, PLAYER1 first.
+    """
+    lengths = np.array([len(game) for game in games], dtype=np.uint64)
+    offsets = np.zeros(len(games) + 1, dtype='<u8')
+    np.cumsum(lengths, out=offsets[1:])
+    moves = np.fromiter((col for game in games for col in game), dtype=np.uint8, count=int(offsets[-1]))
+    positions = np.concatenate([game_positions(game) for game in games]) if len(moves) else \
+        np.empty((0, 2), dtype=np.uint64)
+    header = np.array([(MAGIC, len(games), len(moves))], dtype=HEADER_DTYPE)
+    with open(path, 'wb') as file:
+        for section in (header, offsets, pack_moves(moves)):
+            file.write(section.tobytes())
+            file.write(bytes(-file.tell() % 8))
+        file.write(positions.astype('<u8').tobytes())
+
+
+class GameRecords:
+    """
+    Read-only access to a record file through a memory map: offsets, packed moves and positions are
+    NumPy views of the file, so opening it reads nothing and a slice of positions is not copied until
+    it is converted.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        data = np.memmap(path, dtype=np.uint8, mode='r')
+        header = data[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)[0]
+        if header['magic'] != MAGIC:
+            raise ValueError(f'{path} is not a game record file of this version.')
+        games, moves = int(header['games']), int(header['moves'])
+        start = HEADER_DTYPE.itemsize
+        self.offsets = data[start:start + 8 * (games + 1)].view('<u8')
+        start += 8 * (games + 1)
+        self.packed_moves = data[start:start + (moves + 1) // 2]
+        start += -(-((moves + 1) // 2) // 8) * 8
+        self.positions = data[start:start + 16 * moves].view('<u8').reshape(moves, 2)
+        self._data = data
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def moves(self, game: int) -> np.ndarray:
+        """The columns played in a game."""
+        start, stop = int(self.offsets[game]), int(self.offsets[game + 1])
+        return unpack_moves(self.packed_moves, stop - start, start)
+
+    def game_positions(self, game: int) -> np.ndarray:
+        """View of the positions after every move of a game, shape (moves, 2)."""
+        return self.positions[int(self.offsets[game]):int(self.offsets[game + 1])]
+
+    def boards(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """The positions start:stop as a (N, 6, 7) int8 stack of boards."""
+        return bitboards_to_boards(self.positions[start:stop])
+
+    def iter_positions(self, chunk: int = POSITIONS_CHUNK) -> Iterator[np.ndarray]:
+        """Yields views of consecutive positions, chunk at a time, e.g. to stream a large file."""
+        for start in range(0, len(self.positions), chunk):
+            yield self.positions[start:start + chunk]
+
+    def close(self):
+        """Drops the memory map, views handed out before keep it open until they are deleted."""
+        self.offsets = self.packed_moves = self.positions = self._data = None
+
+    def __enter__(self) -> 'GameRecords':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,151 @@
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, Optional, Union
+
+DEFAULT_FLUSH_EVERY = 64  # records
+DEFAULT_FLUSH_INTERVAL = 5.0  # seconds
+
+RECORD_MOVE = 'move'
+RECORD_GAME = 'game'
+
+
+class ResultsAggregator:
+    """
+    Summaries per agent that are updated with every record, so they never need the whole log:
+    moves, mean and max latency, nodes, games, wins, draws and losses.
+    """
+
+    def __init__(self):
+        self.agents: Dict[str, Dict[str, float]] = {}
+
+    def _agent(self, name: str) -> Dict[str, float]:
+        return self.agents.setdefault(name, {'moves': 0, 'latency_total': 0.0, 'latency_max': 0.0, 'nodes': 0,
+                                             'games': 0, 'wins': 0, 'draws': 0, 'losses': 0})
+
+    def add(self, record: Dict[str, Any]):
+        """Adds a move or game record (see ResultsSink)."""
+        if record['type'] == RECORD_MOVE:
+            row = self._agent(record['agent'])
+            row['moves'] += 1
+            row['latency_total'] += record['latency']
+            row['latency_max'] = max(row['latency_max'], record['latency'])
+            row['nodes'] += record.get('nodes') or 0
+        elif record['type'] == RECORD_GAME:
+            for name in (record['player_1'], record['player_2']):
+                row = self._agent(name)
+                row['games'] += 1
+                if record['winner'] is None:
+                    row['draws'] += 1
+                elif record['winner'] == name:
+                    row['wins'] += 1
+                else:
+                    row['losses'] += 1
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Returns agent name -> counts and latency_mean in seconds."""
+        summary = {}
+        for name, row in self.agents.items():
+            summary[name] = dict(row, latency_mean=row['latency_total'] / row['moves'] if row['moves'] else 0.0)
+        return summary
+
+
+class ResultsSink:
+    """
+    Append-only log of a session, one JSON object per line:
+
+    - {"type": "move", "game", "ply", "agent", "color", "column", "latency", "nodes", "evaluated_moves", "time"}
+    - {"type": "game", "game", "player_1", "player_2", "winner", "result", "moves", "time"}
+
+    Records are buffered and flushed every flush_every records, after flush_interval seconds and at the
+    end of every game, so a crash loses at most the moves of the running game. Memory does not grow
+    with the session; an optional ResultsAggregator keeps the summaries.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike], flush_every: int = DEFAULT_FLUSH_EVERY,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL, aggregator: Optional[ResultsAggregator] = None):
+        """
+        Input parameters:
+        - path: file the records are appended to, created if it does not exist.
+        - flush_every: number of records after which the buffer is written.
+        - flush_interval: seconds after which the buffer is written.
+        - aggregator: optional ResultsAggregator that gets every record.
+        """
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.aggregator = aggregator
+        self._file = open(path, 'a', encoding='utf-8')
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def write(self, record: Dict[str, Any]):
+        """Appends one record, flushing if enough records or time have passed."""
+        record.setdefault('time', time.time())
+        self._file.write(json.dumps(record) + '\n')
+        if self.aggregator is not None:
+            self.aggregator.add(record)
+        self._pending += 1
+        if self._pending >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def record_move(self, game: int, ply: int, agent: str, color: int, column: int, latency: float,
+                    nodes: Optional[int] = None, evaluated_moves: Optional[int] = None):
+        """
+        Appends the record of one move.
+
+        Input parameters:
+        - game: index of the game in the session.
+        - ply: number of moves played before this one.
+        - agent: name of the agent that moved.
+        - color: PLAYER1 or PLAYER2.
+        - column: the column played.
+        - latency: seconds the agent needed.
+        - nodes, evaluated_moves: search counters, None for agents without a search.
+        """
+        self.write({'type': RECORD_MOVE, 'game': game, 'ply': ply, 'agent': agent, 'color': int(color),
+                    'column': int(column), 'latency': latency, 'nodes': nodes, 'evaluated_moves': evaluated_moves})
+
+    def record_game(self, game: int, player_1: str, player_2: str, winner: Optional[str], result: str, moves: int):
+        """
+        Appends the record of a finished game and flushes the log.
+
+        Input parameters:
+        - game: index of the game in the session.
+        - player_1, player_2: names of the agents playing PLAYER1 and PLAYER2.
+        - winner: name of the winner, None for a draw.
+        - result: how the game ended, e.g. 'win', 'draw' or 'illegal move'.
+        - moves: number of moves played.
+        """
+        self.write({'type': RECORD_GAME, 'game': game, 'player_1': player_1, 'player_2': player_2,
+                    'winner': winner, 'result': result, 'moves': moves})
+        self.flush()
+
+    def flush(self):
+        self._file.flush()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self) -> 'ResultsSink':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_results(path: Union[str, os.PathLike]) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the records of a log written by ResultsSink. A last line cut off by a crash is skipped.
+    """
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                if line.endswith('\n'):
+                    raise
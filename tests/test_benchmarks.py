@@ -0,0 +1,76 @@
+import copy
+from game_utils import PLAYER1, PLAYER2, NO_PLAYER, initialize_game_state, apply_player_action, connected_four
+from agents.agent_bitboard.bitboard import Bitboard
+from agents.agent_minimax.threats import forced_move
+from benchmarks.suite import load_corpus, run_suite, compare_reports
+
+
+def test_corpus_positions_are_undecided():
+    """
+    Every position of the corpus has a unique id and legal moves, no move ends the game, and no position
+    has a forced move that generate_move_minimax would play without a search.
+    """
+    version, positions = load_corpus()
+    assert version == 2
+    assert len({position.id for position in positions}) == len(positions)
+    assert {position.phase for position in positions} == {'opening', 'middlegame', 'endgame'}
+    for position in positions:
+        board = initialize_game_state()
+        for ply, col in enumerate(position.moves):
+            player = PLAYER1 if ply % 2 == 0 else PLAYER2
+            assert board[-1, int(col)] == NO_PLAYER
+            apply_player_action(board, int(col), player)
+            assert not connected_four(board, player)
+        assert (position.board() == board).all()
+        bitboard = Bitboard.from_array(board)
+        assert forced_move(bitboard.player_position(position.player()), bitboard.mask) is None
+
+
+def test_run_suite_reports_all_metrics():
+    """
+    A small run of the suite reports timings, allocations, search statistics and time to depth.
+    """
+    report = run_suite(position_ids=['opening-4'], depth=2, max_depth=2, repeat=1, number=1)
+    metrics = report['metrics']
+    assert metrics['score_board/opening-4']['seconds'] > 0
+    assert metrics['connected_four/opening-4']['peak_bytes'] >= 0
+    assert metrics['search/opening-4']['nodes'] > 0
+    assert metrics['search/opening-4']['nodes_per_second'] > 0
+    assert list(metrics['time_to_depth/opening-4']) == ['depth_1', 'depth_2']
+    assert compare_reports(report, report) == []
+
+
+def test_compare_reports_flags_regressions():
+    """
+    Slower timings, more nodes and fewer nodes per second beyond the tolerance are regressions.
+    """
+    baseline = {'benchmark_version': 1, 'corpus_version': 1, 'metrics': {
+        'search/x': {'seconds': 1.0, 'nodes': 100, 'nodes_per_second': 100.0, 'depth': 4},
+        'time_to_depth/x': {'depth_1': 0.1},
+    }}
+    report = copy.deepcopy(baseline)
+    report['metrics']['search/x'].update(seconds=1.1, nodes=200, nodes_per_second=50.0, depth=2)
+    report['metrics']['time_to_depth/x']['depth_1'] = 0.2
+    regressions = compare_reports(report, baseline, tolerance=0.25)
+    assert len(regressions) == 3
+    assert not any('seconds' in line for line in regressions)
+    assert any('depth_1' in line for line in regressions)
+
+
+def test_compare_reports_fails_on_zero_metrics():
+    """
+    A metric that is zero measured nothing (e.g. a search answered without searching), it is reported
+    instead of skipped. Allocations may be zero, but allocating where nothing was allocated is a regression.
+    """
+    baseline = {'benchmark_version': 1, 'corpus_version': 2, 'metrics': {
+        'search/x': {'seconds': 1.0, 'nodes': 0, 'nodes_per_second': 100.0},
+        'score_board/x': {'seconds': 1e-5, 'peak_bytes': 0},
+        'connected_four/x': {'seconds': 1e-5, 'peak_bytes': 0},
+    }}
+    report = copy.deepcopy(baseline)
+    report['metrics']['search/x'].update(nodes=100, nodes_per_second=0.0)
+    report['metrics']['score_board/x']['peak_bytes'] = 64
+    regressions = compare_reports(report, baseline)
+    assert len(regressions) == 3
+    assert sum('nothing measured' in line for line in regressions) == 2
+    assert any(line.startswith('score_board/x peak_bytes') for line in regressions)
@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 from agents.agent_bitboard.bitboard import Bitboard
 from game_utils import PLAYER1, PLAYER2, GameState
 
@@ -141,5 +142,51 @@ class TestBitboard(unittest.TestCase):
         self.assertEqual(bitboard.mask, 0)
         self.assertEqual(bitboard.moves, 0)
 
+    def test_from_array(self):
+        board = np.zeros((6, 7), dtype=np.int8)
+        board[0, :] = [1, 2, 0, 1, 0, 0, 0]
+        board[1, 0] = 2
+        bitboard = Bitboard.from_array(board)
+        self.assertEqual(bitboard.moves, 4)
+        self.assertEqual(bitboard.column_height(0), 2)
+        self.assertEqual(bitboard.column_height(2), 0)
+        self.assertTrue(np.array_equal(bitboard.to_array(), board))
+        self.assertEqual(bitboard.player_position(PLAYER1) | bitboard.player_position(PLAYER2), bitboard.mask)
+
+    def test_from_array_matches_play(self):
+        bitboard = Bitboard()
+        for col in (3, 3, 4, 2):
+            bitboard.play(col)
+        converted = Bitboard.from_array(bitboard.to_array())
+        self.assertEqual(converted.current_position, bitboard.current_position)
+        self.assertEqual(converted.mask, bitboard.mask)
+        self.assertEqual(converted.moves, bitboard.moves)
+
+    def test_possible_and_winning_position(self):
+        bitboard = Bitboard()
+        for col in (0, 1, 0, 1, 0):
+            bitboard.play(col)
+        self.assertEqual(bitboard.possible(), (1 << 3) | (1 << 9) | sum(1 << col * 7 for col in range(2, 7)))
+        self.assertEqual(bitboard.winning_position(PLAYER1), 1 << 3)
+        self.assertEqual(bitboard.winning_position(PLAYER2), 0)
+
+    def test_non_losing_moves(self):
+        bitboard = Bitboard()
+        for col in (0, 1, 0, 1, 0):
+            bitboard.play(col)
+        # The only threat of PLAYER1 has to be blocked
+        self.assertEqual(bitboard.non_losing_moves(PLAYER2), 1 << 3)
+        bitboard = Bitboard()
+        for col in (1, 1, 2, 2, 3):
+            bitboard.play(col)
+        # Both ends of PLAYER1's three are open, every move loses
+        self.assertEqual(bitboard.non_losing_moves(PLAYER2), 0)
+        bitboard = Bitboard()
+        for col in (6, 1, 1, 2, 2, 3, 3):
+            bitboard.play(col)
+        # PLAYER1 wins in the second row of columns 0 and 4, so PLAYER2 must not play below
+        columns = [col for col in range(7) if bitboard.non_losing_moves(PLAYER2) & (0b111111 << col * 7)]
+        self.assertEqual(columns, [1, 2, 3, 5, 6])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from agents.agent_bitboard.bitboard import Bitboard
+from agents.agent_minimax.book import OpeningBook, build_book, write_book, canonical_key
+from game_utils import PLAYER1, PLAYER2
+
+
+def play(moves: str) -> Bitboard:
+    bitboard = Bitboard()
+    for col in moves:
+        bitboard.play(int(col))
+    return bitboard
+
+
+def side_to_move(bitboard: Bitboard) -> int:
+    return bitboard.player_position(PLAYER1 if bitboard.moves % 2 == 0 else PLAYER2)
+
+
+@pytest.fixture(scope='module')
+def book(tmp_path_factory):
+    path = tmp_path_factory.mktemp('book') / 'book.bin'
+    write_book(str(path), build_book(max_ply=2, depth=2), max_ply=2)
+    return OpeningBook(str(path))
+
+
+def test_book_folds_mirror_positions(book):
+    """
+    1 + 7 + 49 positions are reachable in two plies, mirror images share an entry: 1 + 4 + 25.
+    """
+    assert len(book) == 30
+    assert np.all(np.diff(book.keys.astype(np.int64)) > 0)
+
+
+def test_mirror_lookup_mirrors_the_move(book):
+    """
+    The move of a mirrored position is the mirrored move.
+    """
+    for moves, mirrored_moves in (('0', '6'), ('12', '54'), ('3', '3')):
+        bitboard, mirrored = play(moves), play(mirrored_moves)
+        move = book.lookup(side_to_move(bitboard), bitboard.mask)
+        assert move is not None
+        assert book.lookup(side_to_move(mirrored), mirrored.mask) == 6 - move
+
+
+def test_positions_outside_the_book(book):
+    """
+    Positions deeper than the book are not found.
+    """
+    bitboard = play('333')
+    assert book.lookup(side_to_move(bitboard), bitboard.mask) is None
+
+
+def test_canonical_key():
+    """
+    A position and its mirror image have the same canonical key.
+    """
+    left, right = play('01'), play('65')
+    assert canonical_key(side_to_move(left), left.mask)[0] == canonical_key(side_to_move(right), right.mask)[0]
+
+
+def test_generate_move_answers_from_the_book(book):
+    """
+    generate_move_minimax returns the book move without evaluating any move.
+    """
+    from agents.agent_minimax.minimax import generate_move_minimax
+    board = play('2').to_array()
+    bitboard = play('2')
+    expected = book.lookup(side_to_move(bitboard), bitboard.mask)
+    move, _, evaluated_moves = generate_move_minimax(board, PLAYER2, None, 'bitboard', book=book)
+    assert move == expected
+    assert evaluated_moves == 0
@@ -0,0 +1,78 @@
+import numpy as np
+from agents.agent_minimax.evaluation import IncrementalEvaluator, evaluate, WINDOWS, CELL_WINDOWS
+from agents.agent_minimax.minimax import score_board
+from agents.agent_bitboard.bitboard import Bitboard
+from game_utils import PLAYER1, PLAYER2
+
+
+def test_window_tables():
+    """
+    There are 69 windows of four cells and no cell is part of more than 13 of them.
+    """
+    assert len(WINDOWS) == 69
+    assert max(len(windows) for windows in CELL_WINDOWS) == 13
+
+
+def test_play_and_undo_follow_the_full_evaluation():
+    """
+    After every move and every undo the running scores equal a full evaluation.
+    """
+    evaluator = IncrementalEvaluator()
+    bitboard = Bitboard()
+    played = []
+    for col in [3, 3, 2, 4, 4, 1, 5, 2, 2, 6, 0, 3]:
+        bitboard.play(col)
+        cell = (bitboard.column_height(col) - 1) + col * (bitboard.height + 1)
+        player = (bitboard.moves - 1) % 2
+        evaluator.play(cell, player)
+        played.append((cell, player))
+        stones_0 = bitboard.current_position
+        stones_1 = bitboard.current_position ^ bitboard.mask
+        assert evaluator.score(0) == evaluate(stones_0, stones_1)
+        assert evaluator.score(1) == evaluate(stones_1, stones_0)
+
+    for cell, player in reversed(played):
+        evaluator.undo(cell, player)
+    assert evaluator.scores == [0, 0]
+    assert not any(evaluator.counts[0]) and not any(evaluator.counts[1])
+
+
+def test_reset_matches_score_board():
+    """
+    An evaluator set to a board gives the scores of score_board for both players.
+    """
+    board = np.array([[1, 2, 2, 1, 1, 0, 0],
+                      [0, 2, 1, 2, 2, 0, 0],
+                      [0, 0, 2, 1, 1, 0, 0],
+                      [0, 0, 1, 1, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0]], dtype=np.int8)
+    bitboard = Bitboard.from_array(board)
+    evaluator = IncrementalEvaluator()
+    evaluator.reset(bitboard.player_position(PLAYER1), bitboard.player_position(PLAYER2))
+    assert evaluator.score(0) == score_board(board, PLAYER1, None)
+    assert evaluator.score(1) == score_board(board, PLAYER2, None)
+
+
+def test_score_boards_matches_score_board_on_a_stack():
+    """
+    The vectorized scores equal score_board for every board of a stack and for both players.
+    """
+    from agents.agent_minimax.evaluation import score_boards
+    rng = np.random.default_rng(0)
+    boards = rng.integers(0, 3, size=(50, 6, 7)).astype(np.int8)
+    for player in (PLAYER1, PLAYER2):
+        expected = [score_board(board, player, None) for board in boards]
+        assert score_boards(boards, player).tolist() == expected
+
+
+def test_score_boards_single_board():
+    """
+    A single board gives a single int, the x6 penalty for the opponent's three is included.
+    """
+    from agents.agent_minimax.evaluation import score_boards
+    board = np.zeros((6, 7), dtype=int)
+    board[0, :3] = PLAYER2
+    assert score_boards(board, PLAYER1) == score_board(board, PLAYER1, None)
+    assert score_boards(np.zeros((6, 7), dtype=np.int8), PLAYER1) == 0
+    assert score_boards(np.zeros((0, 6, 7), dtype=np.int8), PLAYER1).shape == (0,)
@@ -312,4 +312,126 @@ def test_check_end_state_still_playing():
                      [0, 0, 0, 0, 0, 0, 0],
                      [0, 1, 2, 1, 2, 0, 0]], dtype=np.int8)
     result = check_end_state(board, PLAYER1)
-    assert result == GameState.STILL_PLAYING
\ No newline at end of file
+    assert result == GameState.STILL_PLAYING
+
+def test_connected_four_at_last_move():
+    """
+    Check that the four lines through the piece just played are detected, also with the
+    last piece in the middle of the line.
+    """
+    from game_utils import connected_four_at
+    board = np.array([[1, 1, 0, 1, 2, 2, 2],
+                      [0, 0, 0, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0]], dtype=BoardPiece)
+    PLAYER1 = BoardPiece(1)
+    assert connected_four_at(board, PLAYER1, 3) is False
+    board[0, 2] = PLAYER1
+    assert connected_four_at(board, PLAYER1, 2) is True
+    # The piece on top of column 4 belongs to the other player
+    assert connected_four_at(board, PLAYER1, 4) is False
+
+
+def test_connected_four_at_diagonal():
+    """
+    Check the diagonal through the last piece.
+    """
+    from game_utils import connected_four_at
+    board = np.array([[0, 0, 0, 1, 2, 2, 2],
+                      [0, 0, 1, 2, 1, 0, 0],
+                      [0, 1, 2, 1, 0, 0, 0],
+                      [1, 2, 1, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0]], dtype=BoardPiece)
+    PLAYER1 = BoardPiece(1)
+    assert connected_four_at(board, PLAYER1, 0) is True
+    assert connected_four_at(board, PLAYER1, 3) is False
+
+
+def test_connected_four_at_matches_connected_four():
+    """
+    In random games the local check after every move agrees with the full board scan.
+    """
+    from game_utils import connected_four, connected_four_at, apply_player_action, initialize_game_state
+    rng = np.random.default_rng(7)
+    for _ in range(30):
+        board = initialize_game_state()
+        for move in range(42):
+            player = BoardPiece(1 + move % 2)
+            open_columns = [col for col in range(7) if board[-1, col] == NO_PLAYER]
+            action = rng.choice(open_columns)
+            apply_player_action(board, action, player)
+            is_win = connected_four_at(board, player, action)
+            assert is_win == connected_four(board, player)
+            if is_win:
+                break
+
+
+def test_check_end_state_with_last_action_and_move_count():
+    """
+    With the last action and the move counter, wins and draws are found without scanning the board.
+    """
+    from game_utils import check_end_state, GameState
+    PLAYER1 = BoardPiece(1)
+    board = np.array([[0, 1, 1, 1, 1, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0]], dtype=BoardPiece)
+    assert check_end_state(board, PLAYER1, 4, 7) == GameState.IS_WIN
+    board[0, 4] = BoardPiece(2)
+    assert check_end_state(board, PLAYER1, 3, 7) == GameState.STILL_PLAYING
+    assert check_end_state(board, PLAYER1, 3, 42) == GameState.IS_DRAW
+
+
+def test_board_play_and_undo():
+    """
+    Board.play puts the pieces where apply_player_action does, and undo restores the board, the heights,
+    the move count and the hash.
+    """
+    from game_utils import Board, PLAYER1, PLAYER2, initialize_game_state, apply_player_action
+    moves = [3, 3, 2, 4, 3, 0, 6]
+    board = Board()
+    expected = initialize_game_state()
+    for ply, col in enumerate(moves):
+        player = PLAYER1 if ply % 2 == 0 else PLAYER2
+        assert board.player_to_move == player
+        board.play(col)
+        apply_player_action(expected, col, player)
+        assert (board.array == expected).all()
+    assert board.heights == [1, 0, 1, 3, 1, 0, 1]
+    assert board.move_count == len(moves)
+    assert board.history == moves
+    empty = Board()
+    for col in reversed(moves):
+        assert board.undo() == col
+    assert board == empty
+    assert board.key == empty.key
+    assert board.heights == [0] * 7 and board.move_count == 0
+
+
+def test_board_legality_and_interop():
+    """
+    A full column and columns outside the board are illegal, Board accepts existing arrays, and the
+    array view cannot be used to modify the board.
+    """
+    import pytest
+    from game_utils import Board, check_end_state, GameState, PLAYER1
+    board = Board.from_moves([0] * 6)
+    assert not board.is_legal(0)
+    assert not board.is_legal(7) and not board.is_legal(-1)
+    assert board.is_legal(1)
+    with pytest.raises(ValueError):
+        board.play(0)
+    copied = Board(board.array)
+    assert copied == board and copied.heights == board.heights
+    with pytest.raises(ValueError):
+        board.array[0, 1] = PLAYER1
+    copy = board.copy()
+    copy.play(1)
+    assert board.heights[1] == 0
+    win = Board.from_moves([0, 1, 0, 1, 0, 1, 0])
+    assert win.end_state(PLAYER1) == GameState.IS_WIN == check_end_state(win.array, PLAYER1)
@@ -0,0 +1,95 @@
+import numpy as np
+from agents.agent_minimax.hooks import SearchHooks, TreeRecorder, FoldedStackRecorder, HookedOrdering
+from agents.agent_minimax.minimax import generate_move_minimax
+from agents.agent_minimax.search import BitboardSearch
+from agents.agent_minimax.transposition import TranspositionTable
+from game_utils import PLAYER1
+
+MASK = (1 << 21) | (1 << 22) | (1 << 14)
+POSITION = 1 << 22
+
+
+class CountingHooks(SearchHooks):
+    def __init__(self):
+        self.events = {'search_start': 0, 'enter': 0, 'exit': 0, 'leaf': 0, 'cutoff': 0, 'iteration': []}
+
+    def search_start(self, position, mask, depth):
+        self.events['search_start'] += 1
+
+    def node_enter(self, ply, depth, alpha, beta, position, mask):
+        self.events['enter'] += 1
+
+    def node_exit(self, ply, depth, score):
+        self.events['exit'] += 1
+
+    def leaf(self, ply, score):
+        self.events['leaf'] += 1
+
+    def cutoff(self, ply, col, depth):
+        self.events['cutoff'] += 1
+
+    def iteration_complete(self, depth, scores):
+        self.events['iteration'].append(depth)
+
+
+def test_hooks_see_every_event():
+    """
+    The hooks get one event per node, leaf and cutoff counted by the search statistics.
+    """
+    hooks = CountingHooks()
+    search = BitboardSearch(TranspositionTable(1 << 16), hooks=hooks)
+    search.iterative_deepening(POSITION, MASK, 10.0, max_depth=4)
+    stats = search.statistics()
+    assert hooks.events['enter'] == hooks.events['exit'] == stats.nodes
+    assert hooks.events['leaf'] == stats.leaf_evaluations
+    assert hooks.events['cutoff'] == stats.cutoffs
+    assert hooks.events['iteration'] == [0, 1, 2, 3, 4]
+    assert hooks.events['search_start'] == 5
+
+
+def test_hooks_do_not_change_the_search():
+    """
+    The traced search returns the same scores and visits the same nodes, and removing the hooks
+    restores the plain search.
+    """
+    plain = BitboardSearch(TranspositionTable(1 << 16))
+    traced = BitboardSearch(TranspositionTable(1 << 16), hooks=SearchHooks())
+    assert isinstance(traced.ordering, HookedOrdering)
+    assert plain.root_scores(POSITION, MASK, 4) == traced.root_scores(POSITION, MASK, 4)
+    assert plain.nodes == traced.nodes
+    traced.set_hooks(None)
+    assert 'negamax' not in vars(traced)
+    assert not isinstance(traced.ordering, HookedOrdering)
+
+
+def test_tree_recorder_and_folded_stacks():
+    """
+    The tree dump has a line with score per searched root move, the folded stacks count every node.
+    """
+    tree = TreeRecorder(max_ply=1)
+    BitboardSearch(TranspositionTable(1 << 16), hooks=tree).root_scores(0, 0, 2)
+    lines = tree.dump().splitlines()
+    assert lines[0] == 'search depth 2'
+    # The empty board is symmetric, the columns 4 to 6 are not searched
+    assert len(lines) == 5
+    assert all(' -> ' in line for line in lines[1:])
+    assert lines[1].strip().startswith('3 depth 2')
+
+    folded = FoldedStackRecorder(max_ply=2)
+    search = BitboardSearch(TranspositionTable(1 << 16), hooks=folded)
+    search.root_scores(0, 0, 3)
+    assert sum(folded.counts.values()) == search.nodes
+    assert all(path.startswith('root;') and len(path.split(';')) <= 3 for path in folded.counts)
+    assert folded.folded().splitlines()[0].split(' ')[0] == 'root;0'
+
+
+def test_generate_move_minimax_with_hooks():
+    """
+    generate_move_minimax passes the hooks to its search.
+    """
+    hooks = CountingHooks()
+    board = np.zeros((6, 7), dtype=np.int8)
+    board[0, 3] = PLAYER1
+    generate_move_minimax(board, 2, None, 'bitboard', 2, hooks=hooks)
+    assert hooks.events['iteration'] == [2]
+    assert hooks.events['enter'] > 0
@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+from agents.agent_minimax import lazy_smp
+from agents.agent_minimax.search import BitboardSearch, WIN_SCORE
+from agents.agent_minimax.transposition import TranspositionTable, EXACT, LOWER, UPPER
+from game_utils import PLAYER1
+
+
+@pytest.fixture(autouse=True, scope='module')
+def pool():
+    yield lazy_smp.get_smp_pool(2, 1 << 16)
+    lazy_smp.shutdown_smp_pool()
+
+
+def test_shared_table_round_trip():
+    """
+    Entries come back unchanged, including negative and win scores and a missing best move.
+    """
+    table = lazy_smp.SharedTranspositionTable(1 << 10)
+    try:
+        table.store(12345, -WIN_SCORE + 3, 7, UPPER, None)
+        table.store(99999, WIN_SCORE - 1, 42, EXACT, 6)
+        assert table.probe(12345)[:5] == (12345, -WIN_SCORE + 3, 7, UPPER, None)
+        assert table.probe(99999)[:5] == (99999, WIN_SCORE - 1, 42, EXACT, 6)
+        assert table.probe(54321) is None
+        assert len(table) == 2
+        assert table.hit_rate == pytest.approx(2 / 3)
+    finally:
+        table.close()
+
+
+def test_shared_table_is_seen_by_an_attached_table():
+    """
+    A table attached by name reads the entries of the creating table, and the generation is shared.
+    """
+    table = lazy_smp.SharedTranspositionTable(1 << 10)
+    attached = lazy_smp.SharedTranspositionTable(1 << 10, table.name)
+    try:
+        table.new_search()
+        table.store(777, 15, 3, LOWER, 2)
+        assert attached.probe(777)[:5] == (777, 15, 3, LOWER, 2)
+        assert attached.generation == table.generation == 1
+    finally:
+        attached.close()
+        table.close()
+
+
+def test_shared_table_rejects_torn_slots():
+    """
+    A slot whose key word does not match its data word reads as empty.
+    """
+    table = lazy_smp.SharedTranspositionTable(1 << 10)
+    try:
+        table.store(5, 10, 2, EXACT, 1)
+        index = lazy_smp.HEADER_WORDS + lazy_smp.SLOT_WORDS * 5
+        table.words[index] ^= 1 << 20
+        assert table.probe(5) is None
+    finally:
+        table.close()
+
+
+def test_shared_table_keeps_deeper_entries_of_the_current_search():
+    """
+    The replacement scheme is the one of TranspositionTable.
+    """
+    table = lazy_smp.SharedTranspositionTable(4)
+    try:
+        table.store(1, 0, 5, EXACT, 0)
+        table.store(5, 0, 2, EXACT, 0)
+        assert table.probe(1) is not None
+        table.new_search()
+        table.store(5, 0, 2, EXACT, 0)
+        assert table.probe(5) is not None
+    finally:
+        table.close()
+
+
+def test_search_with_shared_table_matches_search_with_table():
+    """
+    The bitboard search returns the same root scores with the shared table as with a TranspositionTable.
+    """
+    mask = (1 << 21) | (1 << 22) | (1 << 14)
+    position = 1 << 22
+    table = lazy_smp.SharedTranspositionTable(1 << 16)
+    try:
+        shared = BitboardSearch(table).root_scores(position, mask, 5)
+    finally:
+        table.close()
+    assert shared == BitboardSearch(TranspositionTable(1 << 16)).root_scores(position, mask, 5)
+
+
+def test_lazy_smp_search_fixed_depth():
+    """
+    A fixed-depth Lazy-SMP search finds the same best score as the serial search.
+    """
+    mask = (1 << 21) | (1 << 22) | (1 << 14)
+    position = 1 << 22
+    scores, depth, nodes = lazy_smp.lazy_smp_search(position, mask, 4, workers=2, capacity=1 << 16)
+    serial = BitboardSearch(TranspositionTable(1 << 16)).root_scores(position, mask, 4)
+    assert depth == 4
+    assert nodes > 0
+    assert max(score for _, score in scores) == max(score for _, score in serial)
+
+
+def test_generate_move_with_lazy_smp():
+    """
+    generate_move_minimax finds the blocking move with Lazy-SMP, with a fixed depth and a time budget.
+    """
+    from agents.agent_minimax.minimax import generate_move_minimax
+    board = np.zeros((6, 7), dtype=np.int8)
+    board[0, :] = [2, 2, 2, 0, 0, 0, 1]
+    board[1, :] = [1, 1, 0, 0, 0, 0, 0]
+    move, _, evaluated_moves = generate_move_minimax(board, PLAYER1, None, 'bitboard', 3, workers=2,
+                                                     lazy_smp=True)
+    assert move == 3
+    assert evaluated_moves == 7
+    move, _, _ = generate_move_minimax(board, PLAYER1, None, 'bitboard', time_budget=0.3, workers=2,
+                                       lazy_smp=True)
+    assert move == 3
@@ -0,0 +1,141 @@
+import functools
+import random
+import pytest
+from agents.agent_bitboard.bitboard import Bitboard
+from agents.agent_mcts import generate_mcts
+from agents.agent_mcts.mcts import MCTSSavedState, Node, TreeSearch, rollout, get_mcts_pool, shutdown_mcts_pool, \
+    SELECTION_UCT, SELECTION_PUCT, WIN, DRAW, LOSS
+from agents.agent_minimax import parallel
+from agents.agent_random import generate_move
+from tournament import Agent, play_game, REASON_WIN
+from game_utils import Board, PLAYER1
+
+
+def position(moves: str):
+    board = Board.from_moves([int(col) for col in moves])
+    bitboard = Bitboard.from_array(board.array)
+    return bitboard.player_position(board.player_to_move), bitboard.mask
+
+
+def test_rollout_results():
+    """
+    A rollout takes an immediate win, loses against two threats and ends a full board as a draw.
+    """
+    rng = random.Random(0)
+    assert rollout(*position('010101'), rng) == WIN
+    assert rollout(*position('11223'), rng) == LOSS
+    full = Board.from_moves([0, 1] * 3 + [1, 0] * 3 + [2, 3] * 3 + [3, 2] * 3 + [4, 5] * 3 + [5, 4] * 3 + [6] * 6)
+    bitboard = Bitboard.from_array(full.array)
+    assert rollout(bitboard.current_position, bitboard.mask, rng) == DRAW
+
+
+@pytest.mark.parametrize('selection', [SELECTION_UCT, SELECTION_PUCT])
+def test_search_finds_double_threat(selection):
+    """
+    Both selection rules find the move that makes an open three on the bottom row.
+    """
+    board = Board.from_moves([3, 3, 4, 4])
+    col, saved_state = generate_mcts(board.array, PLAYER1, None, iterations=1500, selection=selection, seed=0)
+    assert col in (2, 5)
+    assert saved_state.stats.nodes == 1500 and saved_state.stats.depth > 0
+
+
+def test_search_is_reproducible_with_seed():
+    """
+    The same seed gives the same move and the same visits of the root children.
+    """
+    board = Board.from_moves([3, 2])
+    first = generate_mcts(board.array, PLAYER1, None, iterations=300, seed=7)
+    second = generate_mcts(board.array, PLAYER1, None, iterations=300, seed=7)
+    assert first[0] == second[0]
+    assert [child.visits for child in first[1].root.children] == [child.visits for child in second[1].root.children]
+
+
+def test_tree_is_reused_between_moves():
+    """
+    After the opponent's reply the search continues in the subtree of the position that was reached.
+    """
+    board = Board.from_moves([3])
+    col, saved_state = generate_mcts(board.array, board.player_to_move, None, iterations=500, seed=0)
+    board.play(col)
+    reply = max(saved_state.root.children[[c.col for c in saved_state.root.children].index(col)].children,
+                key=lambda node: node.visits)
+    board.play(reply.col)
+    visits = reply.visits
+    col, saved_state = generate_mcts(board.array, board.player_to_move, saved_state, iterations=200, seed=0)
+    assert saved_state.reused_visits == visits > 0
+    assert saved_state.root is reply and saved_state.root.parent is None
+    assert saved_state.root.visits == visits + 200
+
+    # A position that is not in the tree starts a new one
+    board = Board.from_moves([0, 6, 0])
+    col, saved_state = generate_mcts(board.array, board.player_to_move, saved_state, iterations=100, seed=0)
+    assert saved_state.reused_visits == 0 and saved_state.root.visits == 100
+
+
+def test_forced_moves_and_time_budget():
+    """
+    Immediate wins and blocks are played without a search, a time budget ends the search in time.
+    """
+    board = Board.from_moves([0, 1, 0, 1, 0])
+    col, saved_state = generate_mcts(board.array, board.player_to_move, MCTSSavedState(), iterations=10 ** 9)
+    assert col == 0 and saved_state.stats.nodes == 0 and saved_state.root is None
+    board = Board.from_moves([3])
+    col, saved_state = generate_mcts(board.array, board.player_to_move, None, time_budget=0.2)
+    assert 0 <= col < 7 and 0 < saved_state.stats.nodes and saved_state.stats.elapsed < 1.0
+    with pytest.raises(ValueError):
+        TreeSearch(Node(0, 0), selection='ucb')
+
+
+def test_parallel_trees_sum_their_iterations():
+    """
+    With two workers a second tree is searched in the process pool and its iterations are counted, a
+    different number of workers does not replace the pool of the minimax search.
+    """
+    try:
+        minimax_pool = parallel.get_pool(1)
+        board = Board.from_moves([3, 3, 4, 4])
+        col, saved_state = generate_mcts(board.array, PLAYER1, None, iterations=500, workers=2, seed=0)
+        assert col in (2, 5)
+        assert saved_state.stats.nodes == 1000 and saved_state.root.visits == 500
+        # The trees are searched in a pool of their own, the pool of the minimax search is left alone
+        assert get_mcts_pool(2) is not minimax_pool
+        assert parallel.get_pool(1) is minimax_pool
+    finally:
+        shutdown_mcts_pool()
+        parallel.shutdown_pool()
+
+
+def test_mcts_beats_random_in_the_tournament():
+    """
+    The agent plays complete tournament games and wins them against the random agent.
+    """
+    mcts = Agent('mcts', functools.partial(generate_mcts, iterations=200))
+    random_agent = Agent('random', generate_move)
+    for agent_1, agent_2 in ((mcts, random_agent), (random_agent, mcts)):
+        result = play_game(agent_1, agent_2, seed=1)
+        assert result.winner == 'mcts' and result.reason == REASON_WIN
+        mcts_stats = result.search_stats[0 if agent_1 is mcts else 1]
+        assert mcts_stats is not None and mcts_stats.nodes > 0
+
+
+def test_depth_is_the_deepest_iteration():
+    """
+    The depth of the statistics is the deepest node the iterations of the move reached, also when the
+    tree of earlier moves is reused.
+    """
+    board = Board.from_moves([3])
+    search = TreeSearch(Node(*position('3')), rng=random.Random(0))
+    search.run(iterations=300)
+
+    def deepest(node: Node, depth: int = 0) -> int:
+        visited = [child for child in node.children or () if child.visits]
+        return max((deepest(child, depth + 1) for child in visited), default=depth)
+
+    assert search.max_depth == deepest(search.root) > 0
+    col, saved_state = generate_mcts(board.array, board.player_to_move, None, iterations=300, seed=0)
+    board.play(col)
+    board.play(0)
+    col, saved_state = generate_mcts(board.array, board.player_to_move, saved_state, iterations=20, seed=0)
+    assert saved_state.reused_visits > 0
+    assert 0 < saved_state.stats.depth <= deepest(saved_state.root)
@@ -217,6 +217,292 @@ def test_generate_minimax_performance():
         exec_time = timer.timeit(number=10)
         print(f"{state_name} state: {exec_time:.5f} seconds for 10 runs")
 
+
+def test_bitboard_engine_takes_win():
+    """
+    The bitboard engine should complete four in the lowest row (board[0, :] is the bottom).
+    """
+    board = np.zeros((6, 7), dtype=np.int8)
+    board[0, :] = [1, 1, 1, 0, 2, 2, 0]
+    board[1, :] = [2, 0, 0, 0, 0, 0, 0]
+    best_move, _, evaluated_moves = generate_move_minimax(board, PLAYER1, None, 'bitboard')
+    assert best_move == 3
+    assert evaluated_moves == 7
+
+
+def test_bitboard_engine_blocks():
+    """
+    The bitboard engine should block the opponent's open three.
+    """
+    board = np.zeros((6, 7), dtype=np.int8)
+    board[0, :] = [2, 2, 2, 0, 0, 0, 1]
+    board[1, :] = [1, 1, 0, 0, 0, 0, 0]
+    best_move, _, _ = generate_move_minimax(board, PLAYER1, SavedState(), 'bitboard')
+    assert best_move == 3
+
+
+def test_bitboard_engine_skips_full_columns():
+    """
+    Full columns are never returned and are not counted as evaluated moves.
+    """
+    board = np.zeros((6, 7), dtype=np.int8)
+    board[:, 3] = [1, 2, 1, 2, 1, 2]
+    best_move, _, evaluated_moves = generate_move_minimax(board, PLAYER1, None, 'bitboard', 2)
+    assert best_move != 3
+    assert evaluated_moves == 6
+
+
+def test_bitboard_evaluate_matches_score_board():
+    """
+    The bitboard heuristic gives the same score as score_board for both players.
+    """
+    from agents.agent_bitboard.bitboard import Bitboard
+    from agents.agent_minimax.evaluation import evaluate
+    board = np.array([[1, 2, 2, 1, 1, 0, 0],
+                      [0, 2, 1, 2, 2, 0, 0],
+                      [0, 0, 2, 1, 1, 0, 0],
+                      [0, 0, 1, 1, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0]], dtype=np.int8)
+    bitboard = Bitboard.from_array(board)
+    player1, player2 = bitboard.player_position(PLAYER1), bitboard.player_position(PLAYER2)
+    assert evaluate(player1, player2) == score_board(board, PLAYER1, None)
+    assert evaluate(player2, player1) == score_board(board, PLAYER2, None)
+
+
+def test_bitboard_engine_keeps_transposition_table():
+    """
+    The transposition table is stored in the returned saved state and reused by the next call.
+    """
+    from agents.agent_minimax.minimax import MinimaxSavedState
+    board = np.zeros((6, 7), dtype=np.int8)
+    board[0, 3] = PLAYER1
+    _, saved_state, _ = generate_move_minimax(board, PLAYER2, None, 'bitboard', 4)
+    assert isinstance(saved_state, MinimaxSavedState)
+    table = saved_state.transposition_table
+    assert len(table) > 0
+    board[0, 2] = PLAYER2
+    board[1, 3] = PLAYER1
+    _, next_saved_state, _ = generate_move_minimax(board, PLAYER2, saved_state, 'bitboard', 4)
+    assert next_saved_state is saved_state
+    assert table.hits > 0
+    assert 0.0 < table.hit_rate <= 1.0
+
+
+def test_iterative_deepening_respects_max_depth():
+    """
+    The anytime search stops at max_depth even if there is time left.
+    """
+    from agents.agent_minimax.search import BitboardSearch
+    search = BitboardSearch()
+    scores, depth = search.iterative_deepening(0, 0, 60.0, max_depth=3)
+    assert depth == 3
+    assert sorted(col for col, _ in scores) == list(range(7))
+
+
+def test_iterative_deepening_completes_first_iteration():
+    """
+    Even without any time left, the first iteration completes, so there is always a move.
+    """
+    from agents.agent_minimax.search import BitboardSearch
+    scores, depth = BitboardSearch().iterative_deepening(0, 0, 0.0)
+    assert depth == 0
+    assert len(scores) == 7
+
+
+def test_generate_move_with_time_budget():
+    """
+    With a time budget the bitboard engine returns a legal move in about that time.
+    """
+    import time
+    board = np.zeros((6, 7), dtype=np.int8)
+    board[0, :] = [2, 2, 2, 0, 0, 0, 1]
+    board[1, :] = [1, 1, 0, 0, 0, 0, 0]
+    t0 = time.perf_counter()
+    best_move, _, evaluated_moves = generate_move_minimax(board, PLAYER1, None, 'bitboard', time_budget=0.3)
+    assert time.perf_counter() - t0 < 1.5
+    assert best_move == 3
+    assert evaluated_moves == 7
+
+
+def test_generate_move_stop_cancels_search():
+    """
+    A stop callable ends an anytime search long before its budget and aborts a fixed-depth search.
+    The flag is read every 1024 nodes, so the first shallow iterations still complete.
+    """
+    from agents.agent_minimax.search import SearchTimeout
+    board = np.zeros((6, 7), dtype=np.int8)
+    _, saved_state, evaluated_moves = generate_move_minimax(board, PLAYER1, None, 'bitboard', time_budget=60.0,
+                                                            stop=lambda: True)
+    assert evaluated_moves == 7
+    assert saved_state.stats.elapsed < 5.0
+    with pytest.raises(SearchTimeout):
+        generate_move_minimax(board, PLAYER1, None, 'bitboard', depth=12, stop=lambda: True)
+    with pytest.raises(ValueError):
+        generate_move_minimax(board, PLAYER1, None, 'ndarray', stop=lambda: True)
+
+
+def test_node_budget_is_reproducible():
+    """
+    A search limited by nodes instead of time gives the same move, depth and node count on every run,
+    and stops within one check interval of its budget.
+    """
+    from agents.agent_minimax.search import DEADLINE_CHECK_INTERVAL
+    board = np.zeros((6, 7), dtype=np.int8)
+    board[0, :] = [0, 0, 1, 2, 1, 0, 0]
+    runs = []
+    for _ in range(2):
+        action, saved_state, _ = generate_move_minimax(board, PLAYER2, None, 'bitboard', max_nodes=20_000, seed=1)
+        runs.append((action, saved_state.stats.depth, saved_state.stats.nodes))
+    assert runs[0] == runs[1]
+    assert runs[0][2] <= 20_000 + 7 * (DEADLINE_CHECK_INTERVAL + 1)
+    _, saved_state, _ = generate_move_minimax(board, PLAYER2, None, 'bitboard', max_nodes=200_000, seed=1)
+    assert saved_state.stats.depth > runs[0][1]
+    with pytest.raises(ValueError):
+        generate_move_minimax(board, PLAYER2, None, 'ndarray', max_nodes=1000)
+
+
+def test_seed_fixes_tie_breaking():
+    """
+    Columns 1 and 5 of a symmetric board score the same, the seed (not the global random state) decides
+    which one is played.
+    """
+    board = np.zeros((6, 7), dtype=np.int8)
+    board[:, 3] = [1, 2, 1, 2, 1, 2]
+    runs = []
+    for global_seed in (0, 1):
+        np.random.seed(global_seed)
+        runs.append([generate_move_minimax(board, PLAYER1, None, 'bitboard', depth=2, seed=seed)[0]
+                     for seed in range(20)])
+    assert runs[0] == runs[1]
+    assert set(runs[0]) == {1, 5}
+
+
+def test_in_place_board_allocates_nothing_per_node():
+    """
+    Making and taking back moves on the InPlaceBoard of the ndarray search allocates no memory at all,
+    while the copy per node it replaces allocated a board (and the np.where result) for every child.
+    """
+    import tracemalloc
+    from agents.agent_minimax.minimax import InPlaceBoard
+    board = np.zeros((6, 7), dtype=int)
+    board[5, :] = [0, 0, 0, 1, 2, 1, 0]
+    buffer = InPlaceBoard(board)
+    # The iterator is created before the measurement, the loop itself allocates nothing
+    nodes = iter(tuple(range(7)) * 1000)
+    tracemalloc.start()
+    try:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for col in nodes:
+            if buffer.can_play(col):
+                buffer.play(col, PLAYER1)
+                buffer.play(col, PLAYER2)
+                buffer.undo(col)
+                buffer.undo(col)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak == current
+    assert (buffer.board == board).all()
+
+
+def test_bitboard_search_memory_does_not_grow_per_node():
+    """
+    A fixed-depth bitboard search without a transposition table holds less than a byte per node at its
+    peak: the nodes only allocate short-lived integers, and what stays alive is the recursion and the
+    root scores. A board copy or a stored entry per node would hold more than 50 bytes per node.
+    """
+    import tracemalloc
+    from agents.agent_bitboard.bitboard import Bitboard
+    from agents.agent_minimax.search import BitboardSearch
+    from game_utils import Board
+    board = Board.from_moves([3, 3, 2, 4])
+    bitboard = Bitboard.from_array(board.array)
+    position, mask = bitboard.player_position(board.player_to_move), bitboard.mask
+    search = BitboardSearch()
+    # The first search fills the tables of the move ordering, the measured one has nodes only
+    search.root_scores(position, mask, 7)
+    tracemalloc.start()
+    try:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        search.root_scores(position, mask, 7)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert search.nodes > 5000
+    assert peak - current < search.nodes
+
+
+def test_ndarray_search_checks_wins_at_the_last_move(monkeypatch):
+    """
+    The ndarray search checks the lines through the stone just played at its nodes, the full-board
+    connected_four runs once per search, and the moves are the same.
+    """
+    import agents.agent_minimax.minimax as minimax
+    board = np.zeros((6, 7), dtype=int)
+    board[0, :] = [0, 1, 1, 0, 2, 2, 0]
+    board[1, :] = [0, 0, 2, 0, 0, 0, 0]
+    flipped = board[::-1].copy()
+    move, _, evaluated_moves = minimax.generate_move_ndarray(flipped, PLAYER1, None, 3, seed=0)
+    calls = []
+    full_board_check = minimax.connected_four
+    monkeypatch.setattr(minimax, 'connected_four', lambda *args: calls.append(args) or full_board_check(*args))
+    again, _, evaluated_again = minimax.generate_move_ndarray(flipped, PLAYER1, None, 3, seed=0)
+    assert (again, evaluated_again) == (move, evaluated_moves)
+    assert len(calls) == 1
+
+
+def test_in_place_board_landing_rows():
+    """
+    The search fills the highest empty row of a column first, as the copying search did, and only the
+    board buffer of the search is modified.
+    """
+    from agents.agent_minimax.minimax import InPlaceBoard, generate_move_ndarray
+    board = np.zeros((6, 7), dtype=int)
+    board[5, 0] = PLAYER2
+    buffer = InPlaceBoard(board)
+    buffer.play(0, PLAYER1)
+    assert buffer.board[4, 0] == PLAYER1
+    for _ in range(4):
+        buffer.play(0, PLAYER1)
+    assert not buffer.can_play(0)
+    assert buffer.can_play(1)
+    assert board[4, 0] == NO_PLAYER
+    before = board.copy()
+    generate_move_ndarray(board, PLAYER1, None, 2)
+    assert (board == before).all()
+
+
+def test_bitboard_leaves_are_scored_for_the_root_player():
+    """
+    The leaves one ply below the root are at an odd ply, the bitboard search scores them for the player
+    to move at the root like the ndarray search does, with the x6 weight on the opponent's threes.
+    Both engines prefer the same column, and the table entries of the search are marked with the
+    root player.
+    """
+    from agents.agent_bitboard.bitboard import Bitboard
+    from agents.agent_minimax.minimax import generate_move_ndarray
+    from agents.agent_minimax.search import BitboardSearch, ROOT_PARITY_KEY
+    from agents.agent_minimax.transposition import TranspositionTable
+    from game_utils import Board
+    board = Board.from_moves([4, 4, 1, 3, 3, 3, 1, 3, 3])
+    bitboard = Bitboard.from_array(board.array)
+    position = bitboard.player_position(PLAYER2)
+    scores = dict(BitboardSearch(TranspositionTable(1 << 10)).root_scores(position, bitboard.mask, 0))
+    for col, score in scores.items():
+        child = board.array.copy()
+        child[np.argmax(child[:, col] == NO_PLAYER), col] = PLAYER2
+        assert score == score_board(child, PLAYER2, None)
+    # The ndarray search drops stones into the highest empty row, so it gets the board upside down
+    best_move, _, _ = generate_move_ndarray(board.array[::-1].copy(), PLAYER2, None, 0, seed=0)
+    assert best_move == max(scores, key=scores.get) == 4
+
+    table = TranspositionTable(1 << 12)
+    BitboardSearch(table).root_scores(position, bitboard.mask, 2)
+    assert all(entry[0] & ROOT_PARITY_KEY for entry in table.entries if entry is not None)
+
 # run tests using pytest
 if __name__ == "__main__":
-    test_generate_minimax_performance()
\ No newline at end of file
+    test_generate_minimax_performance()
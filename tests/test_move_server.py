@@ -0,0 +1,154 @@
+import asyncio
+import pytest
+from game_utils import PLAYER1, PLAYER2, initialize_game_state, apply_player_action
+from move_server import MoveServer, MoveClient, parse_position, parse_limits, EXECUTOR_THREAD, ERROR_BAD_REQUEST, \
+    ERROR_BUSY, ERROR_EXPIRED
+
+
+async def serve(server: MoveServer):
+    listener = await server.serve_tcp('127.0.0.1', 0)
+    return listener, listener.sockets[0].getsockname()[1]
+
+
+def test_parse_position_from_moves_and_board():
+    """
+    A list of moves and the equivalent board give the same position, invalid positions and values that
+    are not integers raise ValueError.
+    """
+    board = initialize_game_state()
+    apply_player_action(board, 3, PLAYER1)
+    apply_player_action(board, 4, PLAYER2)
+    apply_player_action(board, 3, PLAYER1)
+    from_moves, player = parse_position({'moves': [3, 4, 3]})
+    assert player == PLAYER2
+    assert (from_moves == board).all()
+    from_board, player = parse_position({'board': board.tolist(), 'player': 2})
+    assert player == PLAYER2
+    assert (from_board == board).all()
+    for request in ({'moves': [7]}, {'moves': [0] * 7}, {'board': [[0] * 7] * 5, 'player': 1},
+                    {'moves': [], 'player': 3}, {}, {'moves': '33'}, {'moves': [3.0]}, {'moves': [3], 'player': 1.5},
+                    {'moves': [], 'player': True}, {'board': [[0.5] * 7] * 6, 'player': 1},
+                    {'moves': [3], 'player': 1}, {'board': board.tolist(), 'player': 1}):
+        with pytest.raises(ValueError):
+            parse_position(request)
+
+
+def test_parse_limits():
+    """
+    Budgets must be positive finite numbers and are cut to the maximum, depth limits positive integers.
+    """
+    assert parse_limits({}, 1.0, 30.0) == (1.0, None)
+    assert parse_limits({'budget': 2, 'max_depth': 8}, 1.0, 30.0) == (2.0, 8)
+    assert parse_limits({'budget': 1e18}, 1.0, 30.0) == (30.0, None)
+    for request in ({'budget': float('nan')}, {'budget': float('inf')}, {'budget': 'nan'}, {'budget': 0},
+                    {'budget': -1.0}, {'budget': True}, {'max_depth': 2.5}, {'max_depth': 0}, {'max_depth': '8'}):
+        with pytest.raises(ValueError):
+            parse_limits(request, 1.0, 30.0)
+    with pytest.raises(ValueError):
+        MoveServer(max_workers=1, executor=EXECUTOR_THREAD, default_budget=5.0, max_budget=1.0)
+
+
+def test_server_answers_concurrent_games():
+    """
+    Concurrent requests of several clients are all answered with a legal move, and the metrics count them.
+    """
+    async def scenario():
+        server = MoveServer(max_workers=2, executor=EXECUTOR_THREAD)
+        listener, port = await serve(server)
+        async with listener:
+            clients = [await MoveClient.connect('127.0.0.1', port) for _ in range(3)]
+            games = [[], [3, 3], [0, 1, 0, 1, 0, 1]]
+            responses = await asyncio.gather(*(client.move(moves, budget=0.3, max_depth=4)
+                                               for client, moves in zip(clients, games)))
+            metrics = await clients[0].metrics()
+            for client in clients:
+                await client.close()
+        server.close()
+        return responses, metrics
+
+    responses, metrics = asyncio.run(scenario())
+    for response in responses:
+        assert 'error' not in response
+        assert 0 <= response['move'] <= 6
+        assert response['evaluated_moves'] == 7
+        assert response['depth'] >= 0
+    # Three in a row in column 0: the only move that does not lose at once is to block it
+    assert responses[2]['move'] == 0
+    assert metrics['completed'] == 3
+    assert metrics['received'] == 4
+    assert metrics['throughput'] > 0
+    assert 0 < metrics['latency_p50'] <= metrics['latency_max']
+
+
+def test_bad_and_expired_requests():
+    """
+    Malformed requests and requests whose time ran out while they were queued are answered with an error
+    instead of a move.
+    """
+    async def scenario():
+        server = MoveServer(max_workers=1, executor=EXECUTOR_THREAD)
+        listener, port = await serve(server)
+        async with listener:
+            client = await MoveClient.connect('127.0.0.1', port)
+            # A PLAYER1 stone floating in column 2 and a PLAYER2 stone floating in column 4
+            floating = initialize_game_state()
+            floating[3, 2], floating[0, 4] = PLAYER1, PLAYER2
+            bad = [await client.request(moves=[9]), await client.move([3], budget=float('nan')),
+                   await client.move([3], budget='nan'),
+                   await client.request(board=floating.tolist(), player=int(PLAYER1), budget=0.2)]
+            # The second request waits for the only worker longer than its budget
+            searched, expired = await asyncio.gather(client.move([], budget=0.5), client.move([3], budget=0.05))
+            await client.close()
+        server.close()
+        return bad, searched, expired, server.metrics
+
+    bad, searched, expired, metrics = asyncio.run(scenario())
+    assert all(response['error'].startswith(ERROR_BAD_REQUEST) for response in bad)
+    assert 'stones above an empty cell' in bad[-1]['error']
+    assert 'error' not in searched
+    assert expired['error'] == ERROR_EXPIRED
+    assert (metrics.failed, metrics.expired, metrics.completed) == (4, 1, 1)
+
+
+def test_full_queue_rejects_requests():
+    """
+    Requests beyond the workers and the queue are rejected as busy instead of waiting.
+    """
+    async def scenario():
+        server = MoveServer(max_workers=1, max_queue=1, executor=EXECUTOR_THREAD)
+        responses = await asyncio.gather(*(server.handle_request({'id': index, 'moves': [], 'budget': 5.0,
+                                                                     'max_depth': 2})
+                                           for index in range(3)))
+        server.close()
+        return responses
+
+    responses = asyncio.run(scenario())
+    assert [response.get('error') for response in responses] == [None, None, ERROR_BUSY]
+
+
+def test_disconnect_cancels_search():
+    """
+    When a client disconnects, its search is stopped long before its budget is used up and its slot is freed.
+    """
+    async def scenario():
+        server = MoveServer(max_workers=1, executor=EXECUTOR_THREAD)
+        listener, port = await serve(server)
+        async with listener:
+            client = await MoveClient.connect('127.0.0.1', port)
+            request = asyncio.create_task(client.move([], budget=30.0))
+            await asyncio.sleep(0.3)
+            assert server.pending == 1
+            await client.close()
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            while server.pending and loop.time() - start < 10.0:
+                await asyncio.sleep(0.05)
+            request.cancel()
+            elapsed = loop.time() - start
+        server.close()
+        return server, elapsed
+
+    server, elapsed = asyncio.run(scenario())
+    assert server.pending == 0
+    assert server.metrics.cancelled == 1
+    assert elapsed < 10.0
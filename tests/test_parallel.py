@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from agents.agent_minimax import parallel
+from agents.agent_minimax.search import BitboardSearch
+from agents.agent_minimax.transposition import TranspositionTable
+from game_utils import PLAYER1
+
+
+@pytest.fixture(autouse=True, scope='module')
+def pool():
+    yield parallel.get_pool(2)
+    parallel.shutdown_pool()
+
+
+def test_pool_is_reused():
+    """
+    The same pool serves every call with the same number of workers.
+    """
+    assert parallel.get_pool(2) is parallel.get_pool(2)
+
+
+def test_parallel_root_scores_match_the_serial_search():
+    """
+    The best score and the best columns of the parallel root search equal the serial ones.
+    """
+    mask = (1 << 21) | (1 << 22) | (1 << 14)
+    position = 1 << 22
+    serial = BitboardSearch(TranspositionTable(1 << 16)).root_scores(position, mask, 4)
+    scores, nodes = parallel.parallel_root_scores(position, mask, 4, 2)
+    assert nodes > 0
+    assert sorted(col for col, _ in scores) == sorted(col for col, _ in serial)
+    serial_best, parallel_best = max(s for _, s in serial), max(s for _, s in scores)
+    assert serial_best == parallel_best
+    assert {c for c, s in serial if s == serial_best} == {c for c, s in scores if s == parallel_best}
+
+
+def test_parallel_speedup_report():
+    """
+    The speedup report contains both timings and equal best scores.
+    """
+    report = parallel.parallel_speedup(0, 0, 3, 2)
+    assert report['serial_best'] == report['parallel_best']
+    assert report['speedup'] > 0
+
+
+def test_generate_move_with_workers():
+    """
+    generate_move_minimax finds the blocking move with a parallel search, also as an anytime search.
+    """
+    from agents.agent_minimax.minimax import generate_move_minimax
+    board = np.zeros((6, 7), dtype=np.int8)
+    board[0, :] = [2, 2, 2, 0, 0, 0, 1]
+    board[1, :] = [1, 1, 0, 0, 0, 0, 0]
+    move, _, evaluated_moves = generate_move_minimax(board, PLAYER1, None, 'bitboard', 3, workers=2)
+    assert move == 3
+    assert evaluated_moves == 7
+    move, _, _ = generate_move_minimax(board, PLAYER1, None, 'bitboard', time_budget=0.3, workers=2)
+    assert move == 3
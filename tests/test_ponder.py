@@ -0,0 +1,83 @@
+import time
+from game_utils import PLAYER1, PLAYER2, initialize_game_state, apply_player_action
+from agents.agent_minimax.minimax import generate_move_minimax, start_pondering, stop_pondering, ENGINE_BITBOARD
+from agents.agent_minimax.ponder import Ponderer
+from agents.agent_minimax.transposition import TranspositionTable
+
+
+def engine_opening():
+    """Board after the engine (PLAYER1) answered 3 3 with its anytime search, and the engine's state."""
+    board = initialize_game_state()
+    apply_player_action(board, 3, PLAYER1)
+    apply_player_action(board, 3, PLAYER2)
+    action, saved_state, _ = generate_move_minimax(board, PLAYER1, None, ENGINE_BITBOARD, max_depth=5,
+                                                   time_budget=0.2)
+    apply_player_action(board, action, PLAYER1)
+    return board, saved_state
+
+
+def test_ponder_hit_answers_at_once():
+    """
+    If the predicted reply is played, a pondered search that is deep enough is answered without a new search.
+    """
+    board, saved_state = engine_opening()
+    saved_state = start_pondering(board, PLAYER1, saved_state, max_depth=4)
+    ponderer = saved_state.ponderer
+    time.sleep(0.5)
+    predicted = ponderer.predicted_move
+    assert predicted is not None
+    apply_player_action(board, predicted, PLAYER2)
+    start = time.perf_counter()
+    action, saved_state, evaluated_moves = generate_move_minimax(board, PLAYER1, saved_state, ENGINE_BITBOARD,
+                                                                 depth=4)
+    assert time.perf_counter() - start < 0.1
+    assert saved_state.ponder_hit
+    assert saved_state.ponderer is None
+    assert saved_state.stats.depth == 4
+    assert evaluated_moves == 7
+    assert 0 <= action <= 6
+
+
+def test_ponder_miss_searches_again():
+    """
+    If another reply is played, the move is searched normally and the pondering thread is stopped.
+    """
+    board, saved_state = engine_opening()
+    saved_state = start_pondering(board, PLAYER1, saved_state)
+    ponderer = saved_state.ponderer
+    time.sleep(0.2)
+    other = next(col for col in (0, 6, 1, 5) if col != ponderer.predicted_move)
+    apply_player_action(board, other, PLAYER2)
+    _, saved_state, evaluated_moves = generate_move_minimax(board, PLAYER1, saved_state, ENGINE_BITBOARD, depth=3)
+    assert not saved_state.ponder_hit
+    assert not ponderer._thread.is_alive()
+    assert saved_state.stats.depth == 3
+    assert evaluated_moves == 7
+
+
+def test_ponderer_stops_quickly_and_keeps_last_iteration():
+    """
+    Stopping an unbounded pondering search returns soon, with the last completed iteration of the predicted position.
+    """
+    # PLAYER1 played column 3 (bit 3 * 7), PLAYER2 is to move and has no stones yet
+    ponderer = Ponderer(TranspositionTable(), 0, 1 << 21).start()
+    time.sleep(0.3)
+    start = time.perf_counter()
+    result = ponderer.stop()
+    assert time.perf_counter() - start < 0.5
+    assert result.predicted_move == ponderer.predicted_move
+    assert result.mask.bit_count() == 2
+    assert result.depth >= 1
+    assert len(result.scores) == 7
+
+
+def test_nothing_to_ponder():
+    """
+    Stopping without pondering returns None, and a game that the engine already won is not pondered.
+    """
+    assert stop_pondering(None) is None
+    board = initialize_game_state()
+    for ply, col in enumerate((0, 1, 0, 1, 0, 1, 0)):
+        apply_player_action(board, col, PLAYER1 if ply % 2 == 0 else PLAYER2)
+    saved_state = start_pondering(board, PLAYER1, None)
+    assert stop_pondering(saved_state) is None
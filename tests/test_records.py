@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from agents.agent_bitboard.bitboard import Bitboard
+from game_utils import Board
+from records import GameRecords, write_records, pack_moves, unpack_moves, game_positions, boards_to_bitboards, \
+    bitboards_to_boards
+
+
+def random_games(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    games = []
+    for _ in range(count):
+        board = Board()
+        for _ in range(rng.integers(0, 43)):
+            board.play(int(rng.choice([col for col in range(7) if board.is_legal(col)])))
+        games.append(list(board.history))
+    return games
+
+
+def test_pack_and_unpack_moves():
+    """
+    Moves are stored in nibbles, two per byte, and any range of them can be unpacked.
+    """
+    moves = [3, 3, 2, 4, 6, 0, 1]
+    packed = pack_moves(moves)
+    assert len(packed) == 4
+    assert packed[0] == 3 | 3 << 4
+    assert unpack_moves(packed, 7).tolist() == moves
+    assert unpack_moves(packed, 3, start=3).tolist() == moves[3:6]
+    assert unpack_moves(packed, 0, start=5).tolist() == []
+
+
+def test_game_positions_match_bitboard():
+    """
+    The two-uint64 encoding of every position is the one of Bitboard.from_array, and illegal moves are rejected.
+    """
+    moves = [3, 3, 2, 4, 2, 2]
+    positions = game_positions(moves)
+    for ply in range(len(moves)):
+        bitboard = Bitboard.from_array(Board.from_moves(moves[:ply + 1]).array)
+        assert positions[ply].tolist() == [bitboard.current_position, bitboard.mask]
+    with pytest.raises(ValueError):
+        game_positions([0] * 7)
+    with pytest.raises(ValueError):
+        game_positions([7])
+
+
+def test_convert_boards_vectorized():
+    """
+    Converting a stack of boards to bitboards and back gives the same boards.
+    """
+    games = random_games(40)
+    boards = np.stack([Board.from_moves(game).array for game in games])
+    positions = boards_to_bitboards(boards)
+    assert positions.dtype == np.uint64 and positions.shape == (40, 2)
+    converted = bitboards_to_boards(positions)
+    assert converted.dtype == np.int8
+    assert (converted == boards).all()
+
+
+def test_write_and_read_records(tmp_path):
+    """
+    Games written to a record file are read back through a memory map: moves, offsets and positions
+    are views of the file, and the boards of the positions are the boards of the games.
+    """
+    games = random_games(25) + [[]]
+    path = tmp_path / 'games.c4rec'
+    write_records(path, games)
+    with GameRecords(path) as records:
+        assert len(records) == len(games)
+        assert len(records.positions) == sum(map(len, games))
+        assert not records.positions.flags.owndata
+        assert np.shares_memory(records.positions, records._data)
+        for index, game in enumerate(games):
+            assert records.moves(index).tolist() == game
+            assert (records.game_positions(index) == game_positions(game)).all()
+        last = games[3]
+        start = int(records.offsets[3])
+        assert (records.boards(start, start + len(last))[-1] == Board.from_moves(last).array).all()
+        assert sum(len(chunk) for chunk in records.iter_positions(chunk=10)) == len(records.positions)
+
+
+def test_reject_foreign_files(tmp_path):
+    """
+    A file without the magic bytes of the format is not read.
+    """
+    path = tmp_path / 'other.bin'
+    path.write_bytes(bytes(64))
+    with pytest.raises(ValueError):
+        GameRecords(path)
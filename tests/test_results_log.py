@@ -0,0 +1,89 @@
+import json
+import pytest
+from results_log import ResultsSink, ResultsAggregator, read_results, RECORD_MOVE, RECORD_GAME
+
+
+def test_sink_appends_records(tmp_path):
+    """
+    Records are JSON lines appended to the log, a second sink on the same file keeps the earlier records.
+    """
+    path = tmp_path / 'results.jsonl'
+    with ResultsSink(path) as sink:
+        sink.record_move(0, 0, 'minimax', 1, 3, 0.5, nodes=1000, evaluated_moves=7)
+        sink.record_game(0, 'minimax', 'random', 'minimax', 'win', 7)
+    with ResultsSink(path) as sink:
+        sink.record_game(1, 'random', 'minimax', None, 'draw', 42)
+    records = list(read_results(path))
+    assert [record['type'] for record in records] == [RECORD_MOVE, RECORD_GAME, RECORD_GAME]
+    assert records[0]['column'] == 3 and records[0]['nodes'] == 1000 and records[0]['evaluated_moves'] == 7
+    assert records[2]['winner'] is None and records[2]['moves'] == 42
+
+
+def test_sink_flushes_buffered_records(tmp_path):
+    """
+    Moves are buffered until flush_every records were written, a finished game is flushed at once.
+    """
+    path = tmp_path / 'results.jsonl'
+    sink = ResultsSink(path, flush_every=3, flush_interval=float('inf'))
+    sink.record_move(0, 0, 'a', 1, 3, 0.1)
+    sink.record_move(0, 1, 'b', 2, 3, 0.1)
+    assert path.read_text() == ''
+    sink.record_move(0, 2, 'a', 1, 2, 0.1)
+    assert len(path.read_text().splitlines()) == 3
+    sink.record_move(0, 3, 'b', 2, 2, 0.1)
+    sink.record_game(0, 'a', 'b', 'a', 'win', 4)
+    assert len(path.read_text().splitlines()) == 5
+    sink.close()
+
+
+def test_aggregator_summary(tmp_path):
+    """
+    The aggregator keeps moves, latency, nodes and results per agent while the records are written.
+    """
+    aggregator = ResultsAggregator()
+    with ResultsSink(tmp_path / 'results.jsonl', aggregator=aggregator) as sink:
+        sink.record_move(0, 0, 'a', 1, 3, 0.2, nodes=100)
+        sink.record_move(0, 1, 'b', 2, 3, 1.0)
+        sink.record_move(0, 2, 'a', 1, 3, 0.4, nodes=50)
+        sink.record_game(0, 'a', 'b', 'b', 'illegal move', 3)
+        sink.record_game(1, 'b', 'a', None, 'draw', 42)
+    summary = aggregator.summary()
+    assert summary['a']['moves'] == 2 and summary['a']['nodes'] == 150
+    assert summary['a']['latency_mean'] == pytest.approx(0.3) and summary['a']['latency_max'] == 0.4
+    assert summary['b']['nodes'] == 0
+    assert (summary['a']['wins'], summary['a']['draws'], summary['a']['losses']) == (0, 1, 1)
+    assert (summary['b']['wins'], summary['b']['draws'], summary['b']['losses']) == (1, 1, 0)
+
+
+def test_read_results_skips_truncated_line(tmp_path):
+    """
+    A last line cut off by a crash is skipped, a broken line in the middle of the log is an error.
+    """
+    path = tmp_path / 'results.jsonl'
+    record = json.dumps({'type': RECORD_GAME, 'game': 0})
+    path.write_text(record + '\n' + record[:10])
+    assert len(list(read_results(path))) == 1
+    path.write_text(record[:10] + '\n' + record + '\n')
+    with pytest.raises(ValueError):
+        list(read_results(path))
+
+
+def test_main_closes_the_log_when_a_game_is_interrupted(tmp_path, capsys):
+    """
+    When a player interrupts a game of main.human_vs_agent, the moves played so far are flushed to the log.
+    """
+    from main import human_vs_agent
+    from agents.agent_random import generate_move
+
+    def interrupt_at_second_move(board, player, saved_state):
+        if (board != 0).sum() >= 2:
+            raise KeyboardInterrupt
+        return generate_move(board, player, saved_state)
+
+    path = tmp_path / 'results.jsonl'
+    # The traceback keeps the frame of human_vs_agent alive, so the log is not closed by garbage collection
+    with pytest.raises(KeyboardInterrupt) as interrupted:
+        human_vs_agent(generate_move, interrupt_at_second_move, results_path=path)
+    records = list(read_results(path))
+    assert [record['type'] for record in records] == [RECORD_MOVE] * 3
+    assert [record['ply'] for record in records] == [0, 1, 2]
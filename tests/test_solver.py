@@ -0,0 +1,105 @@
+import random
+from agents.agent_bitboard.bitboard import Bitboard, alignment
+from agents.agent_minimax.search import BOTTOM_MASKS, COLUMN_MASKS, TOP_MASKS
+from agents.agent_minimax.solver import Solver, Outcome, result_from_score
+from game_utils import PLAYER1, PLAYER2
+
+
+def side_to_move(bitboard: Bitboard) -> int:
+    return bitboard.player_position(PLAYER1 if bitboard.moves % 2 == 0 else PLAYER2)
+
+
+def brute_force_score(position: int, mask: int) -> int:
+    """Plain negamax over the whole game tree, only usable with few empty cells."""
+    moves = mask.bit_count()
+    if moves == 42:
+        return 0
+    children = []
+    for col in range(7):
+        if mask & TOP_MASKS[col]:
+            continue
+        move = (mask + BOTTOM_MASKS[col]) & COLUMN_MASKS[col]
+        if alignment(position | move):
+            return (43 - moves) // 2
+        children.append(mask | move)
+    return max(-brute_force_score(position ^ mask, child) for child in children)
+
+
+def random_endgame(rng: random.Random, empty_cells: int) -> Bitboard:
+    """Plays random moves until empty_cells are left, without any four on the board."""
+    while True:
+        bitboard = Bitboard()
+        while 42 - bitboard.moves > empty_cells:
+            bitboard.play(rng.choice([col for col in range(7) if bitboard.can_play(col)]))
+            if alignment(bitboard.current_position) or alignment(bitboard.current_position ^ bitboard.mask):
+                break
+        else:
+            return bitboard
+
+
+def test_solver_matches_brute_force():
+    """
+    The solver scores equal a full game-tree search on random endgames.
+    """
+    rng = random.Random(3)
+    for _ in range(15):
+        bitboard = random_endgame(rng, 8)
+        position = side_to_move(bitboard)
+        assert Solver().solve(position, bitboard.mask) == brute_force_score(position, bitboard.mask)
+
+
+def test_best_moves_keep_the_value():
+    """
+    Every column returned by best_moves reaches the value of the position, the others do not.
+    """
+    rng = random.Random(4)
+    for _ in range(10):
+        bitboard = random_endgame(rng, 8)
+        position, mask = side_to_move(bitboard), bitboard.mask
+        value, best = Solver().best_moves(position, mask)
+        for col in range(7):
+            if mask & TOP_MASKS[col]:
+                continue
+            move = (mask + BOTTOM_MASKS[col]) & COLUMN_MASKS[col]
+            score = (43 - mask.bit_count()) // 2 if alignment(position | move) \
+                else -brute_force_score(position ^ mask, mask | move)
+            assert (score == value) == (col in best) or alignment(position | move)
+
+
+def test_result_from_score():
+    """
+    Scores are converted to outcome and plies until the end of the game.
+    """
+    assert result_from_score(0, 30) == (Outcome.DRAW, 12, 0)
+    # Winning with the next stone when 10 stones are on the board
+    assert result_from_score((43 - 10) // 2, 10) == (Outcome.WIN, 1, 16)
+    # Winning with the stone after next
+    assert result_from_score((43 - 12) // 2, 10) == (Outcome.WIN, 3, 15)
+    # The opponent wins with their next stone
+    assert result_from_score(-((43 - 11) // 2), 10) == (Outcome.LOSS, 2, -16)
+
+
+def test_analyze_immediate_win():
+    """
+    A position with a winning move is a win in one ply.
+    """
+    bitboard = Bitboard()
+    for col in (0, 6, 1, 6, 2, 5):
+        bitboard.play(col)
+    result = Solver().analyze(side_to_move(bitboard), bitboard.mask)
+    assert result.outcome == Outcome.WIN
+    assert result.moves_to_end == 1
+
+
+def test_generate_move_uses_the_solver():
+    """
+    With solve=True, and automatically in the endgame, generate_move_minimax plays a perfect move.
+    """
+    from agents.agent_minimax.minimax import generate_move_minimax
+    rng = random.Random(5)
+    for solve in (True, None):
+        bitboard = random_endgame(rng, 10)
+        player = PLAYER1 if bitboard.moves % 2 == 0 else PLAYER2
+        value, best = Solver().best_moves(side_to_move(bitboard), bitboard.mask)
+        move, _, _ = generate_move_minimax(bitboard.to_array(), player, None, 'bitboard', solve=solve)
+        assert move in best
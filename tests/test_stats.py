@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from agents.agent_minimax.minimax import generate_move_minimax, MinimaxSavedState
+from agents.agent_minimax.stats import SearchStats
+from game_utils import PLAYER1
+
+
+def test_derived_rates():
+    """
+    Rates are computed from the counts and are 0.0 without data.
+    """
+    stats = SearchStats(nodes=1000, nodes_per_depth=[0, 7, 49, 343], cutoffs=10, first_move_cutoffs=9,
+                        tt_probes=4, tt_hits=1, elapsed=0.5)
+    assert stats.first_move_cutoff_rate == pytest.approx(0.9)
+    assert stats.tt_hit_rate == pytest.approx(0.25)
+    assert stats.effective_branching_factor == pytest.approx(7.0)
+    assert stats.nodes_per_second == pytest.approx(2000)
+    empty = SearchStats()
+    assert empty.first_move_cutoff_rate == empty.effective_branching_factor == empty.nodes_per_second == 0.0
+
+
+def test_merge_adds_counts():
+    """
+    Merging adds counts and per-depth nodes and keeps the larger depth.
+    """
+    stats = SearchStats(nodes=3, nodes_per_depth=[0, 3], depth=1, elapsed=1.0)
+    stats.merge(SearchStats(nodes=10, nodes_per_depth=[0, 2, 8], depth=2, elapsed=2.0))
+    assert stats.nodes == 13
+    assert stats.nodes_per_depth == [0, 5, 8]
+    assert stats.depth == 2
+    assert stats.elapsed == pytest.approx(3.0)
+    assert stats.searches == 2
+    assert stats.as_dict()['nodes'] == 13
+
+
+def test_generate_move_minimax_reports_stats():
+    """
+    The bitboard engine leaves the statistics of its search in the returned saved state.
+    """
+    board = np.zeros((6, 7), dtype=np.int8)
+    board[0, 3] = PLAYER1
+    _, saved_state, _ = generate_move_minimax(board, 2, MinimaxSavedState(1 << 16), 'bitboard', 4)
+    stats = saved_state.stats
+    assert stats.depth == 4
+    assert stats.nodes == sum(stats.nodes_per_depth) > 0
+    # Root moves are at ply 1, leaves at ply depth + 1
+    assert len(stats.nodes_per_depth) == 6
+    assert 0 < stats.leaf_evaluations < stats.nodes
+    assert 0 < stats.first_move_cutoffs <= stats.cutoffs
+    assert stats.tt_probes >= stats.tt_hits > 0
+    assert stats.elapsed > 0
+
+
+def test_ndarray_engine_reports_stats():
+    """
+    The default ndarray engine fills the same statistics, without a transposition table, and a forced
+    move is answered without nodes.
+    """
+    board = np.zeros((6, 7), dtype=np.int8)
+    board[0, 3] = PLAYER1
+    _, saved_state, _ = generate_move_minimax(board, 2, None, 'ndarray', 2)
+    stats = saved_state.stats
+    assert isinstance(saved_state, MinimaxSavedState)
+    assert stats.depth == 2
+    assert stats.nodes == sum(stats.nodes_per_depth) > 0
+    # The board is its own mirror image, so only the columns up to the middle are searched
+    assert len(stats.nodes_per_depth) == 4 and stats.nodes_per_depth[:2] == [1, 4]
+    assert 0 < stats.leaf_evaluations < stats.nodes
+    assert 0 < stats.first_move_cutoffs <= stats.cutoffs
+    assert stats.tt_probes == 0
+    assert stats.elapsed > 0
+
+    board[0, :2] = PLAYER1
+    move, saved_state, _ = generate_move_minimax(board, PLAYER1, saved_state, 'ndarray', 2)
+    assert move == 2 and saved_state.stats.nodes == 0 and saved_state.stats.depth == 0
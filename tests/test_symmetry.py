@@ -0,0 +1,86 @@
+import numpy as np
+from agents.agent_bitboard.bitboard import Bitboard, mirror
+from agents.agent_minimax.search import BitboardSearch
+from agents.agent_minimax.solver import Solver
+from agents.agent_minimax.symmetry import canonical_key, is_symmetric, canonical_board, is_symmetric_board, \
+    mirror_scores
+from agents.agent_minimax.transposition import TranspositionTable
+from game_utils import Board
+
+
+def position(moves: str):
+    board = Board.from_moves([int(col) for col in moves])
+    bitboard = Bitboard.from_array(board.array)
+    return bitboard.player_position(board.player_to_move), bitboard.mask, board.array
+
+
+def test_mirror():
+    """
+    mirror moves every column to its mirror image on boards of up to 8 columns, and mirrors position + mask
+    like both parts.
+    """
+    rng = np.random.default_rng(0)
+    for width, height in ((7, 6), (8, 7), (5, 4)):
+        column_bits = (1 << (height + 1)) - 1
+        for _ in range(200):
+            key = int(rng.integers(0, 1 << (width * (height + 1)), dtype=np.uint64))
+            columns = [(key >> (col * (height + 1))) & column_bits for col in range(width)]
+            assert mirror(key, width, height) == sum(bits << ((width - 1 - col) * (height + 1))
+                                                     for col, bits in enumerate(columns))
+    own, mask, _ = position('0123336')
+    assert mirror(own + mask) == mirror(own) + mirror(mask)
+
+
+def test_canonical_forms():
+    """
+    A position and its mirror image have one canonical form, for bitboards and for ndarray boards.
+    """
+    left, right = position('0126'), position('6540')
+    left_key, left_mirrored = canonical_key(*left[:2])
+    right_key, right_mirrored = canonical_key(*right[:2])
+    assert left_key == right_key and left_mirrored != right_mirrored
+    left_board, left_mirrored = canonical_board(left[2])
+    right_board, right_mirrored = canonical_board(right[2])
+    assert (left_board == right_board).all() and left_mirrored != right_mirrored
+    assert is_symmetric(0, 0) and is_symmetric(*position('135')[:2]) and is_symmetric_board(position('135')[2])
+    assert not is_symmetric(*position('15')[:2]) and not is_symmetric_board(position('15')[2])
+
+
+def test_mirror_positions_share_table_entries():
+    """
+    After searching a position, the search of its mirror image finds the entries of the first one and
+    gives the mirrored scores.
+    """
+    table = TranspositionTable(1 << 16)
+    search = BitboardSearch(table)
+    search.new_search()
+    left = dict(search.root_scores(*position('0121')[:2], 4))
+    left_nodes = search.nodes
+    right = dict(search.root_scores(*position('6545')[:2], 4))
+    assert search.nodes < left_nodes
+    assert max(right.values()) == max(left.values())
+    assert {6 - col for col, score in left.items() if score == max(left.values())} == \
+           {col for col, score in right.items() if score == max(right.values())}
+
+    solver = Solver(TranspositionTable(1 << 16))
+    early, late = position('33333322222244')[:2], position('33333344444422')[:2]
+    assert solver.solve(*early) == solver.solve(*late)
+
+
+def test_symmetric_root_searches_half_the_columns():
+    """
+    The root of a symmetric position only searches the columns up to the middle, the others get the score
+    of their mirror image, so every legal column is still returned.
+    """
+    searched = []
+
+    class Recording(BitboardSearch):
+        def score_root_move(self, position, mask, col, depth, best_score):
+            searched.append(col)
+            return super().score_root_move(position, mask, col, depth, best_score)
+
+    scores = dict(Recording(TranspositionTable(1 << 16)).root_scores(0, 0, 3))
+    assert sorted(searched) == [0, 1, 2, 3]
+    assert sorted(scores) == list(range(7))
+    assert all(scores[col] == scores[6 - col] for col in range(7))
+    assert mirror_scores([(3, 5), (1, 2)]) == [(3, 5), (1, 2), (5, 2)]
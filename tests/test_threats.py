@@ -0,0 +1,85 @@
+import numpy as np
+from agents.agent_bitboard.bitboard import Bitboard, alignment
+from agents.agent_minimax.minimax import generate_move_minimax
+from agents.agent_minimax.search import BitboardSearch, TOP_MASKS, WIN_SCORE
+from agents.agent_minimax.threats import possible_moves, winning_cells, forced_move
+from agents.agent_minimax.transposition import TranspositionTable
+from game_utils import Board, PLAYER1, PLAYER2
+
+
+def position(moves: str):
+    board = Board.from_moves([int(col) for col in moves])
+    bitboard = Bitboard.from_array(board.array)
+    return bitboard.player_position(board.player_to_move), bitboard.mask
+
+
+def test_winning_cells_match_brute_force():
+    """
+    The shifted masks find exactly the empty cells that complete four, playable or not.
+    """
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        own, mask = 0, 0
+        for _ in range(rng.integers(0, 30)):
+            col = int(rng.choice([col for col in range(7) if not mask & TOP_MASKS[col]]))
+            move = (mask + (1 << 7 * col)) & ~mask
+            if alignment(own | move):
+                break
+            own, mask = own ^ mask, mask | move
+        expected = 0
+        for cell in range(49):
+            if cell % 7 != 6 and not mask & 1 << cell and alignment(own | 1 << cell):
+                expected |= 1 << cell
+        assert winning_cells(own, mask) == expected
+        assert bin(possible_moves(mask)).count('1') == sum(not mask & TOP_MASKS[col] for col in range(7))
+
+
+def test_forced_move():
+    """
+    An immediate win comes before a block, a single threat is blocked, two threats or none need a search.
+    """
+    assert forced_move(*position('01010')) == 0  # PLAYER2 blocks column 0
+    assert forced_move(*position('010101')) == 0  # PLAYER1 wins in column 0 before blocking column 1
+    assert forced_move(*position('0101014')) == 1  # PLAYER2 wins in column 1
+    assert forced_move(*position('3344')) is None
+    assert forced_move(*position('11223')) is None  # both ends of PLAYER1's three are open
+    assert forced_move(0, 0) is None
+
+
+def test_generate_move_plays_forced_moves_without_search():
+    """
+    Both engines answer a forced position at once, with a depth that would take far too long to search.
+    """
+    board = Board.from_moves([0, 1, 0, 1, 0])
+    for engine in ('bitboard', 'ndarray'):
+        move, saved_state, evaluated_moves = generate_move_minimax(board.array, PLAYER2, None, engine, depth=12)
+        assert move == 0 and evaluated_moves == 7
+        assert saved_state.stats.nodes == 0
+    board.play(1)
+    move, saved_state, _ = generate_move_minimax(board.array, PLAYER1, None, 'bitboard', depth=12)
+    assert move == 0 and saved_state.stats.nodes == 0
+
+
+def test_search_only_searches_the_block():
+    """
+    Inside the tree a node with a single threat of the opponent only searches the block.
+    """
+    search = BitboardSearch(TranspositionTable(1 << 12))
+    search.new_search()
+    own, mask = position('01010')
+    search.evaluator.reset(own, own ^ mask)
+    search.negamax(own, mask, 2, 0, -WIN_SCORE - 1, WIN_SCORE + 1)
+    # This node, the block, and the seven leaves below it
+    assert search.nodes == 9
+
+
+def test_search_loses_against_two_threats():
+    """
+    A node where the opponent has two immediate wins is lost without searching any move.
+    """
+    search = BitboardSearch(TranspositionTable(1 << 12))
+    search.new_search()
+    own, mask = position('11223')
+    search.evaluator.reset(own, own ^ mask)
+    assert search.negamax(own, mask, 4, 0, -WIN_SCORE - 1, WIN_SCORE + 1) == -(WIN_SCORE - 2)
+    assert search.nodes == 1
@@ -0,0 +1,152 @@
+import numpy as np
+from game_utils import PLAYER1, PLAYER2, initialize_game_state, apply_player_action, check_end_state, GameState
+from agents.agent_random import generate_move
+import functools
+from tournament import Agent, play_game, random_opening, run_tournament, schedule_games, standings, move_budget, \
+    log_game, REASON_ILLEGAL_MOVE, REASON_TIME, MOVE_BUDGET_SHARE
+
+
+def always_column_0(board, player, saved_state):
+    return 0, saved_state
+
+
+def slow_first_column(board, player, saved_state):
+    import time
+    time.sleep(0.05)
+    return int(np.flatnonzero(board[-1] == 0)[0]), saved_state
+
+
+def first_column_if_told_budget(board, player, saved_state, time_budget=None):
+    if time_budget is None:
+        return -1, saved_state
+    return int(np.flatnonzero(board[-1] == 0)[0]), saved_state
+
+
+def test_random_opening_is_seeded_and_not_decided():
+    """
+    The same seed gives the same opening, and the opening does not end the game.
+    """
+    assert random_opening(7, 8) == random_opening(7, 8)
+    board = initialize_game_state()
+    for ply, action in enumerate(random_opening(7, 8)):
+        player = PLAYER1 if ply % 2 == 0 else PLAYER2
+        apply_player_action(board, action, player)
+        assert check_end_state(board, player, action, ply + 1) == GameState.STILL_PLAYING
+
+
+def test_play_game_is_reproducible():
+    """
+    Games of random agents with the same seed are identical.
+    """
+    random_agent = Agent('random', generate_move)
+    # The fields after the moves (timings and search statistics) depend on the machine
+    assert play_game(random_agent, random_agent, seed=3)[:8] == play_game(random_agent, random_agent, seed=3)[:8]
+
+
+def test_illegal_move_loses():
+    """
+    The first agent that plays into the full column loses by an illegal move.
+    """
+    result = play_game(Agent('first', always_column_0), Agent('second', always_column_0))
+    assert result.winner == 'second'
+    assert result.reason == REASON_ILLEGAL_MOVE
+    assert result.moves == (0,) * 6
+
+
+def test_time_limit_loses():
+    """
+    An agent that is slower than the time limit loses on time.
+    """
+    result = play_game(Agent('slow', slow_first_column), Agent('random', generate_move), time_limit=0.01)
+    assert result.winner == 'random'
+    assert result.reason == REASON_TIME
+
+
+def test_time_limit_is_passed_to_agents():
+    """
+    Agents with a time_budget_keyword are told a share of the time limit, or their own smaller budget,
+    agents without one and games without a limit get no budget.
+    """
+    told = Agent('told', first_column_if_told_budget, time_budget_keyword='time_budget')
+    assert play_game(told, Agent('random', generate_move), time_limit=0.5).reason not in (REASON_TIME,
+                                                                                         REASON_ILLEGAL_MOVE)
+    assert play_game(told, Agent('random', generate_move)).reason == REASON_ILLEGAL_MOVE
+    assert move_budget(told, 0.5) == {'time_budget': 0.5 * MOVE_BUDGET_SHARE}
+    assert move_budget(told, None) == {}
+    assert move_budget(Agent('untold', first_column_if_told_budget), 0.5) == {}
+    own_budget = Agent('own', functools.partial(first_column_if_told_budget, time_budget=0.1),
+                       time_budget_keyword='time_budget')
+    assert move_budget(own_budget, 0.5) == {'time_budget': 0.1}
+    assert move_budget(own_budget, 0.05) == {'time_budget': 0.05 * MOVE_BUDGET_SHARE}
+
+    from agents.agent_minimax import generate_minimax
+    minimax_agent = Agent('minimax', functools.partial(generate_minimax, engine='bitboard', depth=12),
+                          time_budget_keyword='time_budget')
+    result = play_game(minimax_agent, Agent('random', generate_move), opening=(3, 3), time_limit=0.3, seed=1)
+    assert result.reason != REASON_TIME and result.max_move_time <= 0.3
+
+
+def test_schedule_alternates_colors():
+    """
+    Every opening is played by a pair of agents once with each color.
+    """
+    agent_a, agent_b = Agent('a', generate_move), Agent('b', generate_move)
+    games = schedule_games([agent_a, agent_b], 4, opening_plies=2, seed=5)
+    assert len(games) == 4
+    assert [(first.name, second.name) for first, second, *_ in games] == [('a', 'b'), ('b', 'a')] * 2
+    assert games[0][2] == games[1][2]
+    assert [game for *_, game in games] == [0, 1, 2, 3]
+
+
+def test_run_tournament_in_process_pool():
+    """
+    The pool plays every scheduled game with the same results as a single process, and the standings add up.
+    """
+    agents = [Agent('random', generate_move), Agent('stubborn', always_column_0)]
+    results = list(run_tournament(agents, 6, workers=2, seed=2))
+    assert sorted(result.game for result in results) == list(range(6))
+    table = standings(results)
+    assert sum(row['wins'] + row['draws'] + row['losses'] for row in table.values()) == 12
+    in_process = list(run_tournament(agents, 6, workers=1, seed=2))
+    assert sorted(result[:8] for result in results) == sorted(result[:8] for result in in_process)
+
+
+def test_search_stats_are_summed_per_game():
+    """
+    The statistics of the minimax agent are summed over its moves, agents without statistics report None.
+    """
+    from agents.agent_minimax import generate_minimax
+    minimax_agent = Agent('minimax', generate_minimax, ('bitboard', 2))
+    result = play_game(minimax_agent, Agent('random', generate_move), seed=4)
+    minimax_stats, random_stats = result.search_stats
+    assert random_stats is None
+    assert minimax_stats.searches == (len(result.moves) + 1) // 2
+    assert minimax_stats.nodes == sum(minimax_stats.nodes_per_depth) > 0
+
+
+def test_moves_are_logged_like_main(tmp_path):
+    """
+    A game writes a record for every move the agents played, with the fields main.py logs, and then its result.
+    """
+    from agents.agent_minimax import generate_minimax
+    from results_log import ResultsSink, read_results, RECORD_MOVE, RECORD_GAME
+    minimax_agent = Agent('minimax', generate_minimax, ('bitboard', 2))
+    result = play_game(minimax_agent, Agent('random', generate_move), opening=(3, 4), game=5, seed=4)
+    assert len(result.move_records) == len(result.moves) - 2
+    assert [record.ply for record in result.move_records] == list(range(2, len(result.moves)))
+    assert [record.column for record in result.move_records] == list(result.moves[2:])
+    for record in result.move_records:
+        assert record.color == (PLAYER1 if record.ply % 2 == 0 else PLAYER2)
+        assert record.agent == ('minimax' if record.color == PLAYER1 else 'random')
+        assert (record.nodes is not None) == (record.agent == 'minimax')
+        assert record.latency >= 0
+
+    path = tmp_path / 'results.jsonl'
+    with ResultsSink(path) as sink:
+        log_game(sink, result)
+    records = list(read_results(path))
+    assert [record['type'] for record in records] == [RECORD_MOVE] * len(result.move_records) + [RECORD_GAME]
+    assert all(record['game'] == 5 for record in records)
+    assert set(records[0]) == {'type', 'game', 'ply', 'agent', 'color', 'column', 'latency', 'nodes',
+                               'evaluated_moves', 'time'}
+    assert records[-1]['moves'] == len(result.moves) and records[-1]['winner'] == result.winner
@@ -0,0 +1,58 @@
+from agents.agent_minimax.transposition import TranspositionTable, position_key, EXACT, LOWER, UPPER
+
+
+def test_probe_after_store():
+    """
+    A stored position is found again with its depth, bound and best move.
+    """
+    table = TranspositionTable(16)
+    table.store(42, 7, 3, LOWER, 2)
+    assert table.probe(42) == (42, 7, 3, LOWER, 2, 0)
+    assert table.probe(43) is None
+
+
+def test_hit_rate():
+    """
+    The hit rate counts every probe, also the ones that miss.
+    """
+    table = TranspositionTable(16)
+    assert table.hit_rate == 0.0
+    table.store(1, 0, 1, EXACT, 0)
+    table.probe(1)
+    table.probe(2)
+    assert table.probes == 2
+    assert table.hits == 1
+    assert table.hit_rate == 0.5
+
+
+def test_replacement_prefers_depth_within_a_search():
+    """
+    In the same search a shallower entry does not replace a deeper one in the same slot.
+    """
+    table = TranspositionTable(16)
+    table.store(1, 10, 5, EXACT, 3)
+    table.store(17, 20, 2, UPPER, 4)
+    assert table.probe(1) is not None
+    assert table.probe(17) is None
+    table.store(17, 20, 6, UPPER, 4)
+    assert table.probe(17) is not None
+
+
+def test_replacement_of_older_searches():
+    """
+    Entries of an earlier search are always replaceable, so the table does not fill up with stale entries.
+    """
+    table = TranspositionTable(16)
+    table.store(1, 10, 5, EXACT, 3)
+    table.new_search()
+    table.store(17, 20, 1, LOWER, 4)
+    assert table.probe(17) is not None
+    assert len(table) == 1
+
+
+def test_position_key_is_unique_for_player_to_move():
+    """
+    The same stones with a different player to move give a different key.
+    """
+    mask = 0b11
+    assert position_key(0b01, mask) != position_key(0b10, mask)
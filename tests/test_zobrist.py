@@ -0,0 +1,50 @@
+import numpy as np
+from game_utils import Board, PLAYER1, PLAYER2, initialize_game_state
+from zobrist import zobrist_hash, zobrist_hash_many, zobrist_update, zobrist_table, ZOBRIST_TABLE
+
+
+def random_boards(count: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    boards = []
+    for _ in range(count):
+        board = Board()
+        for _ in range(rng.integers(0, 30)):
+            board.play(int(rng.choice([col for col in range(7) if board.is_legal(col)])))
+        boards.append(board.array)
+    return np.stack(boards)
+
+
+def test_zobrist_table_is_seeded():
+    """
+    The keys only depend on the seed, and empty cells have the key zero.
+    """
+    assert (zobrist_table() == ZOBRIST_TABLE).all()
+    assert not (zobrist_table(1) == ZOBRIST_TABLE).all()
+    assert not ZOBRIST_TABLE[0].any()
+    assert zobrist_hash(initialize_game_state()) == 0
+
+
+def test_incremental_hash_matches_full_hash():
+    """
+    Updating the hash move by move gives the hash of the board computed from scratch, and the undo
+    of a move is the same update.
+    """
+    board = initialize_game_state()
+    key = 0
+    for row, col, piece in ((0, 3, PLAYER1), (1, 3, PLAYER2), (0, 2, PLAYER1)):
+        board[row, col] = piece
+        key = zobrist_update(key, row, col, piece)
+        assert key == zobrist_hash(board)
+    assert zobrist_update(key, 0, 2, PLAYER1) == zobrist_hash(Board.from_moves([3, 3]).array)
+
+
+def test_bulk_hash_matches_single_hash():
+    """
+    The vectorized hash of a stack of boards equals the hash of every board, also across chunks.
+    """
+    boards = random_boards(50)
+    hashes = zobrist_hash_many(boards)
+    assert hashes.dtype == np.uint64 and hashes.shape == (50,)
+    assert [int(key) for key in hashes] == [zobrist_hash(board) for board in boards]
+    assert (zobrist_hash_many(boards, chunk=7) == hashes).all()
+    assert len(set(hashes.tolist())) == len({board.tobytes() for board in boards})
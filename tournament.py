@@ -0,0 +1,339 @@
+import argparse
+import functools
+import itertools
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from game_utils import Board, GenMove, GameState, MoveStatus, PLAYER1, PLAYER2, BOARD_COLS
+from game_utils import check_move_status
+from agents.agent_minimax.stats import SearchStats
+
+DEFAULT_OPENING_PLIES = 2
+DEFAULT_NODE_BUDGET = 50_000  # nodes per move of the 'minimax-nodes' agent
+# Share of the time limit an agent is told to use, the rest is left for the call and the board copy
+MOVE_BUDGET_SHARE = 0.8
+
+# Ways a game can end, stored in GameResult.reason
+REASON_WIN = 'win'
+REASON_DRAW = 'draw'
+REASON_ILLEGAL_MOVE = 'illegal move'
+REASON_TIME = 'time'
+
+
+class Agent(NamedTuple):
+    """
+    A player of the tournament: a GenMove function and the extra arguments passed after saved_state.
+    The function may return (action, saved_state) or (action, saved_state, ...) like generate_minimax.
+    It must be defined at module level, so it can be sent to the worker processes.
+
+    time_budget_keyword names the keyword argument of the function that takes the seconds per move,
+    e.g. 'time_budget' of generate_minimax. Under a time limit the agent is told its budget through it
+    (see move_budget), so it can keep to the limit; agents without it are not told and only lose on time.
+    """
+    name: str
+    generate_move: GenMove
+    args: tuple = ()
+    time_budget_keyword: Optional[str] = None
+
+
+class MoveRecord(NamedTuple):
+    """
+    One move an agent played, with the fields of results_log.ResultsSink.record_move.
+
+    - ply: number of moves played before this one, including the opening.
+    - agent: name of the agent.
+    - color: PLAYER1 or PLAYER2.
+    - column: the column played.
+    - latency: seconds the agent needed.
+    - nodes: nodes of its search, None for an agent without SearchStats.
+    - evaluated_moves: third value returned by the agent (see generate_minimax), None if it returns two.
+    """
+    ply: int
+    agent: str
+    color: int
+    column: int
+    latency: float
+    nodes: Optional[int]
+    evaluated_moves: Optional[int]
+
+
+class GameResult(NamedTuple):
+    """
+    Result of one game.
+
+    - game: index of the game in the tournament.
+    - seed: seed of the random generators of the game.
+    - player_1, player_2: names of the agents playing PLAYER1 and PLAYER2.
+    - winner: name of the winning agent, None for a draw.
+    - reason: REASON_WIN, REASON_DRAW, REASON_ILLEGAL_MOVE or REASON_TIME.
+    - moves: all columns played, starting with the opening.
+    - opening_plies: number of moves of the opening.
+    - max_move_time: seconds of the slowest move of an agent.
+    - search_stats: SearchStats of all moves of the agents playing PLAYER1 and PLAYER2, summed over the game,
+      None for an agent that does not report them (see MinimaxSavedState.stats).
+    - move_records: a MoveRecord for every move the agents played, an illegal or late last move has none.
+    """
+    game: int
+    seed: int
+    player_1: str
+    player_2: str
+    winner: Optional[str]
+    reason: str
+    moves: Tuple[int, ...]
+    opening_plies: int
+    max_move_time: float
+    search_stats: Tuple[Optional[SearchStats], Optional[SearchStats]] = (None, None)
+    move_records: Tuple[MoveRecord, ...] = ()
+
+
+def random_opening(seed: int, plies: int) -> Tuple[int, ...]:
+    """
+    Returns a random opening that does not end the game.
+
+    Input parameters:
+    - seed: seed of the opening, the same seed gives the same opening.
+    - plies: number of moves of the opening.
+    """
+    rng = random.Random(seed)
+    while True:
+        board = Board()
+        for _ in range(plies):
+            player = board.player_to_move
+            board.play(rng.choice([col for col in range(BOARD_COLS) if board.is_legal(col)]), player)
+            if board.end_state(player) != GameState.STILL_PLAYING:
+                break
+        else:
+            return tuple(board.history)
+
+
+def move_budget(agent: Agent, time_limit: Optional[float]) -> Dict[str, float]:
+    """
+    Keyword arguments that tell an agent its time per move: MOVE_BUDGET_SHARE of the time limit, or the
+    budget the agent was given with functools.partial if that is smaller.
+
+    Returns:
+    - Dict[str, float]: {agent.time_budget_keyword: seconds}, empty without a time limit or for an agent
+      without time_budget_keyword.
+    """
+    if time_limit is None or agent.time_budget_keyword is None:
+        return {}
+    budget = time_limit * MOVE_BUDGET_SHARE
+    own_budget = getattr(agent.generate_move, 'keywords', {}).get(agent.time_budget_keyword)
+    if own_budget is not None:
+        budget = min(budget, own_budget)
+    return {agent.time_budget_keyword: budget}
+
+
+def play_game(agent_1: Agent, agent_2: Agent, opening: Sequence[int] = (), time_limit: Optional[float] = None,
+              seed: int = 0, game: int = 0) -> GameResult:
+    """
+    Plays one game without any output, agent_1 plays PLAYER1.
+
+    Input parameters:
+    - agent_1, agent_2: the agents playing PLAYER1 and PLAYER2.
+    - opening: columns played before the agents take over.
+    - time_limit: optional seconds per move, an agent that needs longer loses the game. Agents with a
+      time_budget_keyword are told their budget (see move_budget).
+    - seed: seed of the random generators (random and np.random) used by the agents.
+    - game: index of the game, copied to the result.
+
+    Returns:
+    - GameResult: the result of the game.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    board = Board.from_moves(opening)
+
+    agents = {PLAYER1: agent_1, PLAYER2: agent_2}
+    budgets = {PLAYER1: move_budget(agent_1, time_limit), PLAYER2: move_budget(agent_2, time_limit)}
+    saved_state = {PLAYER1: None, PLAYER2: None}
+    search_stats = {PLAYER1: None, PLAYER2: None}
+    move_records = []
+    max_move_time = 0.0
+    winner, reason = None, REASON_DRAW
+    while True:
+        player = board.player_to_move
+        opponent = PLAYER2 if player == PLAYER1 else PLAYER1
+        agent = agents[player]
+
+        start = time.perf_counter()
+        result = agent.generate_move(board.array.copy(), player, saved_state[player], *agent.args,
+                                     **budgets[player])
+        move_time = time.perf_counter() - start
+        action, saved_state[player] = result[0], result[1]
+        max_move_time = max(max_move_time, move_time)
+        move_stats = getattr(saved_state[player], 'stats', None)
+        if move_stats is not None:
+            if search_stats[player] is None:
+                search_stats[player] = SearchStats(searches=0)
+            search_stats[player].merge(move_stats)
+
+        if time_limit is not None and move_time > time_limit:
+            winner, reason = agents[opponent].name, REASON_TIME
+            break
+        if check_move_status(board.array, action) != MoveStatus.IS_VALID:
+            winner, reason = agents[opponent].name, REASON_ILLEGAL_MOVE
+            break
+
+        move_records.append(MoveRecord(board.move_count, agent.name, int(player), int(action), move_time,
+                                       None if move_stats is None else move_stats.nodes,
+                                       int(result[2]) if len(result) > 2 and result[2] is not None else None))
+        board.play(int(action), player)
+        end_state = board.end_state(player)
+        if end_state == GameState.IS_WIN:
+            winner, reason = agent.name, REASON_WIN
+            break
+        if end_state == GameState.IS_DRAW:
+            break
+
+    return GameResult(game, seed, agent_1.name, agent_2.name, winner, reason, tuple(board.history), len(opening),
+                      max_move_time, (search_stats[PLAYER1], search_stats[PLAYER2]), tuple(move_records))
+
+
+def schedule_games(agents: Sequence[Agent], games_per_pair: int, opening_plies: int = DEFAULT_OPENING_PLIES,
+                   seed: int = 0) -> List[Tuple[Agent, Agent, Tuple[int, ...], int, int]]:
+    """
+    Lists the games of a round robin tournament. Every opening is played twice by a pair of agents,
+    once with each agent playing first, so neither agent profits from a lucky opening.
+
+    Input parameters:
+    - agents: the agents, every pair of them plays games_per_pair games.
+    - games_per_pair: number of games per pair, rounded up to an even number.
+    - opening_plies: number of random moves before the agents take over.
+    - seed: seed of the tournament, the seeds of openings and games are derived from it.
+
+    Returns:
+    - List[Tuple[Agent, Agent, Tuple[int, ...], int, int]]: agent playing PLAYER1, agent playing PLAYER2,
+      opening, seed and index of every game.
+    """
+    games = []
+    for agent_1, agent_2 in itertools.combinations(agents, 2):
+        for _ in range((games_per_pair + 1) // 2):
+            opening = random_opening(seed + len(games), opening_plies)
+            for first, second in ((agent_1, agent_2), (agent_2, agent_1)):
+                games.append((first, second, opening, seed + len(games), len(games)))
+    return games
+
+
+def run_tournament(agents: Sequence[Agent], games_per_pair: int, workers: Optional[int] = None,
+                   opening_plies: int = DEFAULT_OPENING_PLIES, time_limit: Optional[float] = None,
+                   seed: int = 0) -> Iterator[GameResult]:
+    """
+    Plays a round robin tournament (see schedule_games) in a process pool and yields the results
+    in the order the games finish.
+
+    Input parameters:
+    - agents: the agents of the tournament.
+    - games_per_pair: number of games per pair of agents.
+    - workers: number of worker processes, None for one per CPU, 1 plays in this process.
+    - opening_plies: number of random moves before the agents take over.
+    - time_limit: optional seconds per move, an agent that needs longer loses the game (see play_game).
+    - seed: seed of the tournament.
+
+    Returns:
+    - Iterator[GameResult]: the result of every game, as soon as it is known.
+    """
+    games = schedule_games(agents, games_per_pair, opening_plies, seed)
+    if workers == 1:
+        for agent_1, agent_2, opening, game_seed, game in games:
+            yield play_game(agent_1, agent_2, opening, time_limit, game_seed, game)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(play_game, agent_1, agent_2, opening, time_limit, game_seed, game)
+                   for agent_1, agent_2, opening, game_seed, game in games]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def log_game(sink, result: GameResult):
+    """
+    Appends the moves and the result of a game to a results_log.ResultsSink, in the schema main.py writes.
+    """
+    for record in result.move_records:
+        sink.record_move(result.game, *record)
+    sink.record_game(result.game, result.player_1, result.player_2, result.winner, result.reason,
+                     len(result.moves))
+
+
+def standings(results: Sequence[GameResult]) -> Dict[str, Dict[str, int]]:
+    """
+    Counts wins, draws and losses of every agent.
+
+    Returns:
+    - Dict[str, Dict[str, int]]: agent name -> {'wins': ..., 'draws': ..., 'losses': ...}.
+    """
+    table = {}
+    for result in results:
+        for name in (result.player_1, result.player_2):
+            row = table.setdefault(name, {'wins': 0, 'draws': 0, 'losses': 0})
+            if result.winner is None:
+                row['draws'] += 1
+            elif result.winner == name:
+                row['wins'] += 1
+            else:
+                row['losses'] += 1
+    return table
+
+
+def _available_agents() -> Dict[str, Agent]:
+    from agents.agent_random import generate_move
+    from agents.agent_minimax import generate_minimax
+    from agents.agent_minimax.minimax import ENGINE_BITBOARD, ENGINE_NDARRAY, DEFAULT_DEPTH
+    from agents.agent_mcts import generate_mcts
+    from agents.agent_mcts.mcts import DEFAULT_ITERATIONS
+    # A node budget makes the strength independent of the machine and of the load of the other workers
+    node_budget = functools.partial(generate_minimax, engine=ENGINE_BITBOARD, max_nodes=DEFAULT_NODE_BUDGET)
+    # Under a time limit the depth agent deepens iteratively up to its depth until its budget is used up
+    fixed_depth = functools.partial(generate_minimax, engine=ENGINE_BITBOARD, depth=DEFAULT_DEPTH,
+                                    max_depth=DEFAULT_DEPTH)
+    return {
+        'random': Agent('random', generate_move),
+        'minimax': Agent('minimax', fixed_depth, time_budget_keyword='time_budget'),
+        'minimax-timed': Agent('minimax-timed', functools.partial(generate_minimax, engine=ENGINE_BITBOARD,
+                                                                  time_budget=1.0),
+                               time_budget_keyword='time_budget'),
+        'minimax-ndarray': Agent('minimax-ndarray', generate_minimax, (ENGINE_NDARRAY, 2)),
+        'minimax-nodes': Agent('minimax-nodes', node_budget, time_budget_keyword='time_budget'),
+        # Against minimax-timed, mcts-timed compares the strength of both searches for the same time per move
+        'mcts': Agent('mcts', functools.partial(generate_mcts, iterations=DEFAULT_ITERATIONS),
+                      time_budget_keyword='time_budget'),
+        'mcts-timed': Agent('mcts-timed', functools.partial(generate_mcts, time_budget=1.0),
+                            time_budget_keyword='time_budget'),
+    }
+
+
+if __name__ == '__main__':
+    available = _available_agents()
+    parser = argparse.ArgumentParser(description='Plays agent-vs-agent games without a user.')
+    parser.add_argument('agents', nargs='+', choices=sorted(available), help='agents of the round robin')
+    parser.add_argument('--games', type=int, default=100, help='games per pair of agents')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, default one per CPU')
+    parser.add_argument('--opening-plies', type=int, default=DEFAULT_OPENING_PLIES, help='random opening moves')
+    parser.add_argument('--time-limit', type=float, default=None,
+                        help='seconds per move, agents that take a time budget are told a share of it, '
+                             'an agent that needs longer loses the game')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the tournament')
+    parser.add_argument('--results', default=None,
+                        help='JSON-lines file the moves and results of the finished games are appended to')
+    args = parser.parse_args()
+
+    from results_log import ResultsSink
+    sink = ResultsSink(args.results) if args.results else None
+    finished = []
+    for game_result in run_tournament([available[name] for name in args.agents], args.games, args.workers,
+                                      args.opening_plies, args.time_limit, args.seed):
+        finished.append(game_result)
+        if sink is not None:
+            log_game(sink, game_result)
+        print(f'game {game_result.game}: {game_result.player_1} vs {game_result.player_2}, '
+              f'winner {game_result.winner} ({game_result.reason}, {len(game_result.moves)} moves)', flush=True)
+        for agent_name, game_stats in zip((game_result.player_1, game_result.player_2), game_result.search_stats):
+            if game_stats is not None:
+                print(f'    {agent_name}: {game_stats}', flush=True)
+    for agent_name, row in standings(finished).items():
+        print(f'{agent_name:>16}: {row["wins"]} wins, {row["draws"]} draws, {row["losses"]} losses')
+    if sink is not None:
+        sink.close()
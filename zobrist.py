@@ -0,0 +1,78 @@
+import numpy as np
+
+BOARD_ROWS = 6
+BOARD_COLS = 7
+ZOBRIST_SEED = 20240611
+# Boards hashed at once by zobrist_hash_many, bounds the temporary (chunk, 6, 7) uint64 array to about 22 MB
+HASH_CHUNK = 1 << 16
+
+
+def zobrist_table(seed: int = ZOBRIST_SEED) -> np.ndarray:
+    """
+    Returns a random uint64 key for every piece value and cell, shape (3, BOARD_ROWS, BOARD_COLS).
+    table[piece, row, col] is the key of piece on board[row, col]; the keys of NO_PLAYER (piece 0) are
+    zero, so empty cells do not change a hash.
+
+    Input parameters:
+    - seed: seed of the keys, the same seed gives the same table (and the same hashes) on every machine.
+    """
+    table = np.random.default_rng(seed).integers(0, 1 << 64, size=(3, BOARD_ROWS, BOARD_COLS),
+                                                   dtype=np.uint64, endpoint=False)
+    table[0] = 0
+    return table
+
+
+ZOBRIST_TABLE = zobrist_table()
+# The same keys as Python ints, so an update is one xor without numpy scalars
+ZOBRIST_KEYS = ZOBRIST_TABLE.tolist()
+
+_ROW_INDEX = np.arange(BOARD_ROWS)[:, None]
+_COL_INDEX = np.arange(BOARD_COLS)[None, :]
+
+
+def zobrist_hash(board: np.ndarray) -> int:
+    """
+    Hashes a board from scratch: the xor of the keys of all its pieces.
+
+    Input parameters:
+    - board: board in the ndarray format of game_utils.
+
+    Returns:
+    - int: the 64 bit hash, the same value that zobrist_update keeps up to date move by move.
+    """
+    keys = ZOBRIST_TABLE[board, _ROW_INDEX, _COL_INDEX]
+    return int(np.bitwise_xor.reduce(keys, axis=None))
+
+
+def zobrist_update(key: int, row: int, col: int, piece) -> int:
+    """
+    Returns the hash after piece was put on, or taken from, board[row, col]. A move and its undo are
+    the same xor, so both cost one operation instead of hashing the board again.
+
+    Input parameters:
+    - key: hash of the board before the change.
+    - row, col: the cell that changed.
+    - piece: PLAYER1 or PLAYER2.
+    """
+    return key ^ ZOBRIST_KEYS[piece][row][col]
+
+
+def zobrist_hash_many(boards: np.ndarray, chunk: int = HASH_CHUNK) -> np.ndarray:
+    """
+    Hashes a stack of boards vectorized, e.g. the positions of a dataset.
+
+    Input parameters:
+    - boards: array of shape (N, BOARD_ROWS, BOARD_COLS) in the ndarray format of game_utils.
+    - chunk: number of boards hashed at once, bounds the temporary memory.
+
+    Returns:
+    - np.ndarray: uint64 array of shape (N,), hashes[i] == zobrist_hash(boards[i]).
+    """
+    boards = np.asarray(boards)
+    if boards.ndim != 3 or boards.shape[1:] != (BOARD_ROWS, BOARD_COLS):
+        raise ValueError(f'Expected boards of shape (N, {BOARD_ROWS}, {BOARD_COLS}), got {boards.shape}.')
+    hashes = np.empty(len(boards), dtype=np.uint64)
+    for start in range(0, len(boards), chunk):
+        keys = ZOBRIST_TABLE[boards[start:start + chunk], _ROW_INDEX, _COL_INDEX]
+        hashes[start:start + chunk] = np.bitwise_xor.reduce(keys.reshape(len(keys), -1), axis=1)
+    return hashes